@@ -1,10 +1,4 @@
 #!/usr/binenv python3
-import gym_minigrid
-gym_minigrid.envs
-
-import gym_bandits
-
-gym_bandits.environments
-
+# Environment packages such as gym_minigrid and gym_bandits are imported by rl.envs.make_env when they are needed
 from rl.utils.io_utils import load_learning_agent
 from rl.utils.io_utils import save_learning_agent
@@ -1,9 +1,22 @@
 from .agent import Agent
 from .agent_builder import AgentBuilder
+# batched agents
+from .batched import BatchedAgent
+from .batched import BatchedEGreedy
+from .batched import BatchedSampleAveraging
+from .batched import BatchedUpperConfidenceBound
+from .batched import BatchedWeightedAveraging
+from .batched import make_batched_agent
 # learning agents
+from .learning import ActionValueAgent
+from .learning import ExpectedSarsa
 from .learning import LearningAgent
+from .learning import NStepTemporalDifference
 from .learning import NullLearning
+from .learning import QLearning
 from .learning import SampleAveraging
+from .learning import Sarsa
+from .learning import TemporalDifferenceLambda
 from .learning import TemporalDifferenceOne
 from .learning import TemporalDifferenceOneAveraging
 from .learning import TemporalDifferenceZero
@@ -19,5 +32,15 @@ from .policy import PolicyAgent
 from .policy import Random
 from .policy import UpperConfidenceBound
 # structure representations
+from .reprs import ActionTable
+from .reprs import EligibilityTraces
+from .reprs import RingBuffer
+from .reprs import SharedArray
+from .reprs import SharedValueTable
+from .reprs import StateIndex
+from .reprs import SuccessorTable
+from .reprs import TrajectoryBuffer
 from .reprs import Transition
+from .reprs import TransitionTable
 from .reprs import Value
+from .reprs import ValueTable
@@ -1,12 +1,83 @@
 #! /usr/bin/env python3
-
-import logging
+from copy import deepcopy
+from functools import lru_cache
 from typing import List, Dict
 
 from rl import agents
 from rl.agents import Agent
 
 
+def agent_subclasses(base: type) -> List[type]:
+    """
+    :param base: The policy agent or learning agent class
+    :return: Every concrete agent that derives from the base, directly or through an abstract agent such as the action
+             value agent, without the hybrid agents built from them
+    """
+    subclasses: List[type] = []
+    for subclass in base.__subclasses__():
+        if subclass.__module__ == __name__:
+            continue
+        # Policy and learning agents each leave the other half of the agent interface abstract
+        if subclass.__abstractmethods__ <= Agent.__abstractmethods__:
+            subclasses.append(subclass)
+        subclasses.extend(agent_subclasses(subclass))
+
+    return subclasses
+
+
+def agent_registry() -> Dict[str, type]:
+    """
+    :return: Every policy agent and learning agent by class name
+    """
+    return {agent.__name__: agent
+            for agent in agent_subclasses(agents.LearningAgent) + agent_subclasses(agents.PolicyAgent)}
+
+
+@lru_cache(maxsize=None)
+def agent_class(policy: str, learning: str) -> type:
+    """
+    Merge a policy agent with a learning agent. The class is built once per pair and registered in this module under
+    its name, so agents made by a builder can be pickled to and from worker processes.
+    :param policy: The name of a policy agent, such as EGreedy
+    :param learning: The name of a learning agent, such as TemporalDifferenceZero
+    :return: The hybrid agent class, such as EGreedyTemporalDifferenceZero
+    """
+    registry = agent_registry()
+    policy_agent: type = registry[policy]
+    learning_agent: type = registry[learning]
+
+    hybrid = type(f"{policy}{learning}", (policy_agent, learning_agent), {"__module__": __name__})
+    globals()[hybrid.__name__] = hybrid
+    return hybrid
+
+
+def __getattr__(name: str) -> type:
+    """
+    Build the hybrid classes that are looked up before any builder has made them, such as when a process that has not
+    made an agent unpickles one
+    """
+    registry = agent_registry()
+    for policy in agent_subclasses(agents.PolicyAgent):
+        learning = name[len(policy.__name__):]
+        if name.startswith(policy.__name__) and learning in registry and \
+                issubclass(registry[learning], agents.LearningAgent):
+            return agent_class(policy.__name__, learning)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def fork(argument):
+    """
+    Copy a constructor argument for a new agent. Tables and state indices are forked, which shares their arrays until
+    the agent writes to them instead of copying them, every other argument is deep copied.
+    :param argument: A constructor argument the builder was set with
+    :return: The argument of the new agent
+    """
+    if hasattr(argument, "fork"):
+        return argument.fork()
+    return deepcopy(argument)
+
+
 class AgentBuilder:
     """
     The agent builder class is used to dynamically build and create new agent classes from merging a learning agent
@@ -26,15 +97,9 @@ class AgentBuilder:
         :param policy: The name a policy agent
         :param learning: The name of a learning agent
         """
-        learning_agents: List[type] = agents.LearningAgent.__subclasses__()
-        policy_agents: List[type] = agents.PolicyAgent.__subclasses__()
-
-        self.learning_agent_names = [agent.__name__ for agent in learning_agents]
-        self.policy_agent_names = [agent.__name__ for agent in policy_agents]
-
-        agent_subclasses: List[type] = learning_agents + policy_agents
-        agent_subclass_names: List[str] = [agent.__name__ for agent in agent_subclasses]
-        self.registry = dict(zip(agent_subclass_names, agent_subclasses))
+        self.learning_agent_names = [agent.__name__ for agent in agent_subclasses(agents.LearningAgent)]
+        self.policy_agent_names = [agent.__name__ for agent in agent_subclasses(agents.PolicyAgent)]
+        self.registry = agent_registry()
 
         self.learning_agent = learning
         self.policy_agent = policy
@@ -71,16 +136,6 @@ class AgentBuilder:
         """
         self.args = args
         self.kwargs = kwargs
-
-        # Build hybrid class of learning gent and policy agent
-        python_commands = [
-            f"global {self.policy_agent}{self.learning_agent}",
-            f"class {self.policy_agent}{self.learning_agent}(agents.{self.policy_agent} ,agents.{self.learning_agent}):",
-            "    def __init__(self, *args, **kwargs):",
-            "        super().__init__(*args, **kwargs)"
-        ]
-        exec("\n".join(python_commands))
-
         self.is_set = True
 
     def reset(self):
@@ -100,16 +155,9 @@ class AgentBuilder:
         if not self.is_set:
             self.set()
 
-        python_commands = [
-            "global agent",
-            "from copy import deepcopy",
-            f"agent = {self.policy_agent}{self.learning_agent}(*deepcopy(self.args), **deepcopy(self.kwargs))"
-        ]
-        try:
-            exec("\n".join(python_commands))
-        except NameError:
-            logging.error("Must reset builder before making new type of agent.")
-        return agent
+        args = [fork(argument) for argument in self.args]
+        kwargs = {name: fork(argument) for name, argument in self.kwargs.items()}
+        return agent_class(self.policy_agent, self.learning_agent)(*args, **kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+from .batched_agent import BatchedAgent
+from .batched_agent_builder import batched_agent_class
+from .batched_agent_builder import make_batched_agent
+# learning agents
+from .batched_learning_agent import BatchedLearningAgent
+from .batched_sample_averaging_agent import BatchedSampleAveraging
+from .batched_weighted_averaging_agent import BatchedWeightedAveraging
+# policy agents
+from .batched_egreedy_policy_agent import BatchedEGreedy
+from .batched_policy_agent import BatchedPolicyAgent
+from .batched_upper_confidence_bound_policy_agent import BatchedUpperConfidenceBound
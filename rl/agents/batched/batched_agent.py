@@ -0,0 +1,46 @@
+#! /usr/bin/env python3
+from abc import ABC, abstractmethod
+
+import numpy
+
+
+class BatchedAgent(ABC):
+    """
+    A population of independent k-armed bandit agents that act and learn in lockstep. The value approximation and pull
+    count of every arm of every run live in (runs, arms) arrays, so the whole population picks and learns from its
+    actions in one vectorized step instead of one python call per agent.
+    """
+
+    def __init__(self, runs: int, arms: int, optimistic: float = 0.0):
+        """
+        :param runs: The number of independent agents
+        :param arms: The number of arms of the bandit
+        :param optimistic: The initial value approximation of every arm
+        """
+        self.runs = runs
+        self.arms = arms
+        self.run_indices = numpy.arange(runs)
+
+        self.values: numpy.ndarray = numpy.full((runs, arms), optimistic, dtype=numpy.float64)
+        self.counts: numpy.ndarray = numpy.zeros((runs, arms), dtype=numpy.float64)
+
+    @abstractmethod
+    def act(self, available_actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Every agent selects an action based off of it's policy
+        :param available_actions: An array of integers, the arms every agent may pull
+        :returns: The action selected by every agent
+        """
+        pass
+
+    @abstractmethod
+    def learn(self, actions: numpy.ndarray, rewards: numpy.ndarray):
+        """
+        Every agent learns from the reward it received for its action
+        :param actions: The action every agent took
+        :param rewards: The reward every agent received
+        """
+        pass
+
+    def reset(self):
+        pass
@@ -0,0 +1,43 @@
+#! /usr/bin/env python3
+from functools import lru_cache
+
+from .batched_agent import BatchedAgent
+from .batched_egreedy_policy_agent import BatchedEGreedy
+from .batched_sample_averaging_agent import BatchedSampleAveraging
+from .batched_upper_confidence_bound_policy_agent import BatchedUpperConfidenceBound
+from .batched_weighted_averaging_agent import BatchedWeightedAveraging
+
+# The batched version of every agent, under the name of the agent it batches
+BATCHED_POLICY_AGENTS = {"EGreedy": BatchedEGreedy,
+                         "UpperConfidenceBound": BatchedUpperConfidenceBound}
+BATCHED_LEARNING_AGENTS = {"SampleAveraging": BatchedSampleAveraging,
+                           "WeightedAveraging": BatchedWeightedAveraging}
+
+
+@lru_cache(maxsize=None)
+def batched_agent_class(policy: str, learning: str) -> type:
+    """
+    Merge a batched policy agent with a batched learning agent
+    :param policy: The name of the policy agent to batch, such as EGreedy
+    :param learning: The name of the learning agent to batch, such as SampleAveraging
+    :return: The hybrid batched agent class
+    """
+    assert policy in BATCHED_POLICY_AGENTS, f"{policy} has no batched version"
+    assert learning in BATCHED_LEARNING_AGENTS, f"{learning} has no batched version"
+
+    policy_agent: type = BATCHED_POLICY_AGENTS[policy]
+    learning_agent: type = BATCHED_LEARNING_AGENTS[learning]
+    return type(f"Batched{policy}{learning}", (policy_agent, learning_agent), {})
+
+
+def make_batched_agent(policy: str, learning: str, *args, **kwargs) -> BatchedAgent:
+    """
+    Construct a batched agent from the names of the agents it batches
+    batched_agent = make_batched_agent("EGreedy", "SampleAveraging", runs=2000, arms=10, exploratory_rate=0.1)
+    :param policy: The name of the policy agent to batch
+    :param learning: The name of the learning agent to batch
+    :param args: Positional arguments of both agents
+    :param kwargs: Keyword arguments of both agents, runs and arms are required
+    :return: The constructed agent
+    """
+    return batched_agent_class(policy, learning)(*args, **kwargs)
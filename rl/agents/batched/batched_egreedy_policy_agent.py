@@ -0,0 +1,26 @@
+#! /usr/bin/env python3
+import numpy
+
+from .batched_policy_agent import BatchedPolicyAgent
+
+
+class BatchedEGreedy(BatchedPolicyAgent):
+    def __init__(self, exploratory_rate: float, *args, **kwargs):
+        """
+        Every agent picks an action using an egreedy policy
+        :param exploratory_rate: The probably of selecting an action at random from a uniform distribution
+        """
+        super().__init__(*args, **kwargs)
+        self.exploratory_rate = exploratory_rate
+
+    def act(self, available_actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Select a greedy action in every run, then replace it with a random action in the runs that explore
+        :param available_actions: The arms every agent may pull
+        :return: The action of every agent
+        """
+        actions = available_actions[self.values[:, available_actions].argmax(axis=1)]
+
+        explore = numpy.random.random(self.runs) < self.exploratory_rate
+        actions[explore] = numpy.random.choice(available_actions, numpy.count_nonzero(explore))
+        return actions
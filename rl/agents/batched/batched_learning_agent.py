@@ -0,0 +1,23 @@
+#! /usr/bin/env python3
+from abc import abstractmethod
+
+import numpy
+
+from .batched_agent import BatchedAgent
+
+
+class BatchedLearningAgent(BatchedAgent):
+    """
+    The batched learning agent counts the pulls of every arm and implements a learning method for every run at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    @abstractmethod
+    def learn_value(self, actions: numpy.ndarray, rewards: numpy.ndarray):
+        pass
+
+    def learn(self, actions: numpy.ndarray, rewards: numpy.ndarray):
+        self.counts[self.run_indices, actions] += 1
+        self.learn_value(actions, rewards)
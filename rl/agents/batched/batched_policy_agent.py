@@ -0,0 +1,11 @@
+#! /usr/bin/env python3
+from .batched_agent import BatchedAgent
+
+
+class BatchedPolicyAgent(BatchedAgent):
+    """
+    The batched policy agents main purpose is to implement the acting method for every run at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,21 @@
+#! /usr/bin/env python3
+import numpy
+
+from .batched_learning_agent import BatchedLearningAgent
+
+
+class BatchedSampleAveraging(BatchedLearningAgent):
+    """
+    Every agent approximates the value of an arm with the average of the rewards it received from that arm.
+
+    Vt+1(a) = Vt(a) + alpha * (Rt - Vt(a))
+    Where alpha is 1/N(a)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def learn_value(self, actions: numpy.ndarray, rewards: numpy.ndarray):
+        values = self.values[self.run_indices, actions]
+        counts = self.counts[self.run_indices, actions]
+        self.values[self.run_indices, actions] = values + (rewards - values) / counts
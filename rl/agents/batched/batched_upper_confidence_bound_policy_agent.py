@@ -0,0 +1,27 @@
+#! /usr/bin/env python3
+import numpy
+
+from .batched_policy_agent import BatchedPolicyAgent
+
+
+class BatchedUpperConfidenceBound(BatchedPolicyAgent):
+    def __init__(self, confidence: float, *args, **kwargs):
+        """
+        Every agent picks an action using an upper confidence bound policy
+        :param confidence: Scales the exploration bonus of arms that have rarely been pulled
+        """
+        super().__init__(*args, **kwargs)
+        self.confidence = confidence
+
+    def act(self, available_actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Select the action with the highest upper confidence bound in every run
+        :param available_actions: The arms every agent may pull
+        :return: The action of every agent
+        """
+        # Like the unbatched policy, every count starts at one and the time starts at one
+        action_counts = self.counts[:, available_actions] + 1
+        time = self.counts.sum(axis=1, keepdims=True) + 1
+
+        bounds = self.values[:, available_actions] + self.confidence * numpy.sqrt(numpy.log(time) / action_counts)
+        return available_actions[bounds.argmax(axis=1)]
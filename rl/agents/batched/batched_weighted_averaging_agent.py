@@ -0,0 +1,30 @@
+#! /usr/bin/env python3
+import numpy
+
+from .batched_learning_agent import BatchedLearningAgent
+
+
+class BatchedWeightedAveraging(BatchedLearningAgent):
+    """
+    Every agent approximates the value of an arm with an exponential recency-weighted average of its rewards, using
+    the unbiased constant step size trick to avoid the bias of the initial values.
+
+    Vt+1(a) = Vt(a) + alpha * (Rt - Vt(a))
+    Where alpha is some real number between 0 and 1
+    """
+
+    def __init__(self, learning_rate: float, *args, **kwargs):
+        """
+        :param learning_rate: The constant step size
+        """
+        super().__init__(*args, **kwargs)
+        self.learning_rate = learning_rate
+        self.trace = 0
+
+    def learn_value(self, actions: numpy.ndarray, rewards: numpy.ndarray):
+        # All the agents act in lockstep, so they share the trace
+        self.trace = self.trace + self.learning_rate * (1 - self.trace)
+        step_size = self.learning_rate / self.trace
+
+        values = self.values[self.run_indices, actions]
+        self.values[self.run_indices, actions] = values + step_size * (rewards - values)
@@ -1,6 +1,12 @@
 from .learning_agent import LearningAgent
+from .action_value_agent import ActionValueAgent
+from .expected_sarsa_agent import ExpectedSarsa
+from .n_step_temporal_difference_agent import NStepTemporalDifference
 from .null_learning_agent import NullLearning
+from .q_learning_agent import QLearning
 from .sample_averaging_agent import SampleAveraging
+from .sarsa_agent import Sarsa
+from .temporal_difference_lambda_agent import TemporalDifferenceLambda
 from .temporal_difference_one_agent import TemporalDifferenceOne
 from .temporal_difference_one_averaging_agent import TemporalDifferenceOneAveraging
 from .temporal_difference_zero_agent import TemporalDifferenceZero
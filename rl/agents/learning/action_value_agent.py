@@ -0,0 +1,138 @@
+#! /usr/bin/env python3
+from abc import abstractmethod
+from typing import Tuple
+
+import numpy
+
+from rl.agents.learning import LearningAgent
+from rl.agents.reprs import ActionTable
+
+
+class ActionValueAgent(LearningAgent):
+    """
+    The action value agent learns the value of every action of a state, Q(s, a), in one dense (states, actions) array
+    keyed by the ids of the state index the state values and transitions share. Policies score the actions of a state
+    by a single lookup of its row rather than by sampling the transition model and reading the values of the next
+    states. The state values keep counting visits and the transitions keep being recorded, so the tables stay
+    compatible with every other learning agent.
+
+    Action values that have never been learned are nan, the actions they belong to can not be scored, and the first
+    value learned for an action is its target. The value of an action includes the reward received for committing to
+    it, and the last action of an episode is learned from its reward when the agent is reset.
+
+    Adversarial agents take turns with an opponent, such as in self play, and learn the opponent's moves from their own
+    point of view. The opponent picks the action that is worst for the agent, so states the opponent moves from are
+    valued by that action rather than the agent's best one. The states of an episode alternate between the agent's
+    turns and the opponent's, and the agent that moves second is told by setting moves_first to False.
+    """
+
+    # Only the last two steps are learned from
+    trajectory_window: int = 2
+
+    def __init__(self, learning_rate: float, discount_rate: float, *args, action_values: ActionTable = None,
+                 adversarial: bool = False, **kwargs):
+        """
+        :param learning_rate: The constant step size alpha
+        :param discount_rate: The proportion of the value of the next state that applies to an action
+        :param action_values: Action values learned before, interned in the same state index as the state values
+        :param adversarial: Every other state of an episode is the turn of an opponent that minimizes the agent's value
+        """
+        super().__init__(*args, **kwargs)
+        self.learning_rate: float = learning_rate
+        self.discount_rate: float = discount_rate
+        self.trace: float = 0
+        self.adversarial: bool = adversarial
+        self.moves_first: bool = True
+
+        # The position in the episode of the last state of the trajectory
+        self.episode_step: int = 0
+
+        states = self.state_values.states
+        if action_values is None:
+            self.action_values = ActionTable(states=states, fill=numpy.nan)
+        elif action_values.states is states:
+            self.action_values = action_values
+        else:
+            self.action_values = ActionTable(states=states, fill=numpy.nan)
+            self.action_values.merge(action_values)
+
+    @abstractmethod
+    def next_value(self, row: numpy.ndarray, opponent: bool) -> float:
+        """
+        :param row: The action values of the state the agent landed in, nan for actions that have never been learned
+        :param opponent: Whether the opponent of an adversarial agent moves from the state
+        :return: The value of the state the learning method bootstraps from
+        """
+        pass
+
+    def opponent_turn(self) -> bool:
+        """
+        :return: Whether the opponent of an adversarial agent moves from the last state of the trajectory
+        """
+        return self.adversarial and (self.episode_step % 2 == 0) != self.moves_first
+
+    def learn_value(self):
+        """
+        Move the value of the previous action towards its reward and the value of the state the agent landed in
+        """
+        current_index = self.trajectory.state_id(-1)
+        self.state_values.counts[current_index] += 1
+        self.episode_step += 1
+
+        row = self.action_values.row(current_index, self.trajectory.action(-1))
+        next_value = self.next_value(row, self.opponent_turn())
+        target = self.trajectory.reward(-2) + self.discount_rate * next_value
+        self.update(self.trajectory.state_id(-2), self.trajectory.action(-2), target)
+
+    def update(self, index: int, action: int, target: float):
+        """
+        Move the value of an action of a state towards a target
+        :param index: The id of the state
+        :param action: The canonical action
+        :param target: The target of the action's value
+        """
+        row = self.action_values.row(index, action)
+
+        # Unbiased constant step size trick
+        self.trace = self.trace + self.learning_rate * (1 - self.trace)
+        step_size = self.learning_rate / self.trace
+
+        value = row[action]
+        row[action] = target if value != value else value + step_size * (target - value)
+
+    def reset(self):
+        """
+        Learn the last action of the episode from its reward
+        """
+        if self.trajectory:
+            self.update(self.trajectory.state_id(-1), self.trajectory.action(-1), self.trajectory.reward(-1))
+
+        self.episode_step = 0
+        super().reset()
+
+    def merge(self, agent):
+        """
+        Merge the state values, transitions and action values of another learning agent with this one
+        :param agent: another learning agent
+        """
+        super().merge(agent)
+
+        if isinstance(agent, ActionValueAgent):
+            self.action_values.merge(agent.action_values)
+
+    def score_actions(self, state: numpy.ndarray, actions: numpy.ndarray, expected: bool = False) \
+            -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Score every action available from a state by its action value. The next states are not looked up, so the id
+        of the state itself stands in for the next state of every action that has a value.
+        :param state: The state of the environment
+        :param actions: The actions available to the agent
+        :param expected: Ignored, an action value is an expectation over the next states already
+        :return: The id of the state for every action that has a value and -1 otherwise, and the value of every action
+        """
+        states = self.state_values.states
+        actions = states.canonical_actions(state, numpy.asarray(actions))
+        state_id = states.find(state)
+
+        values = self.action_values.gather(state_id, actions)
+        return numpy.where(values == values, state_id, -1), values
@@ -0,0 +1,40 @@
+#! /usr/bin/env python3
+import numpy
+
+from rl.agents.learning.action_value_agent import ActionValueAgent
+
+
+class ExpectedSarsa(ActionValueAgent):
+    """
+    Applies the expected SARSA algorithm as a learning algorithm
+    Qt+1(s, a) = Qt(s, a) + alpha * (reward + gamma * sum_a' pi(a'|s') Qt(s', a') - Qt(s, a))
+    Where alpha is the learning rate passed in by the user, gamma is the discount rate and pi is an egreedy policy over
+    the actions that have been learned from s'. A state without any is worth nothing. The opponent of an adversarial
+    agent follows the same policy towards the minimum.
+    """
+
+    def __init__(self, *args, target_exploratory_rate: float = None, **kwargs):
+        """
+        :param target_exploratory_rate: The exploratory rate of the egreedy policy the expectation is taken over, the
+                                        exploratory rate of the agent's own policy if not given, greedy if it has none
+        """
+        super().__init__(*args, **kwargs)
+        self.target_exploratory_rate = target_exploratory_rate
+
+    def next_value(self, row: numpy.ndarray, opponent: bool) -> float:
+        """
+        :param row: The action values of the state the agent landed in
+        :param opponent: Whether the opponent of an adversarial agent moves from the state
+        :return: The expected value of the actions of the state under the egreedy policy of whoever moves from it
+        """
+        learned = row[row == row]
+        if not len(learned):
+            return 0.0
+
+        exploratory_rate = self.target_exploratory_rate
+        if exploratory_rate is None:
+            # Policies that decay their exploratory rate are followed as it changes
+            exploratory_rate = getattr(self, "exploratory_rate", 0.0)
+
+        greedy = learned.min() if opponent else learned.max()
+        return (1 - exploratory_rate) * greedy + exploratory_rate * learned.mean()
@@ -1,43 +1,61 @@
 #! /usr/bin/env python3
 from abc import abstractmethod
-from collections import defaultdict, Counter
-from typing import Tuple, Dict, Union, List
+from collections import Counter
+from typing import Tuple, Dict, Union
 
 import numpy
 
 from rl.agents.agent import Agent
-from rl.agents.reprs import Transition
+from rl.agents.reprs import StateIndex, TrajectoryBuffer
+from rl.agents.reprs.transition_table import TransitionTable
 from rl.agents.reprs.value import Value
+from rl.agents.reprs.value_table import ValueTable
 
 
 class LearningAgent(Agent):
     """
     The learning agent implements a learning method and keeps track of the trajectoty of the agent, it's state-value map,
-    and tracks how it has transitioned from states to other states by mapping state action tuples to a counter of states
-    it has landed in.
+    and tracks how it has transitioned from states to other states by counting the states it has landed in after
+    committing to an action from a state. The state-value map and the transitions share one state index, so the next
+    state ids returned by the transition model index directly into the state values.
     """
+    # The number of latest steps the learning method looks at, every step of the episode is kept if None
+    trajectory_window: int = None
 
-    def __init__(self, state_values: Dict[Tuple[Union[float, int]], Value] = None,
-                 transitions: Dict[Tuple[Union[float, int]], Counter] = None):
+    def __init__(self, state_values: Union[ValueTable, Dict[Tuple[Union[float, int]], Value]] = None,
+                 transitions: Union[TransitionTable, Dict[Tuple[Union[float, int]], Counter]] = None,
+                 value_dtype: Union[str, numpy.dtype] = numpy.float64, states: StateIndex = None):
         """
         All learning agents may be initialized from state values and transitions any other learning agent has learned
-        :param state_values: A mapping of tuples to a Value struct that tracks how many times the agent has landed in that
-                             state and what the value approximation of that state is
-        :param transitions: A mapping of state-action tuples that map to what states it has transitioned to and how many
-                            times it has transitioned into that state after committing to that action from the original
-                            state
+        :param state_values: A value table, or a mapping of tuples to a Value struct, that tracks how many times the
+                             agent has landed in that state and what the value approximation of that state is
+        :param transitions: A transition table, or a mapping of state-action tuples to a Counter, that tracks what
+                            states the agent has transitioned to and how many times it has transitioned into that state
+                            after committing to that action from the original state
+        :param value_dtype: The floating point type of a new value table. Ignored if state_values is a value table.
+        :param states: The index the state values and transitions are interned in, such as a perfect index of every
+                       state of the environment. Tables on other indices are copied into it.
         """
-        self.trajectory: List[Transition] = []
+        self.trajectory = TrajectoryBuffer(window=self.trajectory_window)
 
         if state_values is None:
-            self.state_values = defaultdict(Value)
-        else:
+            if states is None and isinstance(transitions, TransitionTable):
+                states = transitions.states
+            self.state_values = ValueTable(dtype=value_dtype, states=states)
+        elif isinstance(state_values, ValueTable) and (states is None or state_values.states is states):
             self.state_values = state_values
+        else:
+            self.state_values = ValueTable.from_dict(state_values, dtype=value_dtype, states=states)
 
         if transitions is None:
-            self.transitions = defaultdict(Counter)
-        else:
+            self.transitions = TransitionTable(states=self.state_values.states)
+        elif isinstance(transitions, TransitionTable) and transitions.states is self.state_values.states:
             self.transitions = transitions
+        elif isinstance(transitions, TransitionTable):
+            self.transitions = TransitionTable(states=self.state_values.states)
+            self.transitions.merge(transitions)
+        else:
+            self.transitions = TransitionTable.from_dict(transitions, states=self.state_values.states)
 
     @abstractmethod
     def learn_value(self):
@@ -47,26 +65,22 @@ class LearningAgent(Agent):
         self.trajectory.clear()
 
     def learn(self, state: numpy.ndarray, action: int, reward: float):
-        transition = Transition(state, action, reward)
-        if not self.trajectory:
-            self.state_values[transition.state].count += 1
-            self.trajectory.append(transition)
+        # The state is interned once, learning methods work on its id. Slot may copy or grow the arrays, so it is called
+        # before they are fetched.
+        index = self.state_values.slot(state)
+        action = self.state_values.states.canonical_actions(state, action)
+        self.trajectory.append(index, action, reward)
+
+        if len(self.trajectory) == 1:
+            self.state_values.counts[index] += 1
             return
 
-        self.trajectory.append(transition)
         self.learn_value()
         self.learn_transition()
 
     def learn_transition(self):
-        transition = self.trajectory.pop()
-        previous_transition = self.trajectory.pop()
-
-        state_action_pair = (*previous_transition.state, previous_transition.action)
-        transition_counts = self.transitions[state_action_pair]
-        transition_counts[transition.state] += 1
-
-        self.trajectory.append(previous_transition)
-        self.trajectory.append(transition)
+        row = self.transitions.row(self.trajectory.state_id(-2), self.trajectory.action(-2))
+        self.transitions.add(row, self.trajectory.state_id(-1))
 
     def merge(self, agent):
         """
@@ -75,22 +89,8 @@ class LearningAgent(Agent):
         """
         assert isinstance(agent, LearningAgent), "Agent being merged must be a learning agent"
 
-        for state, other_value in agent.state_values.items():
-            value: Value = self.state_values[state]
-
-            if not value.count:
-                value = other_value
-            else:
-                # value.value = (value.value + other_value.value) / 2
-                total_count = value.count + other_value.count
-                value.value = value.count * value.value + other_value.count * other_value.value
-                value.value /= total_count
-                value.count = total_count / 2
-
-            self.state_values[state] = value
-
-        for state_action, counts in agent.transitions.items():
-            self.transitions[state_action] += counts
+        self.state_values.merge(agent.state_values)
+        self.transitions.merge(agent.transitions)
 
     def transition_model(self, state: numpy.ndarray, action: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
         """
@@ -98,18 +98,80 @@ class LearningAgent(Agent):
         agent performs an action depending on the action and the current state.
         :param state: The state of the environment
         :param action: An action available to the agent
+        :return: The probabilities of landing in each next state and the ids of the next states, empty if the action
+                 has never been taken from the state
+        """
+        action = self.state_values.states.canonical_actions(state, action)
+        row = self.transitions.find(self.state_values.find(state), action)
+
+        if row < 0:
+            return numpy.zeros(0), numpy.zeros(0, dtype=numpy.int32)
+
+        next_state_ids, probabilities, _, _ = self.transitions.cached(row)
+        return probabilities, next_state_ids
+
+    def sample_transition(self, state: numpy.ndarray, action: int) -> int:
+        """
+        Sample the state the agent lands in after committing to an action from a state from the transition model
+        :param state: The state of the environment
+        :param action: An action available to the agent
+        :return: The id of the next state, -1 if the action has never been taken from the state
+        """
+        action = self.state_values.states.canonical_actions(state, action)
+        row = self.transitions.find(self.state_values.find(state), action)
+
+        if row < 0:
+            return -1
+
+        return self.transitions.sample(row)
+
+    def score_actions(self, state: numpy.ndarray, actions: numpy.ndarray, expected: bool = False) \
+            -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Score every action available from a state by the value of the state the agent lands in after committing to it.
+        :param state: The state of the environment
+        :param actions: The actions available to the agent
+        :param expected: Score by the expected value over every observed next state instead of a sampled next state
+        :return: The id of the next state of every action and its value. The id is -1 and the value nan for actions
+                 that have never been taken from the state. In expected mode the id is the most likely next state.
         """
-        state_action_pair = (*state, action)
-        state_counts = self.transitions[state_action_pair]
+        states = self.state_values.states
+        actions = states.canonical_actions(state, numpy.asarray(actions))
+        rows = self.transitions.find_rows(states.find(state), actions).tolist()
+
+        if not rows or max(rows) < 0:
+            return numpy.full(len(rows), -1, dtype=numpy.int64), numpy.full(len(rows), numpy.nan)
+
+        if expected:
+            next_state_ids = numpy.full(len(rows), -1, dtype=numpy.int64)
+            values = numpy.full(len(rows), numpy.nan)
+            observed = [index for index, row in enumerate(rows) if row >= 0]
+
+            # Gather the values of the next states of all actions at once and sum them per action
+            entries = [self.transitions.cached(rows[index]) for index in observed]
+            all_next_state_ids = numpy.concatenate([entry[0] for entry in entries])
+            probabilities = numpy.concatenate([entry[1] for entry in entries])
+            starts = numpy.cumsum([0] + [len(entry[0]) for entry in entries[:-1]])
 
-        if not state_counts:
-            return numpy.array([]), numpy.array([])
+            values[observed] = numpy.add.reduceat(probabilities * self.values_of(all_next_state_ids), starts)
+            next_state_ids[observed] = [entry[0][entry[1].argmax()] for entry in entries]
+            return next_state_ids, values
 
-        states = numpy.array(list(state_counts.keys()))
-        counts = numpy.array(list(state_counts.values()))
+        sample = self.transitions.sample
+        uniforms = numpy.random.random(len(rows)).tolist()
+        next_state_ids = numpy.array([sample(row, uniform) if row >= 0 else -1 for row, uniform in zip(rows, uniforms)])
 
-        probabilities = counts / counts.sum()
-        return probabilities, states
+        values = self.values_of(next_state_ids)
+        values[next_state_ids < 0] = numpy.nan
+        return next_state_ids, values
+
+    def values_of(self, state_ids: numpy.ndarray) -> numpy.ndarray:
+        """
+        Map the next state ids returned by the transition model to their values
+        :param state_ids: The ids of states
+        :return: The value approximations of the states
+        """
+        return self.state_values.gather(state_ids)
 
     def value_model(self, state: numpy.ndarray) -> float:
         """
@@ -117,4 +179,4 @@ class LearningAgent(Agent):
         :param state: The state of the environment
         :return: The reward received for taking that action
         """
-        return self.state_values[tuple(state)].value
+        return self.state_values.value(state)
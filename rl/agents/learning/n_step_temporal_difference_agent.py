@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+from typing import List
+
+import numpy
+
+from rl.agents.learning import LearningAgent
+from rl.agents.reprs.ring_buffer import RingBuffer
+
+
+class NStepTemporalDifference(LearningAgent):
+    """
+    Applies the n-step temporal difference algorithm as a learning algorithm
+    Gt = rt + gamma * rt+1 + ... + gamma^(n-1) * rt+n-1 + gamma^n * Vt(st+n)
+    Vt+1(st) = Vt(st) + alpha * (Gt - Vt(st))
+    Where alpha is the learning rate, gamma is the discount rate and the value of a state includes the reward the agent
+    received in it. One step learns like TD(0) and more steps than an episode has like TD(1).
+
+    Only the last n transitions are kept, in a ring buffer, along with the discounted sum of their rewards, so every
+    step takes constant time and memory does not grow with the length of the episode. The states still in the buffer
+    when the agent is reset are learned from the rewards that are left.
+    """
+
+    # The earlier steps of the episode are in the ring buffer
+    trajectory_window: int = 2
+
+    def __init__(self, learning_rate: float, discount_rate: float, steps: int, *args, **kwargs):
+        """
+        Represents an agent learning with n-step temporal difference
+        :param learning_rate: The constant step size alpha
+        :param discount_rate: The proportion of the future rewards applies to earlier states
+        :param steps: The number of rewards n to learn from before bootstrapping from the value of a state, at least 1
+        """
+        if steps < 1:
+            raise ValueError(f"An n-step agent learns from at least 1 step, not {steps}")
+
+        super().__init__(*args, **kwargs)
+        self.learning_rate: float = learning_rate
+        self.discount_rate: float = discount_rate
+        self.steps: int = steps
+        self.trace: float = 0
+
+        self.buffer = RingBuffer(steps)
+        self.discounts: List[float] = numpy.power(float(discount_rate), numpy.arange(steps + 1)).tolist()
+
+        # gamma^i * r of the i-th oldest transition in the buffer, summed over the buffer
+        self.discounted_rewards: float = 0.0
+
+    def learn_value(self):
+        """
+        Learn the state n steps back from the rewards since and the value of the latest state
+        """
+        current_index = self.trajectory.state_id(-1)
+        self.state_values.counts[current_index] += 1
+
+        self.push(-2)
+        if len(self.buffer) == self.steps:
+            values = self.state_values.values
+            self.update_oldest(self.discounted_rewards + self.discounts[self.steps] * values[current_index])
+
+    def push(self, step: int):
+        """
+        Add a step of the trajectory to the buffer and its discounted reward to the sum
+        :param step: The index of the step in the trajectory
+        """
+        reward = self.trajectory.reward(step)
+        self.discounted_rewards += self.discounts[len(self.buffer)] * reward
+        self.buffer.push(self.trajectory.state_id(step), self.trajectory.action(step), reward)
+
+    def update_oldest(self, target: float):
+        """
+        Move the value of the oldest state in the buffer towards its return and remove it from the buffer
+        :param target: The n-step return of the oldest state
+        """
+        state_id, _, reward = self.buffer.pop()
+
+        # Unbiased constant step size trick
+        self.trace = self.trace + self.learning_rate * (1 - self.trace)
+        step_size = self.learning_rate / self.trace
+
+        values = self.state_values.values
+        values[state_id] += step_size * (target - values[state_id])
+
+        if self.buffer.start == 0 or self.discount_rate == 0:
+            # Summing the rewards anew whenever the buffer wraps around keeps rounding errors from building up
+            self.discounted_rewards = float(numpy.dot(self.buffer.ordered_rewards(), self.discounts[:len(self.buffer)]))
+        else:
+            self.discounted_rewards = (self.discounted_rewards - reward) / self.discount_rate
+
+    def reset(self):
+        """
+        Learn the states left in the buffer from the rewards of the rest of the episode
+        """
+        if self.trajectory:
+            self.push(-1)
+            while len(self.buffer):
+                self.update_oldest(self.discounted_rewards)
+
+        self.discounted_rewards = 0.0
+        super().reset()
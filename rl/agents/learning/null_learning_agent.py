@@ -9,6 +9,9 @@ class NullLearning(LearningAgent):
     agent is not required, and only a policy agent is desired for building an agent.
     """
 
+    # Only the last two steps are needed to learn the transitions
+    trajectory_window: int = 2
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
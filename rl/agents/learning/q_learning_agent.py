@@ -0,0 +1,23 @@
+#! /usr/bin/env python3
+import numpy
+
+from rl.agents.learning.action_value_agent import ActionValueAgent
+
+
+class QLearning(ActionValueAgent):
+    """
+    Applies the off-policy Q-learning algorithm as a learning algorithm
+    Qt+1(s, a) = Qt(s, a) + alpha * (reward + gamma * max_a' Qt(s', a') - Qt(s, a))
+    Where alpha is the learning rate passed in by the user and gamma is the discount rate. The maximum is taken over
+    the actions that have been learned from s', a state without any is worth nothing. The opponent of an adversarial
+    agent takes the minimum instead.
+    """
+
+    def next_value(self, row: numpy.ndarray, opponent: bool) -> float:
+        """
+        :param row: The action values of the state the agent landed in
+        :param opponent: Whether the opponent of an adversarial agent moves from the state
+        :return: The value of the best action of the state for whoever moves from it
+        """
+        value = numpy.fmin.reduce(row) if opponent else numpy.fmax.reduce(row)
+        return 0.0 if value != value else value
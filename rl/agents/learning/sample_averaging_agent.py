@@ -1,7 +1,6 @@
 #! /usr/bin/env python3
 
 from rl.agents.learning import LearningAgent
-from rl.agents.reprs import Value, Transition
 
 
 class SampleAveraging(LearningAgent):
@@ -13,6 +12,9 @@ class SampleAveraging(LearningAgent):
     Where alpha is 1/N
     """
 
+    # Only the last two steps are learned from
+    trajectory_window: int = 2
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -20,8 +22,10 @@ class SampleAveraging(LearningAgent):
         """
         Apply sample averaging learning and update the state and values of this agent
         """
-        current_transition: Transition = self.trajectory[-1]
-        current_value: Value = self.state_values[current_transition.state]
-        current_value.count += 1
-        current_value.value += (1 / current_value.count) * (current_transition.reward - current_value.value)
-        self.state_values[current_transition.state] = current_value
+        current_index = self.trajectory.state_id(-1)
+        reward = self.trajectory.reward(-1)
+        values = self.state_values.values
+        counts = self.state_values.counts
+
+        counts[current_index] += 1
+        values[current_index] += (1 / counts[current_index]) * (reward - values[current_index])
@@ -0,0 +1,23 @@
+#! /usr/bin/env python3
+import numpy
+
+from rl.agents.learning.action_value_agent import ActionValueAgent
+
+
+class Sarsa(ActionValueAgent):
+    """
+    Applies the on-policy SARSA algorithm as a learning algorithm
+    Qt+1(s, a) = Qt(s, a) + alpha * (reward + gamma * Qt(s', a') - Qt(s, a))
+    Where alpha is the learning rate passed in by the user, gamma is the discount rate and a' is the action the agent
+    committed to from s'. An action that has never been learned is worth nothing. The action an opponent committed to
+    is learned the same way, so adversarial agents need nothing else.
+    """
+
+    def next_value(self, row: numpy.ndarray, opponent: bool) -> float:
+        """
+        :param row: The action values of the state the agent landed in
+        :param opponent: Whether the opponent of an adversarial agent moves from the state, which makes no difference
+        :return: The value of the action committed to from the state
+        """
+        value = row[self.trajectory.action(-1)]
+        return 0.0 if value != value else value
@@ -0,0 +1,75 @@
+#! /usr/bin/env python3
+
+from rl.agents.learning import LearningAgent
+from rl.agents.reprs.eligibility_traces import EligibilityTraces
+
+
+class TemporalDifferenceLambda(LearningAgent):
+    """
+    Applies the temporal difference lambda (TD(lambda)) algorithm with eligibility traces as a learning algorithm
+    delta = reward + gamma * Vt(s') - Vt(s)
+    Vt+1(x) = Vt(x) + alpha * delta * e(x) for every state x with an active trace e(x)
+    Where alpha is the learning rate, gamma is the discount rate and the traces decay by gamma * lambda every step.
+    The value of a state includes the reward the agent received in it. Learning is online: every step updates the
+    previous state and the states before it through their traces, and the last state of the episode is learned from
+    its reward when the agent is reset.
+    """
+
+    # Only the last two steps are learned from
+    trajectory_window: int = 2
+
+    def __init__(self, learning_rate: float, discount_rate: float, trace_decay: float, replacing_traces: bool = False,
+                 trace_threshold: float = 1e-4, *args, **kwargs):
+        """
+        Represents an agent learning with temporal difference and eligibility traces
+        :param learning_rate: The constant step size alpha
+        :param discount_rate: The proportion of the future rewards applies to earlier states
+        :param trace_decay: Lambda, 0 learns like TD(0) and 1 like TD(1)
+        :param replacing_traces: Reset the trace of a revisited state to 1 instead of accumulating it
+        :param trace_threshold: Traces that decay below this are pruned
+        """
+        super().__init__(*args, **kwargs)
+        self.learning_rate: float = learning_rate
+        self.discount_rate: float = discount_rate
+        self.trace_decay: float = trace_decay
+        self.eligibility = EligibilityTraces(replacing=replacing_traces, threshold=trace_threshold)
+        self.trace: float = 0
+
+    def learn_value(self):
+        """
+        Apply temporal difference lambda learning to the previous state and update the states with active traces
+        """
+        current_index = self.trajectory.state_id(-1)
+        previous_index = self.trajectory.state_id(-2)
+
+        self.state_values.counts[current_index] += 1
+        target = self.trajectory.reward(-2) + self.discount_rate * self.state_values.values[current_index]
+        self.update(previous_index, target)
+
+    def update(self, index: int, target: float):
+        """
+        Move the value of a state towards a target and the values of the states before it along their traces
+        :param index: The slot of the state
+        :param target: The target of the state's value
+        """
+        self.eligibility.visit(index)
+
+        # Unbiased constant step size trick
+        self.trace = self.trace + self.learning_rate * (1 - self.trace)
+        step_size = self.learning_rate / self.trace
+
+        values = self.state_values.values
+        delta = target - values[index]
+        values[self.eligibility.active_ids] += step_size * delta * self.eligibility.active_traces
+
+        self.eligibility.decay(self.discount_rate * self.trace_decay)
+
+    def reset(self):
+        """
+        Learn the last state of the episode from its reward and drop the traces of the episode
+        """
+        if self.trajectory:
+            self.update(self.trajectory.state_id(-1), self.trajectory.reward(-1))
+
+        self.eligibility.clear()
+        super().reset()
@@ -2,7 +2,24 @@
 import numpy
 
 from rl.agents.learning import LearningAgent
-from rl.agents.reprs import Value
+
+
+def episode_returns(rewards: numpy.ndarray, discount_rate: float) -> numpy.ndarray:
+    """
+    The return TD(1) learns every step of an episode from, in linear time and memory
+    G_i = sum_{j < i} gamma^(n - 1 - j) * r_j + gamma^(n - 1 - i) * sum_{j >= i} r_j
+    Where n is the length of the episode and gamma the discount rate.
+    :param rewards: The reward of every step of the episode
+    :param discount_rate: The discount rate gamma
+    :return: The return of every step
+    """
+    discounts = numpy.power(float(discount_rate), numpy.arange(len(rewards) - 1, -1, -1))
+
+    # The discounted rewards of the steps before i and the rewards from i to the end of the episode
+    before = numpy.zeros(len(rewards))
+    numpy.cumsum((discounts * rewards)[:-1], out=before[1:])
+    after = numpy.cumsum(rewards[::-1])[::-1]
+    return before + discounts * after
 
 
 class TemporalDifferenceOne(LearningAgent):
@@ -28,37 +45,23 @@ class TemporalDifferenceOne(LearningAgent):
         """
         For this agent keep track of how many times it has visited the latest state
         """
-        current_transition = self.trajectory[-1]
-        current_value: Value = self.state_values[current_transition.state]
-        current_value.count += 1
+        self.state_values.counts[self.trajectory.state_id(-1)] += 1
 
     def reset(self):
         """
         Reset the trajectory of the agent for this episode and applies the TD(1) learning algorithm.
         """
-        n = len(self.trajectory)
-        discount_rates = numpy.zeros(shape=(n, n), dtype='f4')
-        rewards = numpy.zeros(n, dtype='f4')
-        values = numpy.zeros(n, dtype='f4')
-
-        for i, transition in enumerate(self.trajectory):
-            for j in range(0, i):
-                discount_rates[i][j] = self.discount_rate ** (n - 1 - j)
-
-            for j in range(i, n):
-                discount_rates[i][j] = self.discount_rate ** (n - 1 - i)
+        if not self.trajectory:
+            return
 
-            rewards[i] = transition.reward
-            values[i] = self.state_values[transition.state].value
+        rewards = self.trajectory.ordered_rewards()
+        indices = self.trajectory.ordered_state_ids()
 
         # Unbiased constant step size trick
         self.trace = self.trace + self.learning_rate * (1 - self.trace)
         step_size = self.learning_rate / self.trace
 
-        values = discount_rates.dot(rewards) - values
-        for i, transition in enumerate(self.trajectory):
-            value = self.state_values[transition.state]
-            value.value = step_size * values[i]
-            self.state_values[transition.state] = value
+        values = episode_returns(rewards, self.discount_rate) - self.state_values.values[indices]
+        self.state_values.values[indices] = step_size * values
 
         self.trajectory.clear()
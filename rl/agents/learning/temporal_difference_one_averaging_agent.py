@@ -1,10 +1,8 @@
 #! /usr/bin/env python3
 from typing import Callable
 
-import numpy
-
 from rl.agents.learning import LearningAgent
-from rl.agents.reprs import Value
+from rl.agents.learning.temporal_difference_one_agent import episode_returns
 
 
 class TemporalDifferenceOneAveraging(LearningAgent):
@@ -29,33 +27,19 @@ class TemporalDifferenceOneAveraging(LearningAgent):
         """
         For this agent keep track of how many times it has visited the latest state
         """
-        current_transition = self.trajectory[-1]
-        current_value: Value = self.state_values[current_transition.state]
-        current_value.count += 1
+        self.state_values.counts[self.trajectory.state_id(-1)] += 1
 
     def reset(self):
         """
         Reset the trajectory of the agent for this episode and applies the TD(1) learning algorithm.
         """
-        n = len(self.trajectory)
-        discount_rates = numpy.zeros(shape=(n, n), dtype='f4')
-        rewards = numpy.zeros(n, dtype='f4')
-        values = numpy.zeros(n, dtype='f4')
-
-        for i, transition in enumerate(self.trajectory):
-            for j in range(0, i):
-                discount_rates[i][j] = self.discount_rate ** (n - 1 - j)
-
-            for j in range(i, n):
-                discount_rates[i][j] = self.discount_rate ** (n - 1 - i)
-
-            rewards[i] = transition.reward
-            values[i] = self.state_values[transition.state].value
-
-        values = discount_rates.dot(rewards) - values
-        for i, transition in enumerate(self.trajectory):
-            value = self.state_values[transition.state]
-            value.value = values[i] / value.count
-            self.state_values[transition.state] = value
+        if not self.trajectory:
+            return
+
+        rewards = self.trajectory.ordered_rewards()
+        indices = self.trajectory.ordered_state_ids()
+
+        values = episode_returns(rewards, self.discount_rate) - self.state_values.values[indices]
+        self.state_values.values[indices] = values / self.state_values.counts[indices]
 
         self.trajectory.clear()
@@ -1,7 +1,6 @@
 #! /usr/bin/env python3
 
 from rl.agents.learning import LearningAgent
-from rl.agents.reprs import Value
 
 
 class TemporalDifferenceZero(LearningAgent):
@@ -11,6 +10,9 @@ class TemporalDifferenceZero(LearningAgent):
     Where alpha is the learning rate passed in by the user and gamma is the discount rate.
     """
 
+    # Only the last two steps are learned from
+    trajectory_window: int = 2
+
     def __init__(self, learning_rate: float, discount_rate: float, *args, **kwargs):
         """
         Represents an agent learning with temporal difference
@@ -25,22 +27,19 @@ class TemporalDifferenceZero(LearningAgent):
         """
         Apply temporal difference zero learning and update the state and values of this agent
         """
-        current_transition = self.trajectory[-1]
-        current_value: Value = self.state_values[current_transition.state]
-        current_value.count += 1
-        current_value.value += current_transition.reward
+        current_index = self.trajectory.state_id(-1)
+        previous_index = self.trajectory.state_id(-2)
+        values = self.state_values.values
+        counts = self.state_values.counts
+
+        counts[current_index] += 1
+        values[current_index] += self.trajectory.reward(-1)
 
         # Unbiased constant step size trick
         self.trace = self.trace + self.learning_rate * (1 - self.trace)
 
-        if current_value.value != 0:
-            previous_transition = self.trajectory[-2]
-            previous_value: Value = self.state_values[previous_transition.state]
+        if values[current_index] != 0:
             step_size = self.learning_rate / self.trace
 
-            previous_value.value += step_size * (
-                    self.discount_rate * current_value.value - previous_value.value)
-
-            self.state_values[previous_transition.state] = previous_value
-
-        self.state_values[current_transition.state] = current_value
+            values[previous_index] += step_size * (
+                    self.discount_rate * values[current_index] - values[previous_index])
@@ -1,7 +1,6 @@
 #! /usr/bin/env python3
 
 from rl.agents.learning import LearningAgent
-from rl.agents.reprs import Value
 
 
 class TemporalDifferenceZeroAveraging(LearningAgent):
@@ -11,6 +10,9 @@ class TemporalDifferenceZeroAveraging(LearningAgent):
     Where alpha is the learning rate at 1/N and gamma is the discount rate.
     """
 
+    # Only the last two steps are learned from
+    trajectory_window: int = 2
+
     def __init__(self, discount_rate: float, *args, **kwargs):
         """
         Represents an agent learning with temporal difference
@@ -23,18 +25,14 @@ class TemporalDifferenceZeroAveraging(LearningAgent):
         """
         Apply temporal difference zero learning and update the state and values of this agent
         """
-        current_transition = self.trajectory[-1]
-        current_value: Value = self.state_values[current_transition.state]
-        current_value.count += 1
-        current_value.value += current_transition.reward
-
-        if current_value.value != 0:
-            previous_transition = self.trajectory[-2]
-            previous_value: Value = self.state_values[previous_transition.state]
-
-            previous_value.value += (1 / previous_value.count) * (
-                    self.discount_rate * current_value.value - previous_value.value)
+        current_index = self.trajectory.state_id(-1)
+        previous_index = self.trajectory.state_id(-2)
+        values = self.state_values.values
+        counts = self.state_values.counts
 
-            self.state_values[previous_transition.state] = previous_value
+        counts[current_index] += 1
+        values[current_index] += self.trajectory.reward(-1)
 
-        self.state_values[current_transition.state] = current_value
+        if values[current_index] != 0:
+            values[previous_index] += (1 / counts[previous_index]) * (
+                    self.discount_rate * values[current_index] - values[previous_index])
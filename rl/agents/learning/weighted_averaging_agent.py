@@ -1,7 +1,6 @@
 #! /usr/bin/env python3
 
 from rl.agents.learning import LearningAgent
-from rl.agents.reprs import Value
 
 
 class WeightedAveraging(LearningAgent):
@@ -13,6 +12,9 @@ class WeightedAveraging(LearningAgent):
     Where alpha is some real number between 0 and 1
     """
 
+    # Only the last two steps are learned from
+    trajectory_window: int = 2
+
     def __init__(self, learning_rate, *args, **kwargs):
         """
         Represents an agent learning with temporal difference
@@ -26,12 +28,10 @@ class WeightedAveraging(LearningAgent):
         """
         Apply temporal difference learning and update the state and values of this agent
         """
-
-        current_transition = self.trajectory[-1]
-        current_value: Value = self.state_values[current_transition.state]
+        current_index = self.trajectory.state_id(-1)
+        values = self.state_values.values
 
         self.trace = self.trace + self.learning_rate * (1 - self.trace)
         step_size = self.learning_rate / self.trace
 
-        current_value.value += step_size * (current_transition.reward - current_value.value)
-        self.state_values[current_transition.state] = current_value
+        values[current_index] += step_size * (self.trajectory.reward(-1) - values[current_index])
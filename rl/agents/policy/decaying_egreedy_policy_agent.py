@@ -1,21 +1,25 @@
 #! /usr/bin/env python3
 
+from typing import Tuple
+
 import numpy
 
 from .policy_agent import PolicyAgent
 
 
 class DecayingEGreedy(PolicyAgent):
-    def __init__(self, exploratory_rate: float, decay_rate: float, *args, **kwargs):
+    def __init__(self, exploratory_rate: float, decay_rate: float, *args, expected: bool = False, **kwargs):
         """
         This agent implements a method that picks an action using an egreedy policy
         :param exploratory_rate: The probably of selecting an action at random from a uniform distribution
+        :param expected: Score actions by the expected value of their next states instead of a sampled next state
         """
         super().__init__(*args, **kwargs)
         self.initial_exploratory_rate = exploratory_rate
         self.exploratory_rate = exploratory_rate
         self.decay_rate = decay_rate
         self.previous_value = 0
+        self.expected = expected
 
     def decay_exploratory_rate(self):
         self.exploratory_rate = self.exploratory_rate * numpy.exp(-1 * self.decay_rate)
@@ -44,40 +48,29 @@ class DecayingEGreedy(PolicyAgent):
         if e < self.exploratory_rate:
             action: int = numpy.random.choice(available_actions)
         else:
-            action, state = self.greedy_action(state, available_actions)
-            value = self.value_model(state)
+            action, value = self.greedy_action(state, available_actions)
 
             if value < self.previous_value:
                 self.reset_exploratory_rate()
 
         return action
 
-    def greedy_action(self, state: numpy.ndarray, available_actions: numpy.ndarray) -> int:
+    def greedy_action(self, state: numpy.ndarray, available_actions: numpy.ndarray) -> Tuple[int, float]:
         """
         Select the action with the associated maximum value
         :param state: The current state of the board along with the current mark this agent represents
         :param available_actions: A list of available possible actions (positions on the board to mark)
-        :return: The action with the highest value
+        :return: The action with the highest value and its value, -inf if no action has been taken from this state
         """
-        max_value: float = float("-inf")
-        max_index: int = 0
-
-        for index, action in enumerate(available_actions):
-            probabilities: numpy.ndarray
-            states: numpy.ndarray
-            probabilities, states = self.transition_model(state.copy(), action)
-
-            if probabilities.any():
-                transition_index = numpy.random.choice(numpy.arange(len(states)), p=probabilities)
-                next_state: numpy.ndarray = states[transition_index]
-                next_value: float = self.value_model(next_state)
-            else:
-                self.reset_exploratory_rate()
-                continue
-
-            if next_value > max_value:
-                max_index: int = index
-                max_value: float = next_value
-                max_state = next_state
-
-        return available_actions[max_index], max_state
+        next_state_ids: numpy.ndarray
+        next_values: numpy.ndarray
+        next_state_ids, next_values = self.score_actions(state, available_actions, expected=self.expected)
+
+        # Actions that have never been taken from this state can not be scored and are worth exploring
+        observed = next_state_ids >= 0
+        if not observed.all():
+            self.reset_exploratory_rate()
+
+        next_values = numpy.where(observed, next_values, float("-inf"))
+        max_index: int = next_values.argmax()
+        return available_actions[max_index], next_values[max_index]
@@ -6,13 +6,15 @@ from .policy_agent import PolicyAgent
 
 
 class EGreedy(PolicyAgent):
-    def __init__(self, exploratory_rate: float, *args, **kwargs):
+    def __init__(self, exploratory_rate: float, *args, expected: bool = False, **kwargs):
         """
         This agent implements a method that picks an action using an egreedy policy
         :param exploratory_rate: The probably of selecting an action at random from a uniform distribution
+        :param expected: Score actions by the expected value of their next states instead of a sampled next state
         """
         super().__init__(*args, **kwargs)
         self.exploratory_rate = exploratory_rate
+        self.expected = expected
 
     def act(self, state: numpy.ndarray, available_actions: numpy.ndarray) -> int:
         """
@@ -46,23 +48,10 @@ class EGreedy(PolicyAgent):
         :param available_actions: A list of available possible actions (positions on the board to mark)
         :return: The action with the highest value
         """
-        max_value: float = float("-inf")
-        max_index: int = 0
+        next_state_ids: numpy.ndarray
+        next_values: numpy.ndarray
+        next_state_ids, next_values = self.score_actions(state, available_actions, expected=self.expected)
 
-        for index, action in enumerate(available_actions):
-            probabilities: numpy.ndarray
-            states: numpy.ndarray
-            probabilities, states = self.transition_model(state.copy(), action)
-
-            if probabilities.any():
-                transition_index = numpy.random.choice(numpy.arange(len(states)), p=probabilities)
-                next_state: numpy.ndarray = states[transition_index]
-                next_value: float = self.value_model(next_state)
-            else:
-                continue
-
-            if next_value > max_value:
-                max_index: int = index
-                max_value: float = next_value
-
-        return available_actions[max_index]
+        # Actions that have never been taken from this state can not be scored
+        next_values = numpy.where(next_state_ids >= 0, next_values, float("-inf"))
+        return available_actions[next_values.argmax()]
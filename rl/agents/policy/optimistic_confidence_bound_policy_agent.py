@@ -1,23 +1,27 @@
 #! /usr/bin/env python3
 import sys
-from collections import defaultdict
 
 import numpy
 
+from rl.agents.reprs import ActionTable
 from .policy_agent import PolicyAgent
 
 
 class OptimisticConfidenceBound(PolicyAgent):
-    def __init__(self, confidence: float, decay_rate: float, *args, **kwargs):
+    def __init__(self, confidence: float, decay_rate: float, *args, expected: bool = False, **kwargs):
         """
-        This agent implements a method that picks an action using an egreedy policy
-        :param exploratory_rate: The probably of selecting an action at random from a uniform distribution
+        This agent implements a method that picks an action using an optimistic upper bound for every action that
+        decays as the action is taken. Bounds and counts are kept per state.
+        :param confidence: Scales the exploration bonus of the bound
+        :param decay_rate: How quickly the bound of an action decays each time it is taken
+        :param expected: Score actions by the expected value of their next states instead of a sampled next state
         """
         super().__init__(*args, **kwargs)
-        self.upper_bounds = defaultdict(lambda: sys.float_info.max)
-        self.action_counts = defaultdict(lambda: 1)
+        self.upper_bounds = ActionTable(states=self.state_values.states, fill=sys.float_info.max)
+        self.action_counts = ActionTable(states=self.state_values.states, fill=1.0)
         self.decay_rate = decay_rate
         self.confidence = confidence
+        self.expected = expected
 
     def decay(self, bound, state):
         new_bound = bound * numpy.exp(-1 * self.decay_rate) + 1
@@ -34,9 +38,13 @@ class OptimisticConfidenceBound(PolicyAgent):
         :return: an action
         """
         action = self.greedy_action(state, available_actions)
-        self.action_counts[action] += 1
+        canonical_action = self.state_values.states.canonical_actions(state, action)
+        state_index = self.action_counts.slot(state, [canonical_action])
+        self.action_counts.values[state_index, canonical_action] += 1
 
-        self.upper_bounds[action] = self.decay(self.upper_bounds[action], state)
+        state_index = self.upper_bounds.slot(state, [canonical_action])
+        upper_bounds = self.upper_bounds.values
+        upper_bounds[state_index, canonical_action] = self.decay(upper_bounds[state_index, canonical_action], state)
         return action
 
     def greedy_action(self, state: numpy.ndarray, available_actions: numpy.ndarray) -> int:
@@ -46,26 +54,17 @@ class OptimisticConfidenceBound(PolicyAgent):
         :param available_actions: A list of available possible actions (positions on the board to mark)
         :return: The action with the highest value
         """
-        max_value: float = float("-inf")
-        max_index: int = 0
+        next_state_ids: numpy.ndarray
+        next_values: numpy.ndarray
+        next_state_ids, next_values = self.score_actions(state, available_actions, expected=self.expected)
 
-        for index, action in enumerate(available_actions):
-            probabilities: numpy.ndarray
-            states: numpy.ndarray
-            probabilities, states = self.transition_model(state.copy(), action)
+        canonical_actions = self.state_values.states.canonical_actions(state, available_actions)
+        state_index = self.upper_bounds.slot(state, canonical_actions)
+        self.action_counts.slot(state, canonical_actions)
+        upper_bounds = self.upper_bounds.values[state_index, canonical_actions]
+        action_counts = self.action_counts.values[state_index, canonical_actions]
+        next_values += self.confidence * numpy.sqrt(numpy.log(upper_bounds) / action_counts)
 
-            if probabilities.any():
-                transition_index = numpy.random.choice(numpy.arange(len(states)), p=probabilities)
-                next_state: numpy.ndarray = states[transition_index]
-                confidence_bound = numpy.log(self.upper_bounds[action]) / self.action_counts[action]
-                confidence_bound = self.confidence * numpy.sqrt(confidence_bound)
-                next_value: float = self.value_model(next_state)
-                next_value += confidence_bound
-            else:
-                continue
-
-            if next_value > max_value:
-                max_index: int = index
-                max_value: float = next_value
-
-        return available_actions[max_index]
+        # Actions that have never been taken from this state can not be scored
+        next_values = numpy.where(next_state_ids >= 0, next_values, float("-inf"))
+        return available_actions[next_values.argmax()]
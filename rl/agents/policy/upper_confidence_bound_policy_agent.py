@@ -1,21 +1,22 @@
 #! /usr/bin/env python3
-from collections import defaultdict
-
 import numpy
 
+from rl.agents.reprs import ActionTable
 from .policy_agent import PolicyAgent
 
 
 class UpperConfidenceBound(PolicyAgent):
-    def __init__(self, confidence: float, *args, **kwargs):
+    def __init__(self, confidence: float, *args, expected: bool = False, **kwargs):
         """
-        This agent implements a method that picks an action using an egreedy policy
-        :param exploratory_rate: The probably of selecting an action at random from a uniform distribution
+        This agent implements a method that picks an action using an upper confidence bound policy. How many times
+        every action has been taken is counted per state, so the bound stays correct when there is more than one state.
+        :param confidence: Scales the exploration bonus of actions that have rarely been taken from a state
+        :param expected: Score actions by the expected value of their next states instead of a sampled next state
         """
         super().__init__(*args, **kwargs)
-        self.action_counts = defaultdict(lambda: 1)
+        self.action_counts = ActionTable(states=self.state_values.states, fill=1.0)
         self.confidence = confidence
-        self.time = 1
+        self.expected = expected
 
     def act(self, state: numpy.ndarray, available_actions: numpy.ndarray) -> int:
         """
@@ -25,8 +26,9 @@ class UpperConfidenceBound(PolicyAgent):
         :return: an action
         """
         action = self.greedy_action(state, available_actions)
-        self.action_counts[action] += 1
-        self.time += 1
+        canonical_action = self.state_values.states.canonical_actions(state, action)
+        state_index = self.action_counts.slot(state, [canonical_action])
+        self.action_counts.values[state_index, canonical_action] += 1
         return action
 
     def greedy_action(self, state: numpy.ndarray, available_actions: numpy.ndarray) -> int:
@@ -36,25 +38,18 @@ class UpperConfidenceBound(PolicyAgent):
         :param available_actions: A list of available possible actions (positions on the board to mark)
         :return: The action with the highest value
         """
-        max_value: float = float("-inf")
-        max_index: int = 0
-
-        for index, action in enumerate(available_actions):
-            probabilities: numpy.ndarray
-            states: numpy.ndarray
-            probabilities, states = self.transition_model(state.copy(), action)
-
-            if probabilities.any():
-                transition_index = numpy.random.choice(numpy.arange(len(states)), p=probabilities)
-                next_state: numpy.ndarray = states[transition_index]
-                confidence_bound = numpy.log(self.time) / self.action_counts[action]
-                confidence_bound = self.confidence * numpy.sqrt(confidence_bound)
-                next_value: float = self.value_model(next_state) + confidence_bound
-            else:
-                continue
-
-            if next_value > max_value:
-                max_index: int = index
-                max_value: float = next_value
-
-        return available_actions[max_index]
+        next_state_ids: numpy.ndarray
+        next_values: numpy.ndarray
+        next_state_ids, next_values = self.score_actions(state, available_actions, expected=self.expected)
+
+        # Every count starts at one, so the time spent in this state is one more than the visits beyond that
+        canonical_actions = self.state_values.states.canonical_actions(state, available_actions)
+        state_index = self.action_counts.slot(state, canonical_actions)
+        action_counts = self.action_counts.values[state_index]
+        time = action_counts.sum() - len(action_counts) + 1
+
+        next_values += self.confidence * numpy.sqrt(numpy.log(time) / action_counts[canonical_actions])
+
+        # Actions that have never been taken from this state can not be scored
+        next_values = numpy.where(next_state_ids >= 0, next_values, float("-inf"))
+        return available_actions[next_values.argmax()]
@@ -1,2 +1,12 @@
+from .action_table import ActionTable
+from .eligibility_traces import EligibilityTraces
+from .ring_buffer import RingBuffer
+from .shared_array import SharedArray
+from .shared_value_table import SharedValueTable
+from .state_index import StateIndex
+from .successor_table import SuccessorTable
+from .trajectory_buffer import TrajectoryBuffer
 from .transition import Transition
+from .transition_table import TransitionTable
 from .value import Value
+from .value_table import ValueTable
@@ -0,0 +1,162 @@
+#! /usr/bin/env python3
+from typing import Union
+
+import numpy
+
+from rl.agents.reprs.state_index import StateIndex
+
+
+class ActionTable:
+    """
+    Dense per state-action statistics. Row i of the array holds the statistic of every action taken from the state with
+    id i in the state index, and both dimensions grow geometrically as new states and actions show up. Entries that
+    have never been written hold the fill value. Actions must be non-negative integers.
+    """
+    # Whether the array is shared with forks of the table and must be copied before it is written to
+    copy_on_write: bool = False
+
+    def __init__(self, states: StateIndex = None, fill: float = 0.0, dtype: Union[str, numpy.dtype] = numpy.float64,
+                 capacity: int = 1024):
+        """
+        :param states: The index used to intern states, a new one is created if not given
+        :param fill: The initial value of every entry
+        :param dtype: The type of the entries
+        :param capacity: The number of states to allocate room for up front
+        """
+        self.states: StateIndex = StateIndex() if states is None else states
+        self.fill = fill
+        self.values: numpy.ndarray = numpy.full((max(capacity, len(self.states), 1), 1), fill, dtype=dtype)
+
+    @classmethod
+    def from_array(cls, values: numpy.ndarray, states: StateIndex, fill: float = 0.0) -> "ActionTable":
+        """
+        Build a table from the array of another table, such as a column of a saved policy
+        :param values: The statistic of every action of every state, ordered by state id
+        :param states: The index of the states
+        :param fill: The value of the entries that have never been written
+        :return: The table, its entries are of the type of the array
+        """
+        table = cls(states=states, fill=fill, dtype=values.dtype, capacity=len(values))
+        table.reserve(len(values), values.shape[1])
+        table.values[:len(values), :values.shape[1]] = values
+        return table
+
+    def __getstate__(self):
+        # Do not pickle the unused capacity at the end of the array
+        return {"states": self.states, "fill": self.fill, "values": self.values[:len(self.states)].copy()}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def fork(self) -> "ActionTable":
+        """
+        Copy the table in constant time. The copy shares the state index and the array of this table, which is
+        read-only until one of the tables writes through slot or row, which gives that table its own copy first.
+        :return: The copy
+        """
+        table = self.__class__.__new__(self.__class__)
+        table.__dict__.update(self.__dict__)
+
+        self.values.flags.writeable = False
+        self.copy_on_write = table.copy_on_write = True
+        return table
+
+    def own(self):
+        """
+        Copy the array this table shares with its forks, so that writing to it does not change the forks
+        """
+        if self.copy_on_write:
+            self.values = self.values.copy()
+            self.copy_on_write = False
+
+    def unwritten(self, values: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param values: Entries of the table
+        :return: Whether every entry still holds the fill value
+        """
+        return numpy.isnan(values) if numpy.isnan(self.fill) else values == self.fill
+
+    def reserve(self, num_states: int, num_actions: int):
+        """
+        Make sure the array has room for num_states states and num_actions actions
+        :param num_states: The number of states the array must hold
+        :param num_actions: The number of actions the array must hold
+        """
+        height, width = self.values.shape
+        if num_states <= height and num_actions <= width:
+            return
+
+        height = max(num_states, 2 * height) if num_states > height else height
+        width = max(num_actions, 2 * width) if num_actions > width else width
+        values = numpy.full((height, width), self.fill, dtype=self.values.dtype)
+        values[:self.values.shape[0], :self.values.shape[1]] = self.values
+        self.values = values
+
+        # Growing copied the array
+        self.copy_on_write = False
+
+    def slot(self, state, actions: numpy.ndarray = None) -> int:
+        """
+        Find the row of a state, adding the state to the index if it is new.
+        The array may be reallocated, so fetch it after every call to slot.
+        :param state: The state of the environment
+        :param actions: Actions that will be looked up or written in the row of the state
+        :return: The row of the state
+        """
+        index = self.states.intern(state)
+        self.own()
+        self.reserve(index + 1, int(numpy.max(actions)) + 1 if actions is not None and len(actions) else 1)
+        return index
+
+    def row(self, state_id: int, action: int = 0) -> numpy.ndarray:
+        """
+        Make room for an action of a state that is already interned and return the row of the state, which may be
+        written to. The array may be reallocated, so rows fetched before are stale.
+        :param state_id: The id of the state
+        :param action: An action that will be looked up or written in the row
+        :return: The statistic of every action of the state
+        """
+        self.own()
+        self.reserve(state_id + 1, action + 1)
+        return self.values[state_id]
+
+    def gather(self, state_id: int, actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Look up the statistics of many actions of a state at once without adding anything to the table
+        :param state_id: The id of the state, -1 if it has never been interned
+        :param actions: The actions
+        :return: The statistic of every action, the fill value for actions the table has no room for
+        """
+        height, width = self.values.shape
+        if state_id < 0 or state_id >= height:
+            return numpy.full(len(actions), self.fill, dtype=self.values.dtype)
+
+        row = self.values[state_id]
+        if not len(actions) or actions.max() < width:
+            return row[actions]
+        return numpy.where(actions < width, row[numpy.minimum(actions, width - 1)], self.fill)
+
+    def merge(self, other: "ActionTable"):
+        """
+        Combine the entries of another table with this one. Entries only one of the tables has written take the value
+        of that table and entries both have written are averaged.
+        :param other: Another action table, its states do not need to share this table's index
+        """
+        state_ids = self.states.align(other.states)
+        self.own()
+        self.reserve(len(self.states), other.values.shape[1])
+
+        width = other.values.shape[1]
+        other_values = numpy.full((len(state_ids), width), other.fill, dtype=self.values.dtype)
+        rows = min(len(state_ids), other.values.shape[0])
+        other_values[:rows] = other.values[:rows]
+
+        values = self.values[state_ids, :width]
+        unwritten = self.unwritten(values)
+        other_unwritten = other.unwritten(other_values)
+
+        merged = numpy.where(unwritten, other_values, values)
+        both = ~unwritten & ~other_unwritten
+        merged[both] = (values[both] + other_values[both]) / 2
+        merged[unwritten & other_unwritten] = self.fill
+        self.values[state_ids, :width] = merged
@@ -0,0 +1,81 @@
+#! /usr/bin/env python3
+import numpy
+
+
+class EligibilityTraces:
+    """
+    Sparse eligibility traces of the states an agent has visited during an episode. The ids of the states whose traces
+    are active and their traces are kept in two compact arrays. Traces that decay below a threshold are pruned, so
+    updating every active trace takes time proportional to the number of active traces rather than to the length of
+    the episode.
+    """
+
+    def __init__(self, replacing: bool = False, threshold: float = 1e-4, capacity: int = 64):
+        """
+        :param replacing: Reset the trace of a revisited state to 1 instead of adding 1 to it
+        :param threshold: Traces that decay below this are pruned
+        :param capacity: The number of traces to allocate room for up front
+        """
+        self.replacing: bool = replacing
+        self.threshold: float = threshold
+
+        self.state_ids: numpy.ndarray = numpy.zeros(max(capacity, 1), dtype=numpy.int64)
+        self.traces: numpy.ndarray = numpy.zeros(max(capacity, 1), dtype=numpy.float64)
+        self.size: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def active_ids(self) -> numpy.ndarray:
+        """
+        :return: The ids of the states whose traces are active
+        """
+        return self.state_ids[:self.size]
+
+    @property
+    def active_traces(self) -> numpy.ndarray:
+        """
+        :return: The traces of the active states, in the order of their ids
+        """
+        return self.traces[:self.size]
+
+    def visit(self, state_id: int):
+        """
+        Add 1 to the trace of a state, or set it to 1 if traces are replacing
+        :param state_id: The id of the visited state
+        """
+        positions = numpy.flatnonzero(self.active_ids == state_id)
+        if len(positions):
+            position = positions[0]
+            self.traces[position] = 1.0 if self.replacing else self.traces[position] + 1.0
+            return
+
+        if self.size == len(self.state_ids):
+            self.state_ids = numpy.resize(self.state_ids, 2 * self.size)
+            self.traces = numpy.resize(self.traces, 2 * self.size)
+
+        self.state_ids[self.size] = state_id
+        self.traces[self.size] = 1.0
+        self.size += 1
+
+    def decay(self, factor: float):
+        """
+        Multiply every trace by a factor and prune the traces that fall below the threshold
+        :param factor: The decay of one step, gamma * lambda
+        """
+        traces = self.active_traces
+        traces *= factor
+
+        keep = numpy.abs(traces) >= self.threshold
+        if not keep.all():
+            size = int(numpy.count_nonzero(keep))
+            self.state_ids[:size] = self.active_ids[keep]
+            self.traces[:size] = traces[keep]
+            self.size = size
+
+    def clear(self):
+        """
+        Drop every trace, such as at the end of an episode
+        """
+        self.size = 0
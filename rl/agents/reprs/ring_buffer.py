@@ -0,0 +1,68 @@
+#! /usr/bin/env python3
+from typing import Tuple
+
+import numpy
+
+
+class RingBuffer:
+    """
+    First-in first-out buffer of the latest transitions of an agent. The slots of their states, their actions and their
+    rewards are stored in three preallocated arrays that are written in a circle, so pushing and popping a transition
+    takes constant time and the buffer never grows.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: The number of transitions the buffer holds
+        """
+        self.state_ids: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.int64)
+        self.actions: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.int64)
+        self.rewards: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.float64)
+
+        # Position of the oldest transition and the number of transitions in the buffer
+        self.start: int = 0
+        self.size: int = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def capacity(self) -> int:
+        return len(self.rewards)
+
+    def push(self, state_id: int, action: int, reward: float):
+        """
+        Append a transition
+        :param state_id: The slot of the state of the transition
+        :param action: The action taken from the state
+        :param reward: The reward of the transition
+        """
+        assert self.size < self.capacity, "The ring buffer is full"
+
+        position = (self.start + self.size) % self.capacity
+        self.state_ids[position] = state_id
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.size += 1
+
+    def pop(self) -> Tuple[int, int, float]:
+        """
+        Remove the oldest transition
+        :return: The slot of its state, its action and its reward
+        """
+        assert self.size, "The ring buffer is empty"
+
+        position = self.start
+        self.start = (self.start + 1) % self.capacity
+        self.size -= 1
+        return int(self.state_ids[position]), int(self.actions[position]), float(self.rewards[position])
+
+    def ordered_rewards(self) -> numpy.ndarray:
+        """
+        :return: The rewards of the transitions from the oldest to the latest
+        """
+        return self.rewards[(self.start + numpy.arange(self.size)) % self.capacity]
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
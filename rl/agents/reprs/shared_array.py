@@ -0,0 +1,55 @@
+#! /usr/bin/env python3
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple, Union
+
+import numpy
+
+
+class SharedArray:
+    """
+    A numpy array in a block of shared memory. Pickling the array sends the name of the block rather than its data, so
+    a copy made in a worker process, or by deepcopy, is a view of the same memory and every write to it is seen by all
+    processes at once. The process that created the array owns the block and must unlink it when it is done.
+    """
+
+    def __init__(self, shape: Union[int, Tuple[int, ...]], dtype: Union[str, numpy.dtype], fill=0):
+        """
+        :param shape: The shape of the array
+        :param dtype: The type of the elements of the array
+        :param fill: The value every element starts with
+        """
+        self.shape: Tuple[int, ...] = tuple(numpy.atleast_1d(shape).tolist())
+        self.dtype: numpy.dtype = numpy.dtype(dtype)
+
+        size = int(numpy.prod(self.shape)) * self.dtype.itemsize
+        self.memory: SharedMemory = SharedMemory(create=True, size=max(size, 1))
+        self.array: numpy.ndarray = numpy.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)
+        self.array.fill(fill)
+
+    def __getstate__(self):
+        return {"name": self.memory.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.shape = state["shape"]
+        self.dtype = state["dtype"]
+        self.memory = SharedMemory(name=state["name"])
+        self.array = numpy.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def close(self):
+        """
+        Detach this process from the block. The array must not be used afterwards.
+        """
+        # The memory can not be unmapped while the array still exports it
+        self.array = None
+        self.memory.close()
+
+    def unlink(self):
+        """
+        Detach from the block and free it once every other process has detached as well
+        """
+        self.close()
+        self.memory.unlink()
@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+from typing import Union
+
+import numpy
+
+from rl.agents.reprs.shared_array import SharedArray
+from rl.agents.reprs.state_index import StateIndex
+from rl.agents.reprs.value_table import ValueTable
+
+
+class SharedValueTable(ValueTable):
+    """
+    Value table whose values and counts live in shared memory. Agents in different processes that are built from the
+    same table, whether it was pickled to them or forked by a builder, update the same arrays in place and without
+    locks, so parallel learners need no merge step. Updates that race may lose an increment, which lock-free
+    ("Hogwild") learning accepts in exchange for never waiting.
+
+    The arrays can not grow, so the state index must hold every state up front, such as a TicTacToeStateIndex.
+    """
+
+    def __init__(self, states: StateIndex, dtype: Union[str, numpy.dtype] = numpy.float64):
+        """
+        :param states: An index that already holds every state the table will see
+        :param dtype: The floating point type of the values and counts
+        """
+        self.states: StateIndex = states
+        self.dtype: numpy.dtype = numpy.dtype(dtype)
+
+        self.shared_values = SharedArray(max(len(states), 1), self.dtype)
+        self.shared_counts = SharedArray(max(len(states), 1), self.dtype)
+        self.values: numpy.ndarray = self.shared_values.array
+        self.counts: numpy.ndarray = self.shared_counts.array
+
+    def __getstate__(self):
+        return {"states": self.states, "dtype": self.dtype,
+                "shared_values": self.shared_values, "shared_counts": self.shared_counts}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.values = self.shared_values.array
+        self.counts = self.shared_counts.array
+
+    def fork(self) -> "SharedValueTable":
+        """
+        :return: This table, every agent made from a shared table updates the same arrays
+        """
+        return self
+
+    def reserve(self, size: int):
+        if size > len(self.values):
+            raise ValueError(f"A shared value table holds {len(self.values)} states and can not grow to {size}")
+
+    def to_table(self) -> ValueTable:
+        """
+        :return: A private copy of the table that can be saved or keep growing
+        """
+        table = ValueTable(dtype=self.dtype, capacity=len(self.values), states=self.states)
+        table.values[:len(self.values)] = self.values
+        table.counts[:len(self.counts)] = self.counts
+        return table
+
+    def close(self):
+        """
+        Detach this process from the shared arrays
+        """
+        self.values = self.counts = None
+        self.shared_values.close()
+        self.shared_counts.close()
+
+    def unlink(self):
+        """
+        Free the shared arrays, only the process that created the table may do this once all workers are done
+        """
+        self.values = self.counts = None
+        self.shared_values.unlink()
+        self.shared_counts.unlink()
@@ -0,0 +1,118 @@
+#! /usr/bin/env python3
+from typing import Dict, List, Tuple, Union
+
+import numpy
+
+
+class StateIndex:
+    """
+    Interns states into dense integer ids. Tables keyed by state store their data in arrays indexed by these ids, so a
+    state is hashed once when it is interned and every other lookup is array indexing.
+    """
+
+    def __init__(self):
+        self.ids: Dict[Tuple[Union[float, int]], int] = {}
+        self.keys: List[Tuple[Union[float, int]]] = []
+
+    @classmethod
+    def from_keys(cls, keys: List[Tuple[Union[float, int]]]) -> "StateIndex":
+        """
+        :param keys: The key of every state, ordered by id
+        :return: An index of the states
+        """
+        index = cls()
+        index.__setstate__({"keys": keys})
+        return index
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getstate__(self):
+        # The id of a state is its position in keys, so the mapping is rebuilt on load instead of pickled twice
+        return {"keys": self.keys}
+
+    def __setstate__(self, state):
+        self.keys = state["keys"]
+        self.ids = {key: index for index, key in enumerate(self.keys)}
+
+    def fork(self) -> "StateIndex":
+        """
+        Forks of a table share its index rather than copy it. Ids are only ever appended, so a state one of them interns
+        gets the same id in all of them.
+        :return: This index
+        """
+        return self
+
+    def __contains__(self, state) -> bool:
+        return self.key(state) in self.ids
+
+    @staticmethod
+    def key(state) -> Tuple[Union[float, int]]:
+        """
+        Convert a state into the hashable key it is stored under
+        :param state: The state of the environment, either a numpy array or a tuple
+        :return: The state as a tuple of python scalars
+        """
+        if isinstance(state, numpy.ndarray):
+            return tuple(state.tolist())
+        return tuple(state)
+
+    def find(self, state) -> int:
+        """
+        Look up the id of a state without interning it
+        :param state: The state of the environment
+        :return: The id of the state or -1 if it has never been interned
+        """
+        return self.ids.get(self.key(state), -1)
+
+    def intern(self, state) -> int:
+        """
+        Look up the id of a state, assigning it the next free id if it has not been seen before
+        :param state: The state of the environment
+        :return: The id of the state
+        """
+        key = self.key(state)
+        index = self.ids.get(key)
+
+        if index is None:
+            index = len(self.keys)
+            self.ids[key] = index
+            self.keys.append(key)
+
+        return index
+
+    def find_all(self, states: numpy.ndarray) -> numpy.ndarray:
+        """
+        Look up the ids of many states without interning them
+        :param states: An array with one state per row
+        :return: The id of every state, -1 for states that have never been interned
+        """
+        return numpy.array([self.find(state) for state in states], dtype=numpy.int64)
+
+    def align(self, other: "StateIndex") -> numpy.ndarray:
+        """
+        Map the ids of another index to ids of this one, interning the states this index has not seen
+        :param other: Another state index
+        :return: The id in this index of every state of the other index, ordered by the other index's ids
+        """
+        if other is self:
+            return numpy.arange(len(self), dtype=numpy.int64)
+
+        return numpy.array([self.intern(state) for state in other.keys], dtype=numpy.int64)
+
+    def canonical_actions(self, state, actions: Union[int, numpy.ndarray]) -> Union[int, numpy.ndarray]:
+        """
+        Map actions taken from a state into the frame of the state's id. Indices that store symmetric states under one
+        id map the actions the same way they map the state, every other index leaves them unchanged.
+        :param state: The state of the environment
+        :param actions: An action or an array of actions available from the state
+        :return: The actions as they are stored for the id of the state
+        """
+        return actions
+
+    def state(self, index: int) -> Tuple[Union[float, int]]:
+        """
+        :param index: The id of an interned state
+        :return: The state stored under that id
+        """
+        return self.keys[index]
@@ -0,0 +1,180 @@
+#! /usr/bin/env python3
+from typing import Tuple
+
+import numpy
+
+from rl.agents.reprs.shared_array import SharedArray
+from rl.agents.reprs.state_index import StateIndex
+from rl.agents.reprs.transition_table import TransitionTable
+
+
+class SuccessorTable(TransitionTable):
+    """
+    Transition table of a deterministic environment, where every state-action pair always lands in the same next state.
+    The next state of every pair is stored in one dense (states, actions) array, -1 for pairs that have never been
+    taken, and the row of a pair is its position in that array. Adding a transition overwrites the next state of its
+    pair, so agents that learn in parallel may write to a shared array without locks and never disagree.
+
+    The array can not grow, so the state index must hold every state up front, such as a TicTacToeStateIndex.
+    """
+
+    def __init__(self, states: StateIndex, num_actions: int, shared: bool = False):
+        """
+        :param states: An index that already holds every state the table will see
+        :param num_actions: The number of actions of the environment
+        :param shared: Keep the next states in shared memory, which copies of the table in other processes write to
+        """
+        self.states: StateIndex = states
+        self.num_actions: int = num_actions
+
+        shape = (max(len(states), 1), num_actions)
+        self.shared_successors = SharedArray(shape, numpy.int32, fill=-1) if shared else None
+        self.successors: numpy.ndarray = self.shared_successors.array if shared \
+            else numpy.full(shape, -1, dtype=numpy.int32)
+
+        self.probabilities = numpy.ones(1)
+        self.aliases = numpy.zeros(1, dtype=numpy.int64)
+
+    def __getstate__(self):
+        if self.shared_successors is not None:
+            return {"states": self.states, "num_actions": self.num_actions,
+                    "shared_successors": self.shared_successors}
+        return {"states": self.states, "num_actions": self.num_actions, "successors": self.successors}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shared_successors = state.get("shared_successors")
+        if self.shared_successors is not None:
+            self.successors = self.shared_successors.array
+
+        self.probabilities = numpy.ones(1)
+        self.aliases = numpy.zeros(1, dtype=numpy.int64)
+
+    def fork(self) -> "SuccessorTable":
+        """
+        :return: This table if it is shared, every agent made from a shared table updates the same next states,
+                 otherwise a copy with its own next states
+        """
+        if self.shared_successors is not None:
+            return self
+
+        table = self.__class__.__new__(self.__class__)
+        table.__dict__.update(self.__dict__)
+        table.successors = self.successors.copy()
+        return table
+
+    @property
+    def num_rows(self) -> int:
+        return int(numpy.count_nonzero(self.successors >= 0))
+
+    def reserve(self, num_states: int, num_actions: int):
+        height, width = self.successors.shape
+        if num_states > height or num_actions > width:
+            raise ValueError(f"A successor table holds {height} states and {width} actions and can not grow to "
+                             f"{num_states} states and {num_actions} actions")
+
+    def find(self, state_id: int, action: int) -> int:
+        if state_id < 0 or state_id >= self.successors.shape[0] or action >= self.num_actions:
+            return -1
+
+        if self.successors[state_id, action] < 0:
+            return -1
+        return state_id * self.num_actions + action
+
+    def find_rows(self, state_id: int, actions: numpy.ndarray) -> numpy.ndarray:
+        if state_id < 0 or state_id >= self.successors.shape[0]:
+            return numpy.full(len(actions), -1, dtype=numpy.int64)
+
+        return numpy.where(self.successors[state_id, actions] >= 0, state_id * self.num_actions + actions, -1)
+
+    def row(self, state_id: int, action: int) -> int:
+        self.reserve(state_id + 1, action + 1)
+        return state_id * self.num_actions + action
+
+    def rows_of(self, state_ids: numpy.ndarray, actions: numpy.ndarray) -> numpy.ndarray:
+        if len(state_ids):
+            self.reserve(int(state_ids.max()) + 1, int(actions.max()) + 1)
+        return state_ids.astype(numpy.int64) * self.num_actions + actions
+
+    def add(self, row: int, next_state_id: int, count: int = 1):
+        """
+        Record the next state of a state-action pair
+        :param row: The row of the state-action pair
+        :param next_state_id: The id of the state the agent landed in
+        :param count: Ignored, a deterministic transition has no count
+        """
+        self.successors.flat[row] = next_state_id
+
+    def compact(self):
+        # Transitions are written into the array directly
+        pass
+
+    def merge(self, other: TransitionTable):
+        """
+        Take the next states of the state-action pairs this table has never seen from another table. The next state
+        of a pair of a table that counts transitions is the one it landed in most often.
+        :param other: Another transition table, its states do not need to share this table's index
+        """
+        if isinstance(other, SuccessorTable) and other.states is self.states:
+            numpy.copyto(self.successors, other.successors, where=self.successors < 0)
+            return
+
+        other.compact()
+        if not other.num_rows:
+            return
+
+        state_ids, other_states, other_actions = self.align_rows(other)
+
+        # Sorting the entries of every row by count puts the most frequent next state at the end of the row
+        entry_rows = numpy.repeat(numpy.arange(other.num_rows), numpy.diff(other.indptr))
+        order = numpy.lexsort((other.counts, entry_rows))
+        observed = numpy.flatnonzero(numpy.diff(other.indptr) > 0)
+        next_state_ids = state_ids[other.indices[order][other.indptr[observed + 1] - 1]]
+
+        rows = self.rows_of(other_states[observed], other_actions[observed])
+        unseen = self.successors.flat[rows] < 0
+        self.successors.flat[rows[unseen]] = next_state_ids[unseen]
+
+    def distribution(self, row: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        next_state_id = self.successors.flat[row]
+        if next_state_id < 0:
+            return numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0, dtype=numpy.int64)
+
+        return numpy.array([next_state_id], dtype=numpy.int32), numpy.ones(1, dtype=numpy.int64)
+
+    def cached(self, row: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        return self.successors.flat[row:row + 1], self.probabilities, self.probabilities, self.aliases
+
+    def sample(self, row: int, uniform: float = None) -> int:
+        return int(self.successors.flat[row])
+
+    def to_transition_table(self) -> TransitionTable:
+        """
+        :return: A transition table with a count of one for every next state, which can be saved or keep growing
+        """
+        state_ids, actions = numpy.nonzero(self.successors >= 0)
+
+        table = TransitionTable(states=self.states)
+        rows = table.rows_of(state_ids, actions)
+
+        table.indptr = numpy.arange(len(rows) + 1, dtype=numpy.int64)
+        table.indices = numpy.empty(len(rows), dtype=numpy.int32)
+        table.indices[rows] = self.successors[state_ids, actions]
+        table.counts = numpy.ones(len(rows), dtype=numpy.int64)
+        return table
+
+    def close(self):
+        """
+        Detach this process from the shared next states
+        """
+        if self.shared_successors is not None:
+            self.successors = None
+            self.shared_successors.close()
+
+    def unlink(self):
+        """
+        Free the shared next states, only the process that created the table may do this once all workers are done
+        """
+        if self.shared_successors is not None:
+            self.successors = None
+            self.shared_successors.unlink()
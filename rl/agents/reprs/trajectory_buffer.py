@@ -0,0 +1,108 @@
+#! /usr/bin/env python3
+import numpy
+
+
+class TrajectoryBuffer:
+    """
+    The steps a learning agent has taken during an episode, stored as the ids of their states, their actions and their
+    rewards in three preallocated arrays, so taking a step writes three numbers instead of allocating a transition.
+    Without a window the arrays grow geometrically and hold the whole episode. With a window they are written in a
+    circle and hold the latest steps only, which is all that agents learning from the last step or two need.
+    Steps are indexed like a list, 0 is the oldest step held and -1 the latest.
+    """
+
+    def __init__(self, window: int = None, capacity: int = 64):
+        """
+        :param window: The number of latest steps to hold, every step of the episode is held if not given
+        :param capacity: The number of steps to allocate room for up front, ignored if there is a window
+        """
+        self.window: int = window
+        capacity = window if window else max(capacity, 1)
+
+        self.state_ids: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.int64)
+        self.actions: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.int64)
+        self.rewards: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.float64)
+
+        # The number of steps taken since the buffer was cleared
+        self.steps: int = 0
+
+    def __len__(self) -> int:
+        return min(self.steps, self.window) if self.window else self.steps
+
+    def append(self, state_id: int, action: int, reward: float):
+        """
+        Record a step, dropping the oldest step held if the window is full
+        :param state_id: The id of the state of the step
+        :param action: The action taken from the state
+        :param reward: The reward received in the state
+        """
+        if self.window:
+            position = self.steps % self.window
+        else:
+            position = self.steps
+            if position == len(self.rewards):
+                self.state_ids = numpy.resize(self.state_ids, 2 * position)
+                self.actions = numpy.resize(self.actions, 2 * position)
+                self.rewards = numpy.resize(self.rewards, 2 * position)
+
+        self.state_ids[position] = state_id
+        self.actions[position] = action
+        self.rewards[position] = reward
+        self.steps += 1
+
+    def position(self, step: int) -> int:
+        """
+        :param step: The index of a step held, negative indices count back from the latest step
+        :return: The position of the step in the arrays
+        """
+        # The number of the step since the buffer was cleared
+        number = self.steps + step if step < 0 else self.steps - len(self) + step
+        if number < 0 or number >= self.steps or (self.window and number < self.steps - self.window):
+            raise IndexError(f"Step {step} is not held, the buffer holds {len(self)} steps")
+
+        return number % self.window if self.window else number
+
+    def state_id(self, step: int) -> int:
+        """
+        :param step: The index of a step held
+        :return: The id of the state of the step
+        """
+        return int(self.state_ids[self.position(step)])
+
+    def action(self, step: int) -> int:
+        """
+        :param step: The index of a step held
+        :return: The action taken from the state of the step
+        """
+        return int(self.actions[self.position(step)])
+
+    def reward(self, step: int) -> float:
+        """
+        :param step: The index of a step held
+        :return: The reward received in the state of the step
+        """
+        return float(self.rewards[self.position(step)])
+
+    def order(self) -> numpy.ndarray:
+        """
+        :return: The positions of the steps held in the arrays, from the oldest to the latest
+        """
+        size = len(self)
+        if self.window:
+            return (self.steps - size + numpy.arange(size)) % self.window
+        return numpy.arange(size)
+
+    def ordered_state_ids(self) -> numpy.ndarray:
+        """
+        :return: The ids of the states of the steps held, from the oldest to the latest
+        """
+        return self.state_ids[self.order()]
+
+    def ordered_rewards(self) -> numpy.ndarray:
+        """
+        :return: The rewards of the steps held, from the oldest to the latest
+        """
+        return self.rewards[self.order()]
+
+    def clear(self):
+        self.steps = 0
@@ -13,7 +13,9 @@ class Transition:
         :param state: The state of the environment
         :param reward:  The reward received by being in that state
         """
-        self.state: Tuple[Union[int, float]] = tuple(state)
+        # A copy of the state as python scalars, so callers may reuse their observation buffers
+        self.state: Tuple[Union[int, float]] = tuple(state.tolist()) if isinstance(state, numpy.ndarray) \
+            else tuple(state)
         self.action: int = action
         self.reward: float = reward
 
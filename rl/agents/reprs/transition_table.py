@@ -0,0 +1,431 @@
+#! /usr/bin/env python3
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+
+import numpy
+
+from rl.agents.reprs.state_index import StateIndex
+
+
+def alias_table(probabilities: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Build the tables of Vose's alias method, which samples from a discrete distribution in constant time.
+    Pick a column i uniformly, keep it with probability thresholds[i] and otherwise take aliases[i].
+    :param probabilities: A discrete probability distribution
+    :return: The threshold and alias of every column
+    """
+    k = len(probabilities)
+    scaled: List[float] = (probabilities * k).tolist()
+    thresholds = numpy.ones(k)
+    aliases = numpy.arange(k)
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        thresholds[less] = scaled[less]
+        aliases[less] = more
+
+        scaled[more] += scaled[less] - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    return thresholds, aliases
+
+
+class TransitionTable:
+    """
+    Counts how often the agent landed in each next state after committing to an action from a state.
+
+    States are interned into ids by a StateIndex, usually the one shared with the value table, and every state-action
+    pair that has been taken owns a row. The next state ids and counts of all rows are stored in compressed sparse row
+    (CSR) arrays. Counts of transitions that have been seen before are incremented in place, transitions that are new
+    go into an append buffer that is compacted into the CSR arrays once it grows large.
+    The normalized next state distribution and alias table of a row are cached the first time they are needed and
+    dropped whenever a transition is added to that row, so sampling a next state takes constant time.
+    Actions must be non-negative integers.
+    """
+    # Whether the arrays are shared with a fork of the table and must be copied before they are written to
+    copy_on_write: bool = False
+
+    def __init__(self, states: StateIndex = None, capacity: int = 1024):
+        """
+        :param states: The index used to intern states, a new one is created if not given
+        :param capacity: The number of states to allocate room for up front
+        """
+        self.states: StateIndex = StateIndex() if states is None else states
+
+        # Row of every state-action pair, -1 if the action has never been taken from that state
+        self.rows: numpy.ndarray = numpy.full((max(capacity, len(self.states), 1), 1), -1, dtype=numpy.int32)
+        self.row_states: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.int32)
+        self.row_actions: numpy.ndarray = numpy.zeros(capacity, dtype=numpy.int32)
+        self.num_rows: int = 0
+
+        # CSR arrays of the compacted rows
+        self.indptr: numpy.ndarray = numpy.zeros(1, dtype=numpy.int64)
+        self.indices: numpy.ndarray = numpy.zeros(0, dtype=numpy.int32)
+        self.counts: numpy.ndarray = numpy.zeros(0, dtype=numpy.int64)
+
+        # Append buffer of transitions that are not in the CSR arrays yet, row -> next state id -> count
+        self.pending: Dict[int, Dict[int, int]] = {}
+        self.num_pending: int = 0
+
+        # row -> next state ids, probabilities, alias thresholds, aliases
+        self.cache: Dict[int, Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]] = {}
+
+    @classmethod
+    def from_dict(cls, transitions: Dict[Tuple[Union[float, int]], Counter], states: StateIndex = None) \
+            -> "TransitionTable":
+        """
+        Build a table from a mapping of state-action tuples to Counters of next states, such as policies saved before
+        tables existed
+        :param transitions: A mapping of (*state, action) tuples to Counters of next state tuples
+        :param states: The index used to intern states
+        :return: The equivalent table
+        """
+        table = cls(states=states)
+        for state_action, state_counts in transitions.items():
+            row = table.row(table.states.intern(state_action[:-1]), int(state_action[-1]))
+            for next_state, count in state_counts.items():
+                table.add(row, table.states.intern(next_state), count)
+
+        table.compact()
+        return table
+
+    @classmethod
+    def from_arrays(cls, row_states: numpy.ndarray, row_actions: numpy.ndarray, indptr: numpy.ndarray,
+                    indices: numpy.ndarray, counts: numpy.ndarray, states: StateIndex) -> "TransitionTable":
+        """
+        Build a table from the CSR arrays of another table, such as the columns of a saved policy
+        :param row_states: The state id of every row
+        :param row_actions: The action of every row
+        :param indptr: Where the next states of every row start in indices and counts
+        :param indices: The next state ids of all rows
+        :param counts: The number of times every next state was landed in
+        :param states: The index of the states
+        :return: The table
+        """
+        table = cls.__new__(cls)
+        table.__setstate__({"states": states,
+                            "row_states": row_states.astype(numpy.int32),
+                            "row_actions": row_actions.astype(numpy.int32),
+                            "indptr": indptr.astype(numpy.int64),
+                            "indices": indices.astype(numpy.int32),
+                            "counts": counts.astype(numpy.int64)})
+        return table
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def __getstate__(self):
+        self.compact()
+        num_rows = self.num_rows
+        return {"states": self.states,
+                "row_states": self.row_states[:num_rows].copy(),
+                "row_actions": self.row_actions[:num_rows].copy(),
+                "indptr": self.indptr,
+                "indices": self.indices,
+                "counts": self.counts}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.num_rows = len(self.row_states)
+        self.pending = {}
+        self.num_pending = 0
+        self.cache = {}
+
+        # The row lookup is dense in states and actions, so it is rebuilt from the rows instead of pickled
+        num_actions = int(self.row_actions.max()) + 1 if self.num_rows else 1
+        self.rows = numpy.full((max(len(self.states), 1), num_actions), -1, dtype=numpy.int32)
+        self.rows[self.row_states, self.row_actions] = numpy.arange(self.num_rows, dtype=numpy.int32)
+
+    def fork(self) -> "TransitionTable":
+        """
+        Copy the table in constant time, such as for every agent a builder makes from one table. The table is compacted
+        and the copy shares the state index and the arrays of this table. The arrays are read-only until one of the
+        tables adds a row or a transition or merges another table, which gives that table its own copy first. The copy
+        starts with an empty cache of distributions.
+        :return: The copy
+        """
+        self.compact()
+        table = self.__class__.__new__(self.__class__)
+        table.__dict__.update(self.__dict__)
+        table.pending = {}
+        table.cache = {}
+
+        for array in (self.rows, self.row_states, self.row_actions, self.counts):
+            array.flags.writeable = False
+        self.copy_on_write = table.copy_on_write = True
+        return table
+
+    def own(self):
+        """
+        Copy the arrays this table writes to in place and shares with its forks, so that writing to them does not
+        change the forks. The other arrays are only ever replaced.
+        """
+        if self.copy_on_write:
+            self.rows = self.rows.copy()
+            self.row_states = self.row_states.copy()
+            self.row_actions = self.row_actions.copy()
+            self.counts = self.counts.copy()
+            self.copy_on_write = False
+
+    def reserve(self, num_states: int, num_actions: int):
+        """
+        Make sure the row lookup has room for num_states states and num_actions actions
+        :param num_states: The number of states the lookup must hold
+        :param num_actions: The number of actions the lookup must hold
+        """
+        height, width = self.rows.shape
+        if num_states <= height and num_actions <= width:
+            return
+
+        height = max(num_states, 2 * height) if num_states > height else height
+        width = max(num_actions, 2 * width) if num_actions > width else width
+        rows = numpy.full((height, width), -1, dtype=numpy.int32)
+        rows[:self.rows.shape[0], :self.rows.shape[1]] = self.rows
+        self.rows = rows
+
+    def find(self, state_id: int, action: int) -> int:
+        """
+        :param state_id: The id of the state the action was taken from
+        :param action: The action taken
+        :return: The row of the state-action pair or -1 if the action has never been taken from that state
+        """
+        if state_id < 0 or state_id >= self.rows.shape[0] or action >= self.rows.shape[1]:
+            return -1
+
+        return int(self.rows[state_id, action])
+
+    def find_rows(self, state_id: int, actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        :param state_id: The id of the state the actions were taken from
+        :param actions: The actions taken
+        :return: The row of every state-action pair, -1 for actions that have never been taken from that state
+        """
+        if 0 <= state_id < self.rows.shape[0]:
+            try:
+                return self.rows[state_id, actions]
+            except IndexError:
+                # Some of the actions have never been taken from any state
+                rows = numpy.full(len(actions), -1, dtype=numpy.int32)
+                known = actions < self.rows.shape[1]
+                rows[known] = self.rows[state_id, actions[known]]
+                return rows
+
+        return numpy.full(len(actions), -1, dtype=numpy.int32)
+
+    def row(self, state_id: int, action: int) -> int:
+        """
+        Find the row of a state-action pair, creating it if the action has never been taken from that state
+        :param state_id: The id of the state the action was taken from
+        :param action: The action taken
+        :return: The row of the state-action pair
+        """
+        if self.copy_on_write:
+            self.own()
+        self.reserve(state_id + 1, action + 1)
+        row = int(self.rows[state_id, action])
+
+        if row < 0:
+            row = self.num_rows
+            if row == len(self.row_states):
+                self.row_states = numpy.resize(self.row_states, max(2 * row, 16))
+                self.row_actions = numpy.resize(self.row_actions, max(2 * row, 16))
+
+            self.row_states[row] = state_id
+            self.row_actions[row] = action
+            self.rows[state_id, action] = row
+            self.num_rows += 1
+
+        return row
+
+    def add(self, row: int, next_state_id: int, count: int = 1):
+        """
+        Count transitions from a state-action pair into a next state
+        :param row: The row of the state-action pair
+        :param next_state_id: The id of the state the agent landed in
+        :param count: The number of times the transition happened
+        """
+        if self.copy_on_write:
+            self.own()
+        self.cache.pop(row, None)
+
+        if row + 1 < len(self.indptr):
+            start, end = self.indptr[row], self.indptr[row + 1]
+            positions = numpy.flatnonzero(self.indices[start:end] == next_state_id)
+            if len(positions):
+                self.counts[start + positions[0]] += count
+                return
+
+        row_pending = self.pending.setdefault(row, {})
+        if next_state_id not in row_pending:
+            self.num_pending += 1
+        row_pending[next_state_id] = row_pending.get(next_state_id, 0) + count
+
+        if self.num_pending > max(4096, len(self.indices) // 2):
+            self.compact()
+
+    def compact(self):
+        """
+        Move the transitions in the append buffer into the CSR arrays
+        """
+        if not self.num_pending and len(self.indptr) == self.num_rows + 1:
+            return
+
+        pending_rows = numpy.empty(self.num_pending, dtype=numpy.int64)
+        pending_indices = numpy.empty(self.num_pending, dtype=numpy.int32)
+        pending_counts = numpy.empty(self.num_pending, dtype=numpy.int64)
+
+        i = 0
+        for row, row_pending in self.pending.items():
+            n = len(row_pending)
+            pending_rows[i:i + n] = row
+            pending_indices[i:i + n] = list(row_pending.keys())
+            pending_counts[i:i + n] = list(row_pending.values())
+            i += n
+
+        compacted_rows = numpy.repeat(numpy.arange(len(self.indptr) - 1), numpy.diff(self.indptr))
+        all_rows = numpy.concatenate((compacted_rows, pending_rows))
+        order = numpy.argsort(all_rows, kind="stable")
+
+        self.indices = numpy.concatenate((self.indices, pending_indices))[order]
+        self.counts = numpy.concatenate((self.counts, pending_counts))[order]
+        self.indptr = numpy.zeros(self.num_rows + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(all_rows, minlength=self.num_rows), out=self.indptr[1:])
+
+        self.pending = {}
+        self.num_pending = 0
+
+    def rows_of(self, state_ids: numpy.ndarray, actions: numpy.ndarray) -> numpy.ndarray:
+        """
+        Find the rows of many state-action pairs at once, creating the rows of the pairs that have never been taken
+        :param state_ids: The id of the state of every pair
+        :param actions: The action of every pair
+        :return: The row of every state-action pair
+        """
+        if not len(state_ids):
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        self.own()
+        self.reserve(int(state_ids.max()) + 1, int(actions.max()) + 1)
+        missing = self.rows[state_ids, actions] < 0
+
+        if missing.any():
+            pairs = numpy.unique(numpy.stack((state_ids[missing], actions[missing]), axis=1), axis=0)
+            new_rows = numpy.arange(self.num_rows, self.num_rows + len(pairs))
+
+            size = max(len(self.row_states), 16)
+            while size < self.num_rows + len(pairs):
+                size *= 2
+            self.row_states = numpy.resize(self.row_states, size)
+            self.row_actions = numpy.resize(self.row_actions, size)
+
+            self.row_states[new_rows] = pairs[:, 0]
+            self.row_actions[new_rows] = pairs[:, 1]
+            self.rows[pairs[:, 0], pairs[:, 1]] = new_rows
+            self.num_rows += len(pairs)
+
+        return self.rows[state_ids, actions].astype(numpy.int64)
+
+    def align_rows(self, other: "TransitionTable") -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        Map the rows of another compacted table onto this table's state index
+        :param other: Another transition table, its states do not need to share this table's index
+        :return: The id in this index of every state of the other index, and the state id and action of every row of
+                 the other table in this index
+        """
+        state_ids = self.states.align(other.states)
+
+        other_states = state_ids[other.row_states[:other.num_rows]]
+        other_actions = other.row_actions[:other.num_rows].astype(numpy.int64)
+        if other.states is not self.states:
+            # The actions are stored in the frame of the other index's states
+            other_actions = numpy.array([self.states.canonical_actions(other.states.state(state_id), action)
+                                         for state_id, action in zip(other.row_states[:other.num_rows].tolist(),
+                                                                     other_actions.tolist())], dtype=numpy.int64)
+
+        return state_ids, other_states, other_actions
+
+    def merge(self, other: "TransitionTable"):
+        """
+        Add the transition counts of another table to this one. The rows of both tables are aligned through the state
+        index and the counts of transitions both tables have seen are summed in one pass over the CSR arrays.
+        :param other: Another transition table, its states do not need to share this table's index
+        """
+        other.compact()
+        if not other.num_rows:
+            return
+
+        state_ids, other_states, other_actions = self.align_rows(other)
+        rows = self.rows_of(other_states, other_actions)
+        self.compact()
+
+        entry_rows = numpy.concatenate((numpy.repeat(numpy.arange(len(self.indptr) - 1), numpy.diff(self.indptr)),
+                                        numpy.repeat(rows, numpy.diff(other.indptr))))
+        entry_indices = numpy.concatenate((self.indices, state_ids[other.indices]))
+        entry_counts = numpy.concatenate((self.counts, other.counts))
+
+        # Transitions both tables have seen share a key, their counts are summed
+        keys, inverse = numpy.unique(entry_rows * len(self.states) + entry_indices, return_inverse=True)
+        self.counts = numpy.bincount(inverse, weights=entry_counts, minlength=len(keys)).astype(numpy.int64)
+        self.indices = (keys % len(self.states)).astype(numpy.int32)
+
+        self.indptr = numpy.zeros(self.num_rows + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(keys // len(self.states), minlength=self.num_rows), out=self.indptr[1:])
+        self.cache.clear()
+
+    def distribution(self, row: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        :param row: The row of a state-action pair
+        :return: The next state ids the agent landed in from the state-action pair and how many times it landed in each
+        """
+        if row + 1 < len(self.indptr):
+            start, end = self.indptr[row], self.indptr[row + 1]
+            next_state_ids, counts = self.indices[start:end], self.counts[start:end]
+        else:
+            next_state_ids, counts = self.indices[:0], self.counts[:0]
+
+        row_pending = self.pending.get(row)
+        if row_pending:
+            next_state_ids = numpy.concatenate((next_state_ids, list(row_pending.keys()))).astype(numpy.int32)
+            counts = numpy.concatenate((counts, list(row_pending.values()))).astype(numpy.int64)
+
+        return next_state_ids, counts
+
+    def cached(self, row: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        :param row: The row of a state-action pair that has been taken at least once
+        :return: The next state ids, their probabilities and the alias table of their distribution
+        """
+        entry = self.cache.get(row)
+
+        if entry is None:
+            next_state_ids, counts = self.distribution(row)
+            probabilities = counts / counts.sum()
+            entry = (next_state_ids, probabilities, *alias_table(probabilities))
+            self.cache[row] = entry
+
+        return entry
+
+    def sample(self, row: int, uniform: float = None) -> int:
+        """
+        Sample the state the agent lands in after taking a state-action pair
+        :param row: The row of a state-action pair that has been taken at least once
+        :param uniform: A uniform random number in [0, 1), drawn if not given
+        :return: The id of the sampled next state
+        """
+        next_state_ids, _, thresholds, aliases = self.cached(row)
+
+        if uniform is None:
+            uniform = numpy.random.random()
+
+        # One uniform number picks both the column and whether to keep it or take its alias
+        column, keep = divmod(uniform * len(next_state_ids), 1.0)
+        column = min(int(column), len(next_state_ids) - 1)
+
+        if keep < thresholds[column]:
+            return int(next_state_ids[column])
+        return int(next_state_ids[aliases[column]])
@@ -0,0 +1,204 @@
+#! /usr/bin/env python3
+from typing import Dict, Iterator, Tuple, Union
+
+import numpy
+
+from rl.agents.reprs.state_index import StateIndex
+from rl.agents.reprs.value import Value
+
+
+class ValueTable:
+    """
+    Array backed state-value map. States are interned into slots by a StateIndex and the value approximation and visit
+    count of every state live in two contiguous arrays that grow geometrically. Indexing the table with a state behaves
+    like the defaultdict(Value) it replaces, while learning agents work on the slots and arrays directly.
+    """
+    # Whether the arrays are shared with a fork of the table and must be copied before they are written to
+    copy_on_write: bool = False
+
+    def __init__(self, dtype: Union[str, numpy.dtype] = numpy.float64, capacity: int = 1024,
+                 states: StateIndex = None):
+        """
+        :param dtype: The floating point type of the values and counts, float32 halves the memory of large tables
+        :param capacity: The number of states to allocate room for up front
+        :param states: The index used to intern states, a new one is created if not given
+        """
+        self.states: StateIndex = StateIndex() if states is None else states
+        self.dtype: numpy.dtype = numpy.dtype(dtype)
+
+        capacity = max(capacity, len(self.states), 1)
+        self.values: numpy.ndarray = numpy.zeros(capacity, dtype=self.dtype)
+        self.counts: numpy.ndarray = numpy.zeros(capacity, dtype=self.dtype)
+
+    @classmethod
+    def from_dict(cls, state_values: Dict[Tuple[Union[float, int]], Value],
+                  dtype: Union[str, numpy.dtype] = numpy.float64, states: StateIndex = None) -> "ValueTable":
+        """
+        Build a table from a mapping of states to Value structs, such as policies saved before tables existed
+        :param state_values: A mapping of state tuples to Value structs, or a table on another state index
+        :param dtype: The floating point type of the values and counts
+        :param states: The index used to intern states
+        :return: The equivalent table
+        """
+        table = cls(dtype=dtype, capacity=len(state_values), states=states)
+        for state, value in state_values.items():
+            table[state] = value
+
+        return table
+
+    @classmethod
+    def from_arrays(cls, values: numpy.ndarray, counts: numpy.ndarray, states: StateIndex) -> "ValueTable":
+        """
+        Build a table from the arrays of another table, such as the columns of a saved policy
+        :param values: The value approximation of every state, ordered by id
+        :param counts: The visit count of every state, ordered by id
+        :param states: The index of the states
+        :return: The table, its values are of the type of the arrays
+        """
+        table = cls(dtype=values.dtype, capacity=len(values), states=states)
+        table.values[:len(values)] = values
+        table.counts[:len(counts)] = counts
+        return table
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __contains__(self, state) -> bool:
+        return state in self.states
+
+    def __iter__(self) -> Iterator[Tuple[Union[float, int]]]:
+        return iter(self.states.keys)
+
+    def __getitem__(self, state) -> Value:
+        index = self.slot(state)
+        return Value(value=float(self.values[index]), count=float(self.counts[index]))
+
+    def __setitem__(self, state, value: Value):
+        index = self.slot(state)
+        self.values[index] = value.value
+        self.counts[index] = value.count
+
+    def __getstate__(self):
+        # Do not pickle the unused capacity at the end of the arrays
+        size = len(self.states)
+        return {"states": self.states, "dtype": self.dtype,
+                "values": self.values[:size].copy(), "counts": self.counts[:size].copy()}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def fork(self) -> "ValueTable":
+        """
+        Copy the table in constant time, such as for every agent a builder makes from one table. The copy shares the
+        state index and the arrays of this table. The arrays are read-only until one of the tables writes through slot,
+        reserve or merge, which gives that table its own copy first.
+        :return: The copy
+        """
+        table = self.__class__.__new__(self.__class__)
+        table.__dict__.update(self.__dict__)
+
+        self.values.flags.writeable = False
+        self.counts.flags.writeable = False
+        self.copy_on_write = table.copy_on_write = True
+        return table
+
+    def own(self):
+        """
+        Copy the arrays this table shares with its forks, so that writing to them does not change the forks
+        """
+        if self.copy_on_write:
+            self.values = self.values.copy()
+            self.counts = self.counts.copy()
+            self.copy_on_write = False
+
+    def keys(self) -> Iterator[Tuple[Union[float, int]]]:
+        return iter(self.states.keys)
+
+    def items(self) -> Iterator[Tuple[Tuple[Union[float, int]], Value]]:
+        self.reserve(len(self.states))
+        for index, state in enumerate(self.states.keys):
+            yield state, Value(value=float(self.values[index]), count=float(self.counts[index]))
+
+    def reserve(self, size: int):
+        """
+        Make sure the arrays have room for at least size states, at least doubling their capacity when they grow
+        :param size: The number of states the arrays must hold
+        """
+        capacity = len(self.values)
+        if size <= capacity:
+            return
+
+        capacity = max(size, 2 * capacity)
+        for name in ("values", "counts"):
+            grown = numpy.zeros(capacity, dtype=self.dtype)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+        # Growing copied the arrays
+        self.copy_on_write = False
+
+    def slot(self, state) -> int:
+        """
+        Find the slot of a state in the arrays, adding the state to the table if it is new.
+        The arrays may be reallocated, so fetch them after every call to slot.
+        :param state: The state of the environment
+        :return: The index of the state in values and counts
+        """
+        index = self.states.intern(state)
+        if self.copy_on_write:
+            self.own()
+        self.reserve(index + 1)
+        return index
+
+    def find(self, state) -> int:
+        """
+        :param state: The state of the environment
+        :return: The slot of the state or -1 if the table has never seen it
+        """
+        return self.states.find(state)
+
+    def gather(self, indices: numpy.ndarray) -> numpy.ndarray:
+        """
+        Look up the values of many states at once by their ids in the state index
+        :param indices: The ids of the states
+        :return: The value approximations of the states
+        """
+        # Tables sharing the index may have interned states this table has not made room for yet
+        self.reserve(len(self.states))
+        return self.values[indices]
+
+    def merge(self, other: "ValueTable"):
+        """
+        Combine the values of another table with this one. States this table has not visited take the value and count
+        of the other table. The values of the other states are averaged weighted by the counts of both tables and their
+        counts are averaged, which halves the count of a state the other table has not visited.
+        :param other: Another value table, its states do not need to share this table's index
+        """
+        state_ids = self.states.align(other.states)
+        self.own()
+        self.reserve(len(self.states))
+        other.reserve(len(other.states))
+
+        other_values = other.values[:len(state_ids)].astype(self.dtype)
+        other_counts = other.counts[:len(state_ids)].astype(self.dtype)
+        values = self.values[state_ids]
+        counts = self.counts[state_ids]
+
+        visited = counts != 0
+        total_counts = numpy.where(visited, counts + other_counts, 1)
+        weighted = (counts * values + other_counts * other_values) / total_counts
+
+        self.values[state_ids] = numpy.where(visited, weighted, other_values)
+        self.counts[state_ids] = numpy.where(visited, total_counts / 2, other_counts)
+
+    def value(self, state) -> float:
+        """
+        :param state: The state of the environment
+        :return: The value approximation of the state, 0.0 if the table has never seen it
+        """
+        index = self.states.find(state)
+        if index < 0 or index >= len(self.values):
+            return 0.0
+
+        return float(self.values[index])
@@ -0,0 +1,44 @@
+#! /usr/bin/env python3
+import pickle
+
+from rl.agents import AgentBuilder, EGreedy, TemporalDifferenceZero, Value, ValueTable
+from rl.agents.agent_builder import agent_class, agent_registry
+
+
+def test_agent_builder_class():
+    builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
+    builder.set(exploratory_rate=0.1, learning_rate=0.5, discount_rate=0.5)
+    agent = builder.make()
+
+    assert type(agent).__name__ == "EGreedyTemporalDifferenceZero"
+    assert isinstance(agent, EGreedy) and isinstance(agent, TemporalDifferenceZero)
+    assert type(agent) is type(builder.make())
+    assert type(pickle.loads(pickle.dumps(agent))) is type(agent)
+
+    builder.reset()
+    builder.add(agent_type="Random")
+    assert type(builder.make()).__name__ == "RandomNullLearning"
+
+
+def test_agent_registry():
+    agent_class("EGreedy", "QLearning")
+    registry = agent_registry()
+
+    # Agents that derive from an abstract learning agent are registered, the abstract agent and hybrids are not
+    assert {"QLearning", "Sarsa", "ExpectedSarsa", "TemporalDifferenceZero", "EGreedy"} <= set(registry)
+    assert "ActionValueAgent" not in registry and "EGreedyQLearning" not in registry
+
+
+def test_agent_builder_shares_tables():
+    state_values = ValueTable.from_dict({(0,): Value(value=1.0, count=1)})
+    builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
+    builder.set(exploratory_rate=0.0, learning_rate=0.5, discount_rate=0.5, state_values=state_values)
+
+    agent, other = builder.make(), builder.make()
+    assert agent.state_values.values is other.state_values.values is state_values.values
+
+    agent.learn((1,), 0, 0.0)
+    agent.learn((0,), 0, 1.0)
+    assert agent.state_values.values is not state_values.values
+    assert other.state_values.value((0,)) == state_values.value((0,)) == 1.0
+    assert agent.state_values.value((0,)) == 2.0
@@ -0,0 +1,47 @@
+#! /usr/bin/env python3
+import numpy
+
+from rl.agents import BatchedEGreedy, BatchedSampleAveraging, make_batched_agent
+
+
+def test_batched_agent_class():
+    agent = make_batched_agent("EGreedy", "SampleAveraging", runs=4, arms=3, exploratory_rate=0.1)
+
+    assert type(agent).__name__ == "BatchedEGreedySampleAveraging"
+    assert isinstance(agent, BatchedEGreedy) and isinstance(agent, BatchedSampleAveraging)
+    assert type(agent) is type(make_batched_agent("EGreedy", "SampleAveraging", runs=1, arms=1, exploratory_rate=0))
+    assert agent.values.shape == (4, 3)
+
+
+def test_batched_sample_averaging():
+    numpy.random.seed(0)
+    runs, arms = 5, 3
+    agent = make_batched_agent("EGreedy", "SampleAveraging", runs=runs, arms=arms, exploratory_rate=1.0)
+
+    totals = numpy.zeros((runs, arms))
+    pulls = numpy.zeros((runs, arms))
+    for _ in range(200):
+        actions = agent.act(numpy.arange(arms))
+        rewards = numpy.random.normal(size=runs)
+        agent.learn(actions, rewards)
+
+        numpy.add.at(totals, (numpy.arange(runs), actions), rewards)
+        numpy.add.at(pulls, (numpy.arange(runs), actions), 1)
+
+    assert numpy.array_equal(agent.counts, pulls)
+    assert numpy.allclose(agent.values, totals / numpy.maximum(pulls, 1))
+
+
+def test_batched_upper_confidence_bound():
+    runs, arms = 3, 4
+    agent = make_batched_agent("UpperConfidenceBound", "WeightedAveraging", runs=runs, arms=arms, confidence=2,
+                               learning_rate=0.1)
+
+    # Every arm has the same value, so the bonus of arms that have not been pulled yet makes the agent try them all
+    pulled = []
+    for _ in range(arms):
+        actions = agent.act(numpy.arange(arms))
+        agent.learn(actions, numpy.zeros(runs))
+        pulled.append(actions)
+
+    assert (numpy.sort(numpy.array(pulled), axis=0) == numpy.arange(arms)[:, numpy.newaxis]).all()
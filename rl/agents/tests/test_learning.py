@@ -0,0 +1,157 @@
+#! /usr/bin/env python3
+import numpy
+import pytest
+
+from rl.agents import AgentBuilder
+from rl.agents.learning.temporal_difference_one_agent import episode_returns
+
+
+def test_episode_returns():
+    random = numpy.random.RandomState(0)
+    for n, discount_rate in ((1, 0.9), (7, 0.5), (50, 1.0), (20, -1.0)):
+        rewards = random.normal(size=n)
+        expected = [sum(discount_rate ** (n - 1 - j) * rewards[j] for j in range(i)) +
+                    discount_rate ** (n - 1 - i) * sum(rewards[i:]) for i in range(n)]
+        assert numpy.allclose(episode_returns(rewards, discount_rate), expected)
+
+    # Long episodes take linear memory
+    assert (episode_returns(numpy.ones(1_000_000), 1.0) == 1_000_000).all()
+
+
+def test_temporal_difference_lambda():
+    for trace_decay, replacing_traces in ((0.0, False), (0.8, False), (1.0, True)):
+        builder = AgentBuilder(policy="Random", learning="TemporalDifferenceLambda")
+        builder.set(learning_rate=0.1, discount_rate=0.9, trace_decay=trace_decay, replacing_traces=replacing_traces)
+        agent = builder.make()
+
+        # A chain of states that pays 1 in its last state
+        for _ in range(500):
+            for state, reward in ((0,), 0.0), ((1,), 0.0), ((2,), 1.0):
+                agent.learn(state, 0, reward)
+            agent.reset()
+
+        assert numpy.allclose([agent.state_values.value((state,)) for state in range(3)], [0.81, 0.9, 1.0], atol=1e-3)
+        assert len(agent.eligibility) == 0 and not agent.trajectory
+
+
+def test_n_step_temporal_difference():
+    for steps in (1, 2, 5):
+        builder = AgentBuilder(policy="Random", learning="NStepTemporalDifference")
+        builder.set(learning_rate=0.1, discount_rate=0.9, steps=steps)
+        agent = builder.make()
+
+        # A chain of states that pays 1 in its last state
+        for _ in range(500):
+            for state, reward in ((0,), 0.0), ((1,), 0.0), ((2,), 0.0), ((3,), 1.0):
+                agent.learn(state, 0, reward)
+                assert len(agent.trajectory) <= 2 and len(agent.buffer) < steps
+            agent.reset()
+
+        assert numpy.allclose([agent.state_values.value((state,)) for state in range(4)], [0.729, 0.81, 0.9, 1.0],
+                              atol=1e-3)
+        assert agent.discounted_rewards == 0.0 and not agent.buffer and not agent.trajectory
+
+    builder.set(learning_rate=0.1, discount_rate=0.9, steps=0)
+    with pytest.raises(ValueError):
+        builder.make()
+
+
+def test_score_actions():
+    builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
+    builder.set(exploratory_rate=0.0, learning_rate=0.1, discount_rate=0.9)
+    agent = builder.make()
+
+    # Actions 1 and 4 are never taken from state 0, the others land in one or more of the states 1 to 4
+    for action, next_states in ((0, (1, 1, 1, 2)), (2, (3,)), (3, (1, 3, 4, 4)), (5, (4,))):
+        for next_state in next_states:
+            agent.learn((0,), action, 0.0)
+            agent.learn((next_state,), 0, 0.0)
+            agent.reset()
+    agent.state_values.values[:5] = [0.0, 0.25, -1.0, 0.5, 2.0]
+    actions = numpy.arange(6)
+
+    # The expected value of every action is the one its transition model gives
+    next_state_ids, values = agent.score_actions((0,), actions, expected=True)
+    for action, next_state_id, value in zip(actions, next_state_ids, values):
+        probabilities, ids = agent.transition_model((0,), action)
+        if not len(ids):
+            assert next_state_id == -1 and numpy.isnan(value)
+        else:
+            assert next_state_id == ids[probabilities.argmax()]
+            assert numpy.isclose(value, probabilities @ agent.values_of(ids))
+    assert numpy.isnan(values[[1, 4]]).all() and numpy.allclose(values[[0, 2, 3, 5]], [-0.0625, 0.5, 1.1875, 2.0])
+
+    # A sampled action lands in the state the transition model samples from the same uniform number
+    for seed in range(20):
+        numpy.random.seed(seed)
+        next_state_ids, values = agent.score_actions((0,), actions)
+        numpy.random.seed(seed)
+        uniforms = numpy.random.random(len(actions))
+        for action, next_state_id, value, uniform in zip(actions, next_state_ids, values, uniforms):
+            row = agent.transitions.find(agent.state_values.find((0,)), action)
+            if row < 0:
+                assert agent.sample_transition((0,), action) == next_state_id == -1 and numpy.isnan(value)
+            else:
+                assert next_state_id == agent.transitions.sample(row, uniform)
+                assert value == agent.values_of(numpy.array([next_state_id]))[0]
+
+    # The greedy policy never chooses an untaken action while another action can be scored
+    assert all(agent.act((0,), actions) not in (1, 4) for _ in range(50))
+
+    # A state that has never been seen can not score any action
+    for expected in (False, True):
+        next_state_ids, values = agent.score_actions((9,), actions, expected=expected)
+        assert (next_state_ids == -1).all() and numpy.isnan(values).all()
+        next_state_ids, values = agent.score_actions((0,), numpy.array([1, 4]), expected=expected)
+        assert (next_state_ids == -1).all() and numpy.isnan(values).all()
+
+
+def test_action_value_agents():
+    for learning in ("QLearning", "Sarsa", "ExpectedSarsa"):
+        builder = AgentBuilder(policy="EGreedy", learning=learning)
+        builder.set(exploratory_rate=0.0, learning_rate=0.1, discount_rate=0.9)
+        agent = builder.make()
+
+        # Action 0 leads down a chain of states that pays 1 in its last state, action 1 to a state that pays 0.5
+        for _ in range(500):
+            for state, action, reward in ((0,), 0, 0.0), ((1,), 1, 0.0), ((2,), 0, 1.0):
+                agent.learn(state, action, reward)
+            agent.reset()
+
+            agent.learn((0,), 1, 0.0)
+            agent.learn((3,), 0, 0.5)
+            agent.reset()
+
+        values = agent.action_values.values
+        assert numpy.allclose(values[[0, 0, 1, 2, 3], [0, 1, 1, 0, 0]], [0.81, 0.45, 0.9, 1.0, 0.5], atol=1e-3)
+        assert agent.state_values.counts[:4].tolist() == [1000, 500, 500, 500] and not agent.trajectory
+
+        # The greedy action is the best learned one, actions that were never taken can not be scored
+        assert agent.act((0,), numpy.arange(3)) == 0
+        assert agent.act((0,), numpy.array([2, 1])) == 1
+
+        other = builder.make()
+        other.learn((0,), 2, 2.0)
+        other.reset()
+        agent.merge(other)
+        assert agent.act((0,), numpy.arange(3)) == 2
+
+
+def test_adversarial_action_value_agents():
+    for learning in ("QLearning", "ExpectedSarsa"):
+        for adversarial, moves_first, value in (False, True, 0.9), (True, True, -0.9), (True, False, 0.9):
+            builder = AgentBuilder(policy="EGreedy", learning=learning)
+            builder.set(exploratory_rate=0.0, learning_rate=0.1, discount_rate=0.9, adversarial=adversarial)
+            agent = builder.make()
+            agent.moves_first = moves_first
+
+            # The move from state 0 is followed by a move from state 1 that either loses or wins
+            for _ in range(500):
+                for action, reward in (0, -1.0), (1, 1.0):
+                    agent.learn((0,), 0, 0.0)
+                    agent.learn((1,), action, reward)
+                    agent.reset()
+
+            # An opponent who moves from state 1 picks the move that loses for the agent
+            assert numpy.isclose(agent.action_values.values[0, 0], value, atol=1e-3)
+            assert agent.episode_step == 0
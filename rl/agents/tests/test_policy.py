@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+import numpy
+
+from rl.agents import AgentBuilder
+
+
+def learned_agent(builder: AgentBuilder):
+    """
+    :param builder: A builder set with a policy agent and the temporal difference zero learning agent
+    :return: An agent that has taken actions 0 and 1 to state 1 and action 2 to the slightly worse state 3, from both
+             state 0 and state 4
+    """
+    agent = builder.make()
+    for state in (0,), (4,):
+        for action, next_state in (0, (1,)), (1, (1,)), (2, (3,)):
+            agent.learn(state, action, 0.0)
+            agent.learn(next_state, 0, 0.0)
+            agent.reset()
+
+    agent.state_values.values[:] = 0.0
+    agent.state_values.values[agent.state_values.states.find((3,))] = -0.01
+    return agent
+
+
+def test_confidence_bound_statistics_per_state():
+    for policy, options in ("UpperConfidenceBound", {}), ("OptimisticConfidenceBound", {"decay_rate": 5.0}):
+        builder = AgentBuilder(policy=policy, learning="TemporalDifferenceZero")
+        builder.set(confidence=1.0, learning_rate=0.1, discount_rate=0.9, **options)
+        agent = learned_agent(builder)
+        actions = numpy.arange(3)
+        first, second = agent.state_values.states.find((0,)), agent.state_values.states.find((4,))
+
+        # Actions that have not been taken from a state hold the fill value, so their bonus beats the better value of
+        # the actions that have
+        assert [agent.act((0,), actions) for _ in range(2)] == [0, 1]
+        assert agent.action_counts.gather(first, actions).tolist() == [2.0, 2.0, 1.0]
+        assert agent.act((0,), actions) == 2
+
+        # The other state keeps its own counts and bounds, so it starts over from the first action
+        assert agent.act((4,), actions) == 0
+        assert agent.action_counts.gather(first, actions).tolist() == [2.0, 2.0, 2.0]
+        assert agent.action_counts.gather(second, actions).tolist() == [2.0, 1.0, 1.0]
+        if policy == "OptimisticConfidenceBound":
+            assert (agent.upper_bounds.gather(first, actions) < agent.upper_bounds.fill).all()
+            assert agent.upper_bounds.gather(second, actions).tolist()[1:] == [agent.upper_bounds.fill] * 2
+
+        # Forked agents and tables share the state index but write to their own copies of the statistics
+        counts = agent.action_counts.values.copy()
+        builder.set(confidence=1.0, learning_rate=0.1, discount_rate=0.9, state_values=agent.state_values,
+                    transitions=agent.transitions, **options)
+        child = builder.make()
+        for state in (0,), (4,), (9,):
+            child.act(state, actions)
+
+        table = agent.action_counts.fork()
+        row = table.slot((0,), actions)
+        table.values[row, 0] += 5
+
+        assert numpy.array_equal(agent.action_counts.values, counts)
+        assert child.state_values.states is agent.state_values.states
+        assert child.action_counts.gather(child.state_values.states.find((9,)), actions).tolist() == [2.0, 1.0, 1.0]
+
+
+def test_egreedy_expected():
+    for policy, options in ("EGreedy", {}), ("DecayingEGreedy", {"decay_rate": 0.1}):
+        for expected in (False, True):
+            builder = AgentBuilder(policy=policy, learning="TemporalDifferenceZero")
+            builder.set(exploratory_rate=0.0, expected=expected, learning_rate=0.1, discount_rate=0.9, **options)
+            agent = builder.make()
+
+            # Action 0 lands in a state worth 1 or in a state worth -1 as often, action 1 always in a state worth 0.5
+            for action, next_state in (0, (1,)), (0, (2,)), (1, (3,)):
+                agent.learn((0,), action, 0.0)
+                agent.learn(next_state, 0, 0.0)
+                agent.reset()
+            agent.state_values.values[:4] = [0.0, 1.0, -1.0, 0.5]
+
+            # A single sample of action 0 beats action 1 half of the time, its expected value of 0 never does
+            numpy.random.seed(0)
+            greedy_actions = [agent.act((0,), numpy.arange(2)) for _ in range(200)]
+            if expected:
+                assert greedy_actions == [1] * 200
+            else:
+                assert 50 < greedy_actions.count(0) < 150 and greedy_actions.count(0) + greedy_actions.count(1) == 200
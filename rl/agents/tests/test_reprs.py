@@ -0,0 +1,258 @@
+import pickle
+from collections import Counter, defaultdict
+
+import numpy
+import pytest
+
+from rl.agents.reprs import ActionTable, EligibilityTraces, RingBuffer, SharedValueTable, StateIndex, SuccessorTable, \
+    TrajectoryBuffer, TransitionTable, Value, ValueTable
+
+
+def test_value_table():
+    table = ValueTable(dtype=numpy.float32, capacity=1)
+    assert len(table) == 0
+    assert table.value(numpy.array([0, 1])) == 0.0
+    assert table.find((0, 1)) == -1
+
+    table[(0, 1)] = Value(value=0.5, count=2)
+    index = table.slot(numpy.array([1, 1]))
+    table.values[index] = 0.25
+    table.counts[index] += 1
+
+    assert len(table) == 2
+    assert len(table.values) >= 2
+    assert table.values.dtype == numpy.float32
+    assert table.slot(numpy.array([0, 1])) == table.find((0, 1)) == 0
+    assert table.value((0, 1)) == 0.5
+    assert table.value(numpy.array([1, 1])) == 0.25
+    assert table[(1, 1)].count == 1
+
+    loaded = pickle.loads(pickle.dumps(table))
+    assert dict((state, value.value) for state, value in loaded.items()) == {(0, 1): 0.5, (1, 1): 0.25}
+    assert loaded.slot((2, 2)) == 2
+
+
+def test_value_table_from_dict():
+    table = ValueTable.from_dict({(0,): Value(value=1.0, count=1), (1,): Value(value=2.0, count=3)})
+    assert table.value((0,)) == 1.0
+    assert table[(1,)].value == 2.0
+    assert table[(1,)].count == 3
+
+
+def test_value_table_merge():
+    table = ValueTable.from_dict({(0,): Value(value=1.0, count=1), (1,): Value(value=2.0, count=3),
+                                  (2,): Value(value=3.0, count=0)})
+    other = ValueTable.from_dict({(1,): Value(value=4.0, count=1), (2,): Value(value=5.0, count=2),
+                                  (3,): Value(value=6.0, count=1), (0,): Value(value=7.0, count=0)})
+    table.merge(other)
+
+    assert {state: (value.value, value.count) for state, value in table.items()} == \
+           {(0,): (1.0, 0.5), (1,): (2.5, 2), (2,): (5.0, 2), (3,): (6.0, 1)}
+
+
+def test_value_table_fork():
+    table = ValueTable.from_dict({(0,): Value(value=1.0, count=1)})
+    fork = table.fork()
+    assert fork.values is table.values and fork.states is table.states
+
+    with pytest.raises(ValueError):
+        fork.values[0] = 2.0
+
+    fork[(0,)] = Value(value=2.0, count=2)
+    fork[(1,)] = Value(value=3.0, count=1)
+    assert fork.values is not table.values
+    assert table.value((0,)) == 1.0 and table.value((1,)) == 0.0
+    assert fork.value((0,)) == 2.0 and fork.value((1,)) == 3.0
+
+
+def test_action_table():
+    table = ActionTable(fill=numpy.nan, capacity=1)
+    row = table.row(table.slot((0,), [2]), 2)
+    row[2] = 1.0
+    assert table.values.shape[1] >= 3
+    numpy.testing.assert_array_equal(table.gather(0, numpy.array([2, 0, 5])), [1.0, numpy.nan, numpy.nan])
+    numpy.testing.assert_array_equal(table.gather(-1, numpy.array([2])), [numpy.nan])
+
+    fork = table.fork()
+    with pytest.raises(ValueError):
+        fork.values[0, 2] = 2.0
+
+    fork.row(fork.slot((1,)), 0)[0] = 3.0
+    assert fork.values is not table.values and numpy.isnan(table.gather(1, numpy.array([0])))
+
+    # Entries both tables have written are averaged, the others are taken from whichever table wrote them
+    other = ActionTable(fill=numpy.nan)
+    other.row(other.slot((1,)), 2)[2] = 4.0
+    other.row(other.slot((0,)), 2)[2] = 2.0
+    fork.merge(other)
+    assert fork.values[0, 2] == 1.5 and fork.values[1, 0] == 3.0 and fork.values[1, 2] == 4.0
+    assert numpy.isnan(fork.values[1, 1])
+
+    loaded = pickle.loads(pickle.dumps(ActionTable.from_array(fork.values[:2], states=fork.states, fill=numpy.nan)))
+    numpy.testing.assert_array_equal(loaded.values[:2, :3], fork.values[:2, :3])
+
+
+def test_transition_table():
+    random = numpy.random.RandomState(0)
+    table = TransitionTable()
+    expected = defaultdict(Counter)
+
+    for _ in range(20000):
+        state, action, next_state = (random.randint(50),), random.randint(4), (random.randint(50),)
+        table.add(table.row(table.states.intern(state), action), table.states.intern(next_state))
+        expected[(*state, action)][next_state] += 1
+
+    loaded = pickle.loads(pickle.dumps(table))
+    for t in (table, loaded):
+        assert len(t) == len(expected)
+        for (state, action), counts in expected.items():
+            next_state_ids, next_state_counts = t.distribution(t.find(t.states.find((state,)), action))
+            assert {t.states.state(i): c for i, c in zip(next_state_ids, next_state_counts)} == counts
+
+    assert table.find(table.states.find((0,)), 10) == -1
+    assert TransitionTable.from_dict(expected).num_rows == len(expected)
+
+    # Merging a table on another index counts every transition of both
+    other = TransitionTable.from_dict({(0, 1): Counter({(1,): 2, (60,): 1}), (70, 9): Counter({(0,): 4})})
+    table.merge(other)
+    expected[(0, 1)].update({(1,): 2, (60,): 1})
+    expected[(70, 9)][(0,)] += 4
+    for (state, action), counts in expected.items():
+        next_state_ids, next_state_counts = table.distribution(table.find(table.states.find((state,)), action))
+        assert {table.states.state(i): c for i, c in zip(next_state_ids, next_state_counts)} == counts
+
+
+def test_transition_table_fork():
+    table = TransitionTable()
+    table.add(table.row(table.states.intern((0,)), 0), table.states.intern((1,)))
+    fork = table.fork()
+    assert fork.counts is table.counts
+
+    fork.add(fork.row(0, 0), 1)
+    fork.add(fork.row(0, 1), 0)
+    assert table.distribution(table.find(0, 0))[1].tolist() == [1] and table.find(0, 1) == -1
+    assert fork.distribution(fork.find(0, 0))[1].tolist() == [2] and fork.find(0, 1) >= 0
+
+
+def test_transition_table_sample():
+    table = TransitionTable()
+    row = table.row(table.states.intern((0,)), 1)
+    for next_state, count in ((1, 1), (2, 3), (3, 6)):
+        table.add(row, table.states.intern((next_state,)), count)
+
+    uniforms = (numpy.arange(10000) + 0.5) / 10000
+    samples = Counter(table.sample(row, uniform) for uniform in uniforms)
+    assert {table.states.state(i): round(c / len(uniforms), 2) for i, c in samples.items()} == \
+           {(1,): 0.1, (2,): 0.3, (3,): 0.6}
+
+    table.add(row, table.states.intern((4,)), 10)
+    next_state_ids, probabilities, _, _ = table.cached(row)
+    assert probabilities[next_state_ids == table.states.find((4,))] == 0.5
+
+
+def static_index(num_states: int) -> StateIndex:
+    states = StateIndex()
+    for state in range(num_states):
+        states.intern((state,))
+    return states
+
+
+def test_shared_value_table():
+    table = SharedValueTable(static_index(4))
+    try:
+        copy = pickle.loads(pickle.dumps(table))
+        copy.values[copy.slot((2,))] = 0.5
+        copy.counts[copy.slot((2,))] += 1
+
+        # The copy writes into the memory of the table
+        assert table.value((2,)) == 0.5
+        assert table[(2,)].count == 1
+        assert table.to_table().value((2,)) == 0.5
+
+        with pytest.raises(ValueError):
+            table.slot((4,))
+
+        copy.close()
+    finally:
+        table.unlink()
+
+
+def test_successor_table():
+    states = static_index(4)
+    table = SuccessorTable(states, num_actions=2, shared=True)
+    try:
+        copy = pickle.loads(pickle.dumps(table))
+        copy.add(copy.row(0, 1), 3)
+        copy.add(copy.row(3, 0), 2)
+
+        assert table.find(0, 0) == -1
+        assert table.sample(table.find(0, 1)) == 3
+        assert table.find_rows(3, numpy.array([0, 1])).tolist() == [table.find(3, 0), -1]
+        assert len(table) == 2
+
+        # A transition table on another index contributes the next state it landed in most often
+        other = TransitionTable.from_dict({(1, 1): Counter({(2,): 1, (0,): 3}), (0, 1): Counter({(1,): 5})})
+        table.merge(other)
+        assert table.sample(table.find(1, 1)) == 0
+        assert table.sample(table.find(0, 1)) == 3
+
+        counted = table.to_transition_table()
+        assert {(states.state(counted.row_states[row])[0], counted.row_actions[row]): counted.distribution(row)[0][0]
+                for row in range(counted.num_rows)} == {(0, 1): 3, (1, 1): 0, (3, 0): 2}
+
+        copy.close()
+    finally:
+        table.unlink()
+
+
+def test_eligibility_traces():
+    traces = EligibilityTraces(threshold=0.1, capacity=1)
+    traces.visit(3)
+    traces.visit(5)
+    traces.visit(3)
+    assert traces.active_ids.tolist() == [3, 5] and traces.active_traces.tolist() == [2.0, 1.0]
+
+    traces.decay(0.5)
+    traces.replacing = True
+    traces.visit(3)
+    assert traces.active_traces.tolist() == [1.0, 0.5]
+
+    for _ in range(3):
+        traces.decay(0.5)
+    assert traces.active_ids.tolist() == [3] and traces.active_traces.tolist() == [0.125]
+
+    traces.clear()
+    assert len(traces) == 0
+
+
+def test_ring_buffer():
+    buffer = RingBuffer(3)
+    for step in range(3):
+        buffer.push(step, step, float(step))
+    assert buffer.pop() == (0, 0, 0.0)
+
+    buffer.push(3, 3, 3.0)
+    assert len(buffer) == 3 and buffer.ordered_rewards().tolist() == [1.0, 2.0, 3.0]
+    with pytest.raises(AssertionError):
+        buffer.push(4, 4, 4.0)
+
+    buffer.clear()
+    assert len(buffer) == 0
+
+
+def test_trajectory_buffer():
+    episode = TrajectoryBuffer(capacity=1)
+    window = TrajectoryBuffer(window=2)
+    for step in range(5):
+        episode.append(step, step + 10, float(step))
+        window.append(step, step + 10, float(step))
+
+    assert len(episode) == 5 and episode.ordered_state_ids().tolist() == [0, 1, 2, 3, 4]
+    assert len(window) == 2 and window.ordered_rewards().tolist() == [3.0, 4.0]
+    assert window.state_id(-1) == window.state_id(1) == episode.state_id(-1) == 4
+    assert window.action(-2) == window.action(0) == episode.action(3) == 13 and window.reward(-2) == 3.0
+    with pytest.raises(IndexError):
+        window.state_id(-3)
+
+    window.clear()
+    assert not window and window.ordered_state_ids().tolist() == []
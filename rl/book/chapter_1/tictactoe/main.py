@@ -12,16 +12,62 @@ import gym
 import numpy
 from tqdm import tqdm
 
-from rl.agents import AgentBuilder, Agent
+from rl.agents import ActionValueAgent, AgentBuilder, Agent, SharedValueTable, SuccessorTable
+from rl.agents.agent_builder import agent_registry
+from rl.book.chapter_1.tictactoe.solver import solved_tables
+from rl.book.chapter_1.tictactoe.state_index import SymmetricTicTacToeStateIndex, TicTacToeStateIndex
 from rl.envs.tictactoe import Status, Mark
-from rl.utils.io_utils import load_learning_agent, save_learning_agent
+from rl.utils.checkpoint_utils import Checkpointer, checkpoint_filename, init_worker, stop_on_signals, \
+    stop_requested, worker_seed
+from rl.utils.io_utils import load_policy, save_learning_agent
 from rl.utils.logging_utils import Logger
+from rl.utils.merge_utils import learn_and_merge, split_tasks
+
+
+# The learning agents of the smart players, action value agents take a learning rate and learn action values as well
+LEARNING_AGENTS = ["TemporalDifferenceZeroAveraging", "QLearning", "Sarsa", "ExpectedSarsa"]
+
+
+def learning_options(learning: str, learning_rate: float, policy_filename: str) -> Dict[str, object]:
+    """
+    :param learning: The name of the learning agent of the smart players
+    :param learning_rate: The learning rate of action value agents
+    :param policy_filename: A policy to start from, the players start from empty tables if not given
+    :return: The constructor arguments of the learning agent besides its discount rate
+    """
+    action_values = issubclass(agent_registry()[learning], ActionValueAgent)
+    options = load_policy(policy_filename, action_values=action_values)
+    if action_values:
+        # The players learn the moves of their opponent too
+        options["learning_rate"] = learning_rate
+        options["adversarial"] = True
+
+    return options
+
+
+def moves_second(agent: Agent) -> Agent:
+    """
+    Tell an action value agent that it plays O, so its opponent moves from the first state of every game
+    :param agent: The player of O
+    :return: The player
+    """
+    if isinstance(agent, ActionValueAgent):
+        agent.moves_first = False
+    return agent
 
 
 def available_actions(state: numpy.ndarray) -> numpy.ndarray:
     return numpy.where(state == Mark.EMPTY)[0]
 
 
+def state_index(symmetric: bool) -> TicTacToeStateIndex:
+    """
+    :param symmetric: Store the rotations and reflections of a board as one state
+    :return: The index of every tic-tac-toe state
+    """
+    return SymmetricTicTacToeStateIndex() if symmetric else TicTacToeStateIndex()
+
+
 def play(player_x: Agent, player_o: Agent):
     """
     Play game of TicTactoe
@@ -30,6 +76,7 @@ def play(player_x: Agent, player_o: Agent):
     """
     env = gym.make("TicTacToe-v0")
     obs: numpy.ndarray = env.reset()
+    moves_second(player_o)
     player_x.obs = numpy.append(obs, Mark.X)
     player_o.obs = numpy.append(obs, Mark.O)
 
@@ -78,71 +125,148 @@ def play(player_x: Agent, player_o: Agent):
             env.render(mode="human")
 
 
-def learn_from_game(args):
-    builder = args[0]
-    num_games = args[1]
-
-    td_agent = builder.make()
-    player_x = builder.make()
-    player_o = builder.make()
+def self_play(players: Dict[Mark, Agent], num_games: int, first_game: int = 0,
+              checkpointer: Checkpointer = None) -> int:
+    """
+    Let two agents play games against each other and learn from them
+    :param players: The players of X and O
+    :param num_games: The number of games to play
+    :param first_game: The number of games the players have already played, when resuming from a checkpoint
+    :param checkpointer: Checkpoints the players, learning stops early once it is interrupted
+    :return: The number of games the players have played
+    """
+    player_x = players[Mark.X]
+    player_o = players[Mark.O]
 
-    env = gym.make("TicTacToe-v0")
-    obs: numpy.ndarray = env.reset()
+    env = gym.make("TicTacToe-v0").unwrapped
+    env.reset()
 
-    players: Dict[Mark, Agent] = {
-        Mark.X: player_x,
-        Mark.O: player_o,
+    # Every player observes the board followed by its own mark, both observations are updated in place after a move
+    observations: Dict[Mark, numpy.ndarray] = {
+        Mark.X: numpy.append(numpy.zeros(env.board_size, dtype=numpy.int64), Mark.X),
+        Mark.O: numpy.append(numpy.zeros(env.board_size, dtype=numpy.int64), Mark.O),
     }
+    obs_x, obs_o = observations[Mark.X], observations[Mark.O]
 
-    for _ in range(num_games):
-        player_x.obs = numpy.append(obs, Mark.X)
-        player_o.obs = numpy.append(obs, Mark.O)
+    games = first_game
+    for game in range(first_game, num_games):
+        obs_x[:env.board_size] = Mark.EMPTY
+        obs_o[:env.board_size] = Mark.EMPTY
 
         while True:
             next_player = env.next_player()
             current_player = env.current_player()
-            action: int = players[current_player].act(players[current_player].obs, available_actions(obs))
+            action: int = players[current_player].act(observations[current_player], env.legal_actions())
 
-            obs: numpy.ndarray
             reward: float
             done: bool
-            info: Dict[str, Status]
-            obs, reward, done, info = env.step(action)
-            players[current_player].learn(state=players[current_player].obs, action=action, reward=reward)
-            players[next_player].learn(state=players[next_player].obs, action=action, reward=-1 * reward)
+            status: Status
+            reward, done, status = env.fast_step(action)
+            players[current_player].learn(state=observations[current_player], action=action, reward=reward)
+            players[next_player].learn(state=observations[next_player], action=action, reward=-1 * reward)
 
-            player_x.obs = numpy.append(obs, Mark.X)
-            player_o.obs = numpy.append(obs, Mark.O)
+            obs_x[action] = current_player
+            obs_o[action] = current_player
 
             if done:
-                if info["status"] == Status.X_WINS:
-                    player_x.learn(player_x.obs, action, reward)
-                    player_o.learn(player_o.obs, action, -1 * reward)
-                elif info["status"] == Status.O_WINS:
-                    player_o.learn(player_o.obs, action, reward)
-                    player_x.learn(player_x.obs, action, -1 * reward)
+                if status == Status.X_WINS:
+                    player_x.learn(obs_x, action, reward)
+                    player_o.learn(obs_o, action, -1 * reward)
+                elif status == Status.O_WINS:
+                    player_o.learn(obs_o, action, reward)
+                    player_x.learn(obs_x, action, -1 * reward)
                 else:
-                    player_o.learn(player_o.obs, action, reward)
-                    player_x.learn(player_x.obs, action, reward)
+                    player_o.learn(obs_o, action, reward)
+                    player_x.learn(obs_x, action, reward)
 
                 player_o.reset()
                 player_x.reset()
-                obs = env.reset()
+                env.reset()
                 break
 
+        games = game + 1
+        if checkpointer is not None and not checkpointer.episode_done(games):
+            break
+
+    return games
+
+
+def learn_from_game(args):
+    builder = args[0]
+    num_games = args[1]
+    agent_id = args[2]
+    seed = args[3]
+    checkpoint = args[4]
+
+    numpy.random.seed(worker_seed(seed, agent_id))
+
+    td_agent = builder.make()
+    players: Dict[Mark, Agent] = {
+        Mark.X: builder.make(),
+        Mark.O: moves_second(builder.make()),
+    }
+
+    if checkpoint is None:
+        self_play(players, num_games)
+    else:
+        checkpointer = Checkpointer(agents={"x": players[Mark.X], "o": players[Mark.O]}, **checkpoint["options"])
+        first_game = checkpointer.restore() if checkpoint["resume"] else 0
+        checkpointer.flush(self_play(players, num_games, first_game=first_game, checkpointer=checkpointer))
+        checkpointer.close()
+
     td_agent.merge(players[Mark.X])
     td_agent.merge(players[Mark.O])
 
     return td_agent
 
 
-def learn(builder: AgentBuilder, num_games: int, num_agents: int, policy_filename: str = None):
+def learn_in_place(args):
+    """
+    Self play on the shared tables of a builder, the tables are learned in place so there is nothing to return
+    """
+    builder = args[0]
+    num_games = args[1]
+    agent_id = args[2]
+    seed = args[3]
+
+    numpy.random.seed(worker_seed(seed, agent_id))
+    self_play({Mark.X: builder.make(), Mark.O: builder.make()}, num_games)
+
+
+def share_tables(builder: AgentBuilder, states: TicTacToeStateIndex):
+    """
+    Move the tables of a builder into shared memory, starting from the tables it has been set with
+    :param builder: A preset builder with settings necessary for smart agent
+    :param states: The index of the tables
+    :return: The shared state values and transitions
+    """
+    agent = builder.make()
+
+    state_values = SharedValueTable(states, dtype=agent.state_values.dtype)
+    state_values.merge(agent.state_values)
+    transitions = SuccessorTable(states, num_actions=9, shared=True)
+    transitions.merge(agent.transitions)
+
+    builder.set(*builder.args, **{**builder.kwargs, "state_values": state_values, "transitions": transitions})
+    return state_values, transitions
+
+
+def learn(builder: AgentBuilder, num_games: int, num_agents: int, policy_filename: str = None,
+          hogwild: bool = False, compress: bool = False, checkpoint_dir: str = None, checkpoint_every: int = 0,
+          checkpoint_seconds: float = 0.0, resume: bool = False):
     """
     Pit agents against themselves tournament style. The winners survive.
     :param builder: A preset builder with settings necessary for smart agent
     :param num_games:  The number of games to play each other
     :param num_agents:  The number of games to play each other
     :param policy_filename: The filename to save the learned policy to
+    :param hogwild: Learn in one table in shared memory that every agent updates in place without locks, instead of
+                    merging the tables of every agent at the end. The builder must be set with a static state index.
+    :param compress: Compress the saved policy
+    :param checkpoint_dir: The directory every agent writes its checkpoints to, no checkpoints are written if not given
+    :param checkpoint_every: Write a checkpoint after this many games
+    :param checkpoint_seconds: Write a checkpoint once this many seconds have passed since the last one
+    :param resume: Continue every agent from its last checkpoint
     """
     processes = multiprocessing.cpu_count()
 
@@ -154,22 +278,69 @@ def learn(builder: AgentBuilder, num_games: int, num_agents: int, policy_filenam
     if num_agents < processes:
         processes = num_agents
 
-    main_agent = builder.make()
-    chunksize = math.floor(num_agents / processes)
-    with multiprocessing.Pool(processes=processes) as pool:
-        agents = ((builder, num_games) for _ in range(num_agents))
+    # Every worker seeds its own random number generator, forked workers would otherwise play the same games
+    seed = numpy.random.SeedSequence().entropy
 
-        print("Learning...")
-        for agent in tqdm(pool.imap_unordered(learn_from_game, iterable=agents, chunksize=chunksize), total=num_agents):
+    chunksize = math.floor(num_agents / processes)
+    checkpoints = [None] * num_agents
+    if hogwild:
+        state_values, transitions = share_tables(builder, builder.kwargs["states"])
+        try:
+            with multiprocessing.Pool(processes=processes) as pool:
+                agents = ((builder, num_games, agent_id, seed) for agent_id in range(num_agents))
+
+                print("Learning in shared memory...")
+                for _ in tqdm(pool.imap_unordered(learn_in_place, iterable=agents, chunksize=chunksize),
+                              total=num_agents):
+                    pass
+
+            builder.set(*builder.args, **{**builder.kwargs, "state_values": state_values.to_table(),
+                                          "transitions": transitions.to_transition_table()})
+            main_agent = builder.make()
+        finally:
+            state_values.unlink()
+            transitions.unlink()
+    else:
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            checkpoints = [{"options": {"filename": checkpoint_filename(checkpoint_dir, "tictactoe", agent_id),
+                                        "every_episodes": checkpoint_every,
+                                        "every_seconds": checkpoint_seconds,
+                                        "compress": compress},
+                            "resume": resume} for agent_id in range(num_agents)]
+
+            # Interrupting or terminating this process lets every worker write a last checkpoint and stop
+            stop_on_signals()
+
+        main_agent = builder.make()
+        initializer, initargs = (init_worker, (stop_requested,)) if checkpoint_dir else (None, ())
+        with multiprocessing.Pool(processes=processes, initializer=initializer, initargs=initargs) as pool:
+            agents = [(builder, num_games, agent_id, seed, checkpoints[agent_id]) for agent_id in range(num_agents)]
+            chunks = [(learn_from_game, chunk) for chunk in split_tasks(agents, processes)]
+
+            # Every worker merges the agents it learns, the workers' agents are merged here
+            print("Learning...")
+            agents = list(tqdm(pool.imap_unordered(learn_and_merge, iterable=chunks), total=len(chunks)))
+
+            if stop_requested.is_set():
+                print(f"Interrupted, the checkpoints in {checkpoint_dir} continue learning with --resume")
+                return
+
+        for agent in tqdm(agents, desc="Merging agents"):
             main_agent.merge(agent)
 
     if policy_filename:
         filename = policy_filename
     else:
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        filename = os.getcwd() + "/" + timestamp + ".pickle"
+        filename = os.getcwd() + "/" + timestamp + ".npz"
+
+    save_learning_agent(main_agent, filename=filename, compress=compress)
 
-    save_learning_agent(main_agent, filename=filename)
+    # The checkpoints are part of the saved policy now
+    for checkpoint in checkpoints:
+        if checkpoint is not None and os.path.exists(checkpoint["options"]["filename"]):
+            os.remove(checkpoint["options"]["filename"])
 
 
 def keyboard_interrupt_handler(signal, frame):
@@ -180,7 +351,8 @@ def main():
     signal.signal(signal.SIGINT, keyboard_interrupt_handler)
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("command", help="Play a game of TicTacToe or Train the EGreedyTemporalDifference agent.")
+    parser.add_argument("command", help="Play a game of TicTacToe, Train the EGreedyTemporalDifference agent or Solve "
+                                        "the game.")
 
     if len(sys.argv) <= 1:
         parser.print_help()
@@ -196,26 +368,31 @@ def main():
         subparser.add_argument("-O", choices=["human", "base", "smart"], help="Human, Base, or Smart",
                                default="human")
         subparser.add_argument("-p", "--with-policy", help="A data file containing a policy, generated from learning.")
+        subparser.add_argument("--learning", help="The learning agent of the smart player, which learned the policy.",
+                               choices=LEARNING_AGENTS,
+                               default="TemporalDifferenceZeroAveraging")
+        subparser.add_argument("-l", "--learning-rate", help="The learning rate of action value agents.",
+                               type=float,
+                               default=0.15)
+        subparser.add_argument("--symmetric", help="The policy stores the rotations and reflections of a board as one "
+                                                   "state.",
+                               action="store_true")
         logger: Logger = Logger(parser=subparser)
 
         suboptions = subparser.parse_args(sys.argv[2:])
 
         agent_types = {"human": AgentBuilder(policy="Human"), "base": AgentBuilder(policy="Random"),
-                       "smart": AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZeroAveraging")}
+                       "smart": AgentBuilder(policy="EGreedy", learning=suboptions.learning)}
 
         players = [suboptions.X, suboptions.O]
 
         for player in players:
             if player == "smart":
-                if suboptions.with_policy:
-                    state_values, transitions = load_learning_agent(suboptions.with_policy)
-                else:
-                    state_values, transitions = None, None
-
                 agent_types[player].set(exploratory_rate=0.0,
                                         discount_rate=0.5,
-                                        state_values=state_values,
-                                        transitions=transitions)
+                                        states=state_index(suboptions.symmetric),
+                                        **learning_options(suboptions.learning, suboptions.learning_rate,
+                                                           suboptions.with_policy))
 
         play(player_x=agent_types[players[0]].make(), player_o=agent_types[players[1]].make())
 
@@ -233,28 +410,88 @@ def main():
                                help="The amount to scale the learning of the temporal difference algorithm.",
                                type=float,
                                default=0.15)
+        subparser.add_argument("--learning", help="The learning agent of the players.",
+                               choices=LEARNING_AGENTS,
+                               default="TemporalDifferenceZeroAveraging")
         subparser.add_argument("-d", "--discount-rate",
                                help="How much of the current value to discount from the previous value.",
                                type=float,
                                default=0.5)
         subparser.add_argument("-p", "--with-policy", help="A data file containing a policy, generated from learning.",
                                default=None)
+        subparser.add_argument("--value-dtype", help="The floating point type of the learned state values.",
+                               choices=["float32", "float64"],
+                               default="float64")
+        subparser.add_argument("--expected", help="Score actions by the expected value of their next states.",
+                               action="store_true")
+        subparser.add_argument("--symmetric", help="Learn the rotations and reflections of a board as one state.",
+                               action="store_true")
+        subparser.add_argument("--hogwild", help="Learn in one table in shared memory that every agent updates in "
+                                                 "place, instead of merging the tables of every agent at the end.",
+                               action="store_true")
+        subparser.add_argument("--compress", help="Compress the saved policy.", action="store_true")
+        subparser.add_argument("--checkpoint-every", help="Write a checkpoint of every agent after this many games.",
+                               type=int, default=0)
+        subparser.add_argument("--checkpoint-seconds",
+                               help="Write a checkpoint of every agent once this many seconds have passed since the "
+                                    "last one.", type=float, default=0.0)
+        subparser.add_argument("--checkpoint-dir", help="The directory to write checkpoints to.",
+                               default="checkpoints")
+        subparser.add_argument("--resume", help="Continue every agent from its last checkpoint.", action="store_true")
         logger: Logger = Logger(parser=subparser)
 
         suboptions = subparser.parse_args(sys.argv[2:])
 
-        if suboptions.with_policy:
-            state_values, transitions = load_learning_agent(suboptions.with_policy)
-        else:
-            state_values, transitions = None, None
+        checkpointing = suboptions.checkpoint_every or suboptions.checkpoint_seconds or suboptions.resume
+        if checkpointing and suboptions.hogwild:
+            subparser.error("Checkpoints are not supported when learning in shared memory")
+        if suboptions.hogwild and issubclass(agent_registry()[suboptions.learning], ActionValueAgent):
+            subparser.error("Action values are not supported when learning in shared memory")
 
-        builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZeroAveraging")
+        builder = AgentBuilder(policy="EGreedy", learning=suboptions.learning)
         builder.set(exploratory_rate=suboptions.exploratory_rate,
                     discount_rate=suboptions.discount_rate,
-                    state_values=state_values,
-                    transitions=transitions)
+                    value_dtype=suboptions.value_dtype,
+                    expected=suboptions.expected,
+                    states=state_index(suboptions.symmetric),
+                    **learning_options(suboptions.learning, suboptions.learning_rate, suboptions.with_policy))
         learn(builder, num_games=suboptions.num_games, num_agents=suboptions.num_agents,
-              policy_filename=suboptions.with_policy)
+              policy_filename=suboptions.with_policy, hogwild=suboptions.hogwild, compress=suboptions.compress,
+              checkpoint_dir=suboptions.checkpoint_dir if checkpointing else None,
+              checkpoint_every=suboptions.checkpoint_every, checkpoint_seconds=suboptions.checkpoint_seconds,
+              resume=suboptions.resume)
+
+    elif options.command == "solve":
+        subparser = subparsers.add_parser("solve", help="Solve the game and write the exact value of every state as a "
+                                                        "policy.")
+        subparser.add_argument("-p", "--with-policy", help="The file to write the policy to.", default=None)
+        subparser.add_argument("-c", "--count",
+                               help="The visit count of every state, how much the exact values weigh when learning "
+                                    "from the policy.", type=float, default=1.0)
+        subparser.add_argument("--value-dtype", help="The floating point type of the state values.",
+                               choices=["float32", "float64"],
+                               default="float64")
+        subparser.add_argument("--symmetric", help="Store the rotations and reflections of a board as one state.",
+                               action="store_true")
+        subparser.add_argument("--compress", help="Compress the policy.", action="store_true")
+        logger: Logger = Logger(parser=subparser)
+
+        suboptions = subparser.parse_args(sys.argv[2:])
+
+        states = state_index(suboptions.symmetric)
+        state_values, transitions = solved_tables(states, count=suboptions.count, dtype=suboptions.value_dtype)
+
+        builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZeroAveraging")
+        builder.set(exploratory_rate=0.0, discount_rate=0.5, state_values=state_values, transitions=transitions,
+                    states=states)
+
+        if suboptions.with_policy:
+            filename = suboptions.with_policy
+        else:
+            filename = os.getcwd() + "/" + time.strftime("%Y%m%d_%H%M%S") + ".npz"
+
+        save_learning_agent(builder.make(), filename=filename, compress=suboptions.compress)
+        print(f"Solved {len(state_values)} states, the policy was written to {filename}")
 
 
 if __name__ == "__main__":
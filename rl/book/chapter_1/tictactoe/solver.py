@@ -0,0 +1,106 @@
+#! /usr/bin/env python3
+from typing import Tuple, Union
+
+import numpy
+
+from rl.agents.reprs import StateIndex, TransitionTable, ValueTable
+from rl.book.chapter_1.tictactoe.state_index import TicTacToeStateIndex
+from rl.envs.tictactoe import BOARD_POWERS, Mark, NUM_BOARD_CODES, STATUS_TABLE, Status, decode_boards, \
+    reachable_boards
+
+
+def win_rewards(num_marks: numpy.ndarray) -> numpy.ndarray:
+    """
+    The reward TicTacToeEnv.step gives the winner of a game, X wins on an odd tick and gets 1 / ticks while O wins on an
+    even tick and gets 1 / (ticks - 1)
+    :param num_marks: The number of marks on the board the game was won on, which is the number of ticks
+    :return: The reward of the winner
+    """
+    return 1.0 / numpy.where(num_marks % 2 == 1, num_marks, num_marks - 1)
+
+
+def solve() -> numpy.ndarray:
+    """
+    Find the exact value of every board for both players by retrograde analysis. Boards are solved from the full board
+    back to the empty board one number of marks at a time, so every board a move leads to is solved before the boards
+    it is reached from. The value of a finished game is the reward the player got for it, the value of a game in
+    progress is the reward the player gets if both players play perfectly from there on.
+    :return: A (3^9, 2) array of the value of every board for X and for O, indexed by the base-3 code of the board and
+             the mark minus one. The values of unreachable boards are nan.
+    """
+    codes = reachable_boards()
+    boards = decode_boards(codes)
+    num_marks = numpy.count_nonzero(boards, axis=1)
+    statuses = STATUS_TABLE[codes]
+
+    # The value of every board for the player to move, or for the player who made the last move if the game is over
+    values = numpy.full(NUM_BOARD_CODES, numpy.nan)
+    finished = statuses != Status.IN_PROGRESS
+    values[codes[finished]] = numpy.where(statuses[finished] == Status.DRAW, 0.0, win_rewards(num_marks[finished]))
+
+    for marks in range(8, -1, -1):
+        layer = numpy.flatnonzero((num_marks == marks) & ~finished)
+        if not len(layer):
+            continue
+
+        player = Mark.X if marks % 2 == 0 else Mark.O
+        layer_codes = codes[layer]
+        empty = boards[layer] == Mark.EMPTY
+
+        # The value of every move is the value of the finished game, or minus the value of the game for the opponent
+        next_codes = numpy.where(empty, layer_codes[:, numpy.newaxis] + player * BOARD_POWERS, 0)
+        next_values = values[next_codes]
+        move_values = numpy.where(STATUS_TABLE[next_codes] == Status.IN_PROGRESS, -next_values, next_values)
+        values[layer_codes] = numpy.where(empty, move_values, -numpy.inf).max(axis=1)
+
+    # Seen from the player who made the last move of a finished game or the player to move in a game in progress
+    players = numpy.where(finished, numpy.where(num_marks % 2 == 1, Mark.X, Mark.O),
+                          numpy.where(num_marks % 2 == 0, Mark.X, Mark.O))
+
+    solved = numpy.full((NUM_BOARD_CODES, 2), numpy.nan)
+    solved[codes, players - Mark.X] = values[codes]
+    solved[codes, Mark.O - players] = -values[codes]
+    return solved
+
+
+def solved_tables(states: StateIndex = None, count: float = 1.0,
+                  dtype: Union[str, numpy.dtype] = numpy.float64) -> Tuple[ValueTable, TransitionTable]:
+    """
+    Write the exact value of every tic-tac-toe state, and every move that can be made from it, into the tables of a
+    learning agent. The tables can be passed to any learning agent as its state values and transitions.
+    :param states: The index of the tables, a TicTacToeStateIndex by default
+    :param count: The visit count of every state, how much weight the exact values carry when the agent keeps learning
+    :param dtype: The floating point type of the values
+    :return: The state values and transitions
+    """
+    states = TicTacToeStateIndex() if states is None else states
+    state_values = ValueTable(dtype=dtype, states=states)
+    transitions = TransitionTable(states=states)
+    solved = solve()
+
+    codes = reachable_boards()
+    boards = decode_boards(codes).tolist()
+    for mark in (Mark.X, Mark.O):
+        for code, board in zip(codes.tolist(), boards):
+            state = board + [int(mark)]
+            index = state_values.slot(state)
+            state_values.values[index] = solved[code, mark - Mark.X]
+            state_values.counts[index] = count
+
+            if STATUS_TABLE[code] != Status.IN_PROGRESS:
+                continue
+
+            # Every move of either player leads to one board, seen with the same mark
+            player = Mark.X if board.count(Mark.EMPTY) % 2 == 1 else Mark.O
+            for action in (cell for cell, cell_mark in enumerate(board) if cell_mark == Mark.EMPTY):
+                canonical_action = states.canonical_actions(state, action)
+                if transitions.find(index, canonical_action) >= 0:
+                    # A symmetric board has already added this move
+                    continue
+
+                next_state = list(state)
+                next_state[action] = int(player)
+                transitions.add(transitions.row(index, canonical_action), states.intern(next_state))
+
+    transitions.compact()
+    return state_values, transitions
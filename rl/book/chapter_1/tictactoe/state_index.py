@@ -0,0 +1,138 @@
+#! /usr/bin/env python3
+from typing import Tuple, Union
+
+import numpy
+
+from rl.agents.reprs import StateIndex
+from rl.envs.tictactoe import Mark, NUM_BOARD_CODES, board_code, decode_boards, encode_boards, reachable_boards
+
+# The 8 rotations and reflections of the board as permutations of its cells, the transformed board is board[symmetry]
+SYMMETRIES: numpy.ndarray = numpy.array([transform(numpy.rot90(numpy.arange(9).reshape(3, 3), k)).ravel()
+                                         for k in range(4) for transform in (numpy.asarray, numpy.fliplr)])
+
+# The cell of the transformed board every cell of the board moves to
+INVERSE_SYMMETRIES: numpy.ndarray = numpy.argsort(SYMMETRIES, axis=1)
+
+
+class TicTacToeStateIndex(StateIndex):
+    """
+    Perfect index of tic-tac-toe states. A state is a board followed by the mark of the player observing it. Every
+    reachable board is enumerated once and gets a fixed dense id for either mark, so the tables of a tic-tac-toe agent
+    are allocated up front and agents never intern states while they learn.
+
+    The index never changes after it is built, so there is one per process. Copies and unpickled indices are that same
+    object, which lets agents built from one builder, or loaded from a saved policy, share their ids.
+    """
+    instance: "TicTacToeStateIndex" = None
+
+    def __new__(cls):
+        # Look in the class itself so that subclasses do not return the instance of their parent
+        if cls.__dict__.get("instance") is None:
+            cls.instance = super().__new__(cls)
+            cls.instance.build()
+
+        return cls.instance
+
+    def __init__(self):
+        # The ids are built once when the index is first created
+        pass
+
+    def __reduce__(self):
+        return self.__class__, ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def canonicalize(self, codes: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Map boards to the boards their states are stored under
+        :param codes: The base-3 codes of boards
+        :return: The codes of the boards the states are stored under and the symmetry that maps each board onto it
+        """
+        return codes, numpy.zeros(len(codes), dtype=numpy.int64)
+
+    def build(self):
+        """
+        Enumerate the reachable states. The id of a state is the rank of its board among the boards states are stored
+        under, offset by the number of those boards if the mark is O.
+        """
+        reachable = reachable_boards()
+        canonical, symmetries = self.canonicalize(reachable)
+
+        self.board_codes: numpy.ndarray = numpy.unique(canonical)
+        self.board_ranks: numpy.ndarray = numpy.full(NUM_BOARD_CODES, -1, dtype=numpy.int64)
+        self.board_ranks[reachable] = numpy.searchsorted(self.board_codes, canonical)
+        self.board_symmetries: numpy.ndarray = numpy.zeros(NUM_BOARD_CODES, dtype=numpy.int64)
+        self.board_symmetries[reachable] = symmetries
+
+        num_boards = len(self.board_codes)
+        boards = decode_boards(self.board_codes).tolist()
+        self.keys = [tuple(board + [int(mark)]) for mark in (Mark.X, Mark.O) for board in boards]
+
+        # Every reachable state, not only the ones states are stored under, is looked up through the mapping
+        reachable_ranks = self.board_ranks[reachable].tolist()
+        self.ids = {tuple(board + [int(mark)]): offset + rank
+                    for mark, offset in ((Mark.X, 0), (Mark.O, num_boards))
+                    for board, rank in zip(decode_boards(reachable).tolist(), reachable_ranks)}
+
+    def intern(self, state) -> int:
+        """
+        :param state: A reachable board followed by the mark of the player observing it
+        :return: The id of the state
+        """
+        index = self.find(state)
+
+        if index < 0:
+            raise KeyError(f"Not a reachable tic-tac-toe state: {state}")
+
+        return index
+
+    def find_all(self, states: numpy.ndarray) -> numpy.ndarray:
+        """
+        Look up the ids of many states at once by the base-3 codes of their boards
+        :param states: An array of boards followed by the mark of the player observing them
+        :return: The id of every state, -1 for states that are not reachable
+        """
+        states = numpy.asarray(states, dtype=numpy.int64)
+        ranks = self.board_ranks[encode_boards(states[:, :9])]
+        marks = states[:, 9]
+
+        valid = (ranks >= 0) & ((marks == Mark.X) | (marks == Mark.O))
+        return numpy.where(valid, (marks - Mark.X) * len(self.board_codes) + ranks, -1)
+
+
+class SymmetricTicTacToeStateIndex(TicTacToeStateIndex):
+    """
+    Perfect index of tic-tac-toe states up to symmetry. The 8 rotations and reflections of a board are one position, so
+    they share one id, the one of the transformed board with the lowest code. Actions are mapped into the frame of that
+    board, which lets a transition learned on one board score the moves of all its symmetric boards.
+    """
+    instance: "SymmetricTicTacToeStateIndex" = None
+
+    def canonicalize(self, codes: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        transformed = encode_boards(decode_boards(codes)[:, SYMMETRIES])
+        symmetries = transformed.argmin(axis=1)
+        return transformed[numpy.arange(len(codes)), symmetries], symmetries
+
+    def canonical_actions(self, state, actions: Union[int, numpy.ndarray]) -> Union[int, numpy.ndarray]:
+        inverse = INVERSE_SYMMETRIES[self.board_symmetries[board_code(state)]]
+
+        if isinstance(actions, numpy.ndarray):
+            return inverse[actions]
+        return int(inverse[actions])
+
+    def actions_from_canonical(self, state, actions: Union[int, numpy.ndarray]) -> Union[int, numpy.ndarray]:
+        """
+        Map actions from the frame of the state's id back onto the board of the state
+        :param state: A board followed by the mark of the player observing it
+        :param actions: An action or an array of actions in the frame of the state's id
+        :return: The actions on the board of the state
+        """
+        symmetry = SYMMETRIES[self.board_symmetries[board_code(state)]]
+
+        if isinstance(actions, numpy.ndarray):
+            return symmetry[actions]
+        return int(symmetry[actions])
@@ -8,46 +8,49 @@ import multiprocessing
 import os
 import signal
 import sys
-from collections import defaultdict
 from typing import List, Dict
 
-import gym
-import matplotlib.pyplot as plt
 import numpy
-import yaml
 from tqdm import tqdm
 
-from rl.agents import AgentBuilder
-from rl.agents.reprs import Value
+from rl.agents import AgentBuilder, make_batched_agent
+from rl.agents.reprs import TransitionTable, Value, ValueTable
+from rl.book.chapter_2.testbed import Testbed
+from rl.envs import make_env
 from rl.utils.logging_utils import Logger
 
+# A k-armed bandit has a single state to act from. The agent lands in the state of the arm it pulled, whose value is
+# the value of that arm.
+BANDIT_STATE = numpy.array([-1])
+
 
 def get_builder(agent_config, num_arms, optimistic: float):
-    if optimistic > 0:
-        state_values = defaultdict(Value)
-        for i in range(num_arms):
-            state_values[(i,)] = Value(count=0, value=optimistic)
-        agent_config["kwargs"]["state_values"] = state_values
+    state_values = ValueTable(capacity=num_arms)
+    for i in range(num_arms):
+        state_values[(i,)] = Value(count=0, value=optimistic)
+
+    transitions = TransitionTable(states=state_values.states)
+    for action in range(num_arms):
+        row = transitions.row(state_values.slot(BANDIT_STATE), action)
+        transitions.add(row, state_values.slot((action,)))
+
+    agent_config["kwargs"]["state_values"] = state_values
+    agent_config["kwargs"]["transitions"] = transitions
 
     builder = AgentBuilder(agent_config["policy"], agent_config["learning"])
     builder.set(**agent_config["kwargs"])
     return builder
 
 
-def transition_model(state, action):
-    return numpy.array([1]), [numpy.array([action])]
-
-
 def available_actions(num_arms):
     return numpy.arange(num_arms)
 
 
 def play(agent, env_name, arms, num_iterations, nonstationary):
     # Create a window to render into
-    env = gym.make(env_name)
+    env = make_env(env_name)
     obs = env.reset()
 
-    state = numpy.array([env.action_space.sample()])
     rewards = numpy.zeros(num_iterations)
     optimal_percentages = numpy.zeros(num_iterations)
     optimal_count = 0
@@ -60,7 +63,7 @@ def play(agent, env_name, arms, num_iterations, nonstationary):
                 env.r_dist[i][0] += adjustments[i]
 
         optimal_action = env.r_dist.index(max(env.r_dist))
-        action = agent.act(state, available_actions(arms))
+        action = agent.act(BANDIT_STATE, available_actions(arms))
 
         obs, reward, done, info = env.step(action)
         state = numpy.array([action])
@@ -73,11 +76,56 @@ def play(agent, env_name, arms, num_iterations, nonstationary):
     return rewards, optimal_percentages
 
 
+def play_testbed(agents, arms, num_iterations, nonstationary, label=None):
+    testbed = Testbed(runs=len(agents), arms=arms, nonstationary=nonstationary)
+    actions = numpy.zeros(len(agents), dtype=numpy.int64)
+
+    rewards = numpy.zeros(num_iterations)
+    optimal_percentages = numpy.zeros(num_iterations)
+    optimal_count = 0
+    for ep in tqdm(range(num_iterations), total=num_iterations, desc=label):
+        for run, agent in enumerate(agents):
+            actions[run] = agent.act(BANDIT_STATE, available_actions(arms))
+
+        run_rewards, optimal = testbed.step(actions)
+        for agent, action, reward in zip(agents, actions.tolist(), run_rewards.tolist()):
+            agent.learn(state=numpy.array([action]), action=action, reward=reward)
+
+        # Averaged over the runs
+        optimal_count += optimal.mean()
+        optimal_percentages[ep] = optimal_count / (ep + 1)
+        rewards[ep] = run_rewards.mean()
+
+    return rewards, optimal_percentages
+
+
+def play_batched(agent, arms, num_iterations, nonstationary, label=None):
+    testbed = Testbed(runs=agent.runs, arms=arms, nonstationary=nonstationary)
+
+    rewards = numpy.zeros(num_iterations)
+    optimal_percentages = numpy.zeros(num_iterations)
+    optimal_count = 0
+    for ep in tqdm(range(num_iterations), total=num_iterations, desc=label):
+        actions = agent.act(available_actions(arms))
+        run_rewards, optimal = testbed.step(actions)
+        agent.learn(actions, run_rewards)
+
+        # Averaged over the runs
+        optimal_count += optimal.mean()
+        optimal_percentages[ep] = optimal_count / (ep + 1)
+        rewards[ep] = run_rewards.mean()
+
+    return rewards, optimal_percentages
+
+
 def keyboard_interrupt_handler(signal, frame):
     sys.exit(0)
 
 
 def plot(data: numpy.ndarray, agent_config, image_name: str, num_iterations: int):
+    # Plotting is only done once at the end and matplotlib is slow to import
+    import matplotlib.pyplot as plt
+
     fig, (rewards_plot, percentage_plot) = plt.subplots(2, 1, figsize=(20, 16))
 
     iterations = numpy.arange(num_iterations)
@@ -113,18 +161,31 @@ def run_experiment(args):
     num_iterations = args[3]
     env_name = args[4]
     nonstationary = args[5]
+    engine = args[6]
+    batched = args[7]
+
+    label = f"{agent_config['policy']}{agent_config['learning']}"
+    for kwarg, value in agent_config["kwargs"].items():
+        label += f" {kwarg[0]}: {value}"
+
+    if batched:
+        # One agent object learns all the episodes as the runs of one testbed
+        agent = make_batched_agent(agent_config["policy"], agent_config["learning"], runs=num_episodes, arms=arms,
+                                   optimistic=agent_config.get("optimistic", 0), **agent_config["kwargs"])
+        return play_batched(agent, arms, num_iterations=num_iterations, nonstationary=nonstationary, label=label)
 
     builder = get_builder(agent_config, arms, agent_config.get("optimistic", 0))
 
     rewards = numpy.zeros(num_iterations)
     percentages = numpy.zeros(num_iterations)
-    label = f"{agent_config['policy']}{agent_config['learning']}"
-    for kwarg, value in agent_config["kwargs"].items():
-        if kwarg != "state_values" and kwarg != "transitions":
-            label += f" {kwarg[0]}: {value}"
+
+    if engine == "testbed":
+        # All the episodes are independent runs of one testbed
+        agents = [builder.make() for _ in range(num_episodes)]
+        return play_testbed(agents, arms, num_iterations=num_iterations, nonstationary=nonstationary, label=label)
+
     for ep_num in tqdm(range(num_episodes), total=num_episodes, desc=label):
         agent = builder.make()
-        agent.transition_model = transition_model
         new_rewards, optimal_percentages = play(agent, env_name, arms, num_iterations=num_iterations,
                                                 nonstationary=nonstationary)
         rewards += 1 / (ep_num + 1) * (new_rewards - rewards)
@@ -133,13 +194,19 @@ def run_experiment(args):
     return rewards, percentages
 
 
-def simulate(agents: List[Dict], arms: int, env_name: str, num_episodes: int, num_iterations: int, nonstationary: Dict):
+def simulate(agents: List[Dict], arms: int, env_name: str, num_episodes: int, num_iterations: int, nonstationary: Dict,
+             engine: str = "gym", batched: bool = False):
     """
     :param num_episodes:  The number of games to play each other
+    :param engine: "gym" to play every episode in its own env_name environment, "testbed" to play all the episodes
+                   as the runs of one vectorized k-armed testbed
+    :param batched: Play all the episodes of an agent with one batched agent on a testbed, ignores the engine
     """
     processes = multiprocessing.cpu_count()
     print(f"Simulating bandits! Number of episodes per agent: {num_episodes} Number of agents: {len(agents)}")
-    print(f"Env: {env_name} arms: {arms}")
+    if batched:
+        engine = "batched testbed"
+    print(f"Env: {env_name if engine == 'gym' else engine} arms: {arms}")
 
     if len(agents) < processes:
         processes = len(agents)
@@ -147,8 +214,8 @@ def simulate(agents: List[Dict], arms: int, env_name: str, num_episodes: int, nu
     chunksize = math.floor(len(agents) / processes)
 
     with multiprocessing.Pool(processes=processes) as pool:
-        experiment_inputs = ((agent_config, arms, num_episodes, num_iterations, env_name, nonstationary) for
-                             agent_config in agents)
+        experiment_inputs = ((agent_config, arms, num_episodes, num_iterations, env_name, nonstationary, engine,
+                              batched) for agent_config in agents)
 
         os.system('clear')
         total_rewards_percentages = numpy.array(
@@ -175,9 +242,16 @@ def main():
     parser.add_argument("-env", "--env-name", help="rlgym environment to load",
                         type=str,
                         default=False)
+    parser.add_argument("-e", "--engine", help="Play every episode in a gym environment or all of them in one testbed",
+                        choices=["gym", "testbed"],
+                        default=False)
+    parser.add_argument("-b", "--batched", help="Play every agent's episodes with one batched agent on a testbed",
+                        action="store_true")
 
     logger: Logger = Logger(parser=parser)
     options = parser.parse_args()
+
+    import yaml
     with open(sys.argv[1], 'r') as f:
         if hasattr(yaml, "FullLoader"):
             configuration = yaml.load(f, Loader=yaml.FullLoader)
@@ -196,12 +270,24 @@ def main():
     if options.env_name:
         configuration["env_name"] = options.env_name
 
+    if options.engine:
+        configuration["engine"] = options.engine
+
+    if options.batched:
+        configuration["batched"] = True
+
+    if configuration.get("engine", "gym") == "gym" and not configuration.get("batched") and \
+            not configuration.get("env_name"):
+        parser.error("The gym engine needs an environment, set env_name in the configuration or pass --env-name")
+
     total_rewards_percentages = simulate(configuration["agents"],
                                          configuration["arms"],
-                                         configuration["env_name"],
+                                         configuration.get("env_name"),
                                          configuration["num_episodes"],
                                          configuration["num_iterations"],
-                                         configuration.get("nonstationary", {}))
+                                         configuration.get("nonstationary", {}),
+                                         configuration.get("engine", "gym"),
+                                         configuration.get("batched", False))
 
     plot(total_rewards_percentages,
          agent_config=configuration["agents"],
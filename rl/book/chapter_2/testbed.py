@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+from typing import Dict, Tuple
+
+import numpy
+
+
+class Testbed:
+    """
+    The k-armed testbed of chapter 2 for many independent runs at once. The true value of every arm of every run lives
+    in one (runs, arms) array, each arm's mean is drawn from a normal distribution with mean 0 and variance 1 and
+    pulling an arm yields a reward drawn from a normal distribution around its mean with variance 1.
+
+    Nonstationary testbeds take independent random walks. The drift of the next block of steps is drawn and accumulated
+    in one call, which also finds the optimal arm of every run at every step of the block.
+    """
+
+    def __init__(self, runs: int, arms: int, nonstationary: Dict = None, block_size: int = None):
+        """
+        :param runs: The number of independent bandit problems
+        :param arms: The number of arms of every bandit problem
+        :param nonstationary: The mean "mu" and standard deviation "sigma" of the random walk of the arm means, the
+                              testbed is stationary if not given
+        :param block_size: The number of steps of drift to draw at once, defaults to about a million values per block
+        """
+        self.runs = runs
+        self.arms = arms
+        self.nonstationary = nonstationary
+        self.block_size = block_size if block_size else max(1, 2 ** 20 // (runs * arms))
+
+        self.means: numpy.ndarray = numpy.random.normal(0.0, 1.0, (runs, arms))
+        self.optimal_actions: numpy.ndarray = self.means.argmax(axis=1)
+
+        # The initial means are the last step of an exhausted block, so the first drift draws a new block
+        self.run_indices = numpy.arange(runs)
+        self.block_means: numpy.ndarray = self.means[numpy.newaxis]
+        self.block_optimal_actions: numpy.ndarray = self.optimal_actions[numpy.newaxis]
+        self.block_step: int = 1
+
+    def drift(self):
+        """
+        Move the arm means one step along their random walks
+        """
+        if self.block_step == len(self.block_means):
+            mu = self.nonstationary["mu"]
+            sigma = self.nonstationary["sigma"]
+
+            adjustments = numpy.random.normal(mu, sigma, (self.block_size, self.runs, self.arms))
+            self.block_means = numpy.cumsum(adjustments, axis=0, out=adjustments)
+            self.block_means += self.means
+            self.block_optimal_actions = self.block_means.argmax(axis=2)
+            self.block_step = 0
+
+        self.means = self.block_means[self.block_step]
+        self.optimal_actions = self.block_optimal_actions[self.block_step]
+        self.block_step += 1
+
+    def step(self, actions: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Pull one arm in every run. Nonstationary arm means drift before the arms are pulled.
+        :param actions: The arm pulled in every run
+        :return: The reward of every run and whether the pulled arm was the optimal arm of that run
+        """
+        if self.nonstationary:
+            self.drift()
+
+        rewards = self.means[self.run_indices, actions] + numpy.random.normal(0.0, 1.0, self.runs)
+        return rewards, actions == self.optimal_actions
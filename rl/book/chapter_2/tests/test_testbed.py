@@ -0,0 +1,33 @@
+import numpy
+
+from rl.book.chapter_2 import testbed
+
+
+def test_drift():
+    numpy.random.seed(0)
+    bandits = testbed.Testbed(runs=50, arms=4, nonstationary={"mu": 0.0, "sigma": 0.5}, block_size=3)
+
+    # The steps cross several blocks, the walk continues from the last means of the previous block
+    for step in range(10):
+        means = bandits.means.copy()
+        actions = numpy.random.randint(4, size=50)
+        _, optimal = bandits.step(actions)
+
+        assert bandits.block_step == step % 3 + 1
+        assert numpy.array_equal(bandits.optimal_actions, bandits.means.argmax(axis=1))
+        assert numpy.array_equal(optimal, actions == bandits.means.argmax(axis=1))
+        assert 0.0 < numpy.abs(bandits.means - means).max() < 5.0
+
+
+def test_stationary():
+    numpy.random.seed(0)
+    bandits = testbed.Testbed(runs=50, arms=4, block_size=3)
+    means = bandits.means.copy()
+
+    for _ in range(10):
+        actions = numpy.random.randint(4, size=50)
+        _, optimal = bandits.step(actions)
+
+        assert numpy.array_equal(bandits.means, means)
+        assert numpy.array_equal(optimal, actions == means.argmax(axis=1))
+    assert len(bandits.block_means) == 1
@@ -1,6 +1,30 @@
+import importlib
+
+import gym
 from gym.envs.registration import register
 
 register(
     id='TicTacToe-v0',
     entry_point='rl.envs.tictactoe:TicTacToeEnv',
-)
\ No newline at end of file
+)
+
+# The packages that register the environments whose ids start with a prefix. They are slow to import, so they are
+# only imported once one of their environments is made.
+ENV_PACKAGES = {
+    "MiniGrid-": "gym_minigrid.envs",
+    "Bandit": "gym_bandits",
+}
+
+
+def make_env(env_id: str, **kwargs) -> gym.Env:
+    """
+    Make an environment, importing the package that registers it first
+    :param env_id: The id of the environment, such as MiniGrid-Empty-5x5-v0
+    :param kwargs: Keyword arguments of the environment
+    :return: The environment
+    """
+    for prefix, package in ENV_PACKAGES.items():
+        if env_id.startswith(prefix):
+            importlib.import_module(package)
+
+    return gym.make(env_id, **kwargs)
@@ -1,4 +1,5 @@
 import numpy
+import pytest
 
 from rl.envs import tictactoe
 from rl.envs.tictactoe import Mark, Status
@@ -101,3 +102,142 @@ def test_step():
     assert env.done is False
     assert env.board_size == 9
     assert env.info["status"].value == Status.X_WINS.value
+
+
+def test_encode_boards():
+    board = numpy.array([Mark.X, Mark.O, Mark.EMPTY, Mark.EMPTY, Mark.X, Mark.EMPTY, Mark.EMPTY, Mark.EMPTY, Mark.O])
+    code = tictactoe.encode_boards(board)
+    assert code == 1 + 2 * 3 + 1 * 3 ** 4 + 2 * 3 ** 8
+    assert numpy.array_equal(tictactoe.decode_boards(code), board)
+
+    codes = numpy.arange(tictactoe.NUM_BOARD_CODES)
+    assert numpy.array_equal(tictactoe.encode_boards(tictactoe.decode_boards(codes)), codes)
+
+
+def test_reachable_boards():
+    boards = tictactoe.decode_boards(tictactoe.reachable_boards())
+    assert len(boards) == 5478
+
+    # X moves first, so X has made as many moves as O or one more
+    num_x = (boards == Mark.X).sum(axis=1)
+    num_o = (boards == Mark.O).sum(axis=1)
+    assert ((num_x - num_o == 0) | (num_x - num_o == 1)).all()
+
+
+def test_state_index():
+    from copy import deepcopy
+    from pickle import dumps, loads
+    from rl.book.chapter_1.tictactoe.state_index import TicTacToeStateIndex
+
+    states = TicTacToeStateIndex()
+    assert len(states) == 2 * 5478
+    assert TicTacToeStateIndex() is states and deepcopy(states) is states and loads(dumps(states)) is states
+
+    state = numpy.append(numpy.array([Mark.X] + [Mark.EMPTY] * 8, dtype=numpy.uint8), Mark.O)
+    index = states.intern(state)
+    assert states.state(index) == tuple(state.tolist())
+    assert states.find_all(numpy.array([state, [Mark.X] * 9 + [Mark.O]])).tolist() == [index, -1]
+
+
+def test_game_statuses():
+    boards = tictactoe.decode_boards(numpy.arange(tictactoe.NUM_BOARD_CODES))
+    statuses = tictactoe.game_statuses(boards)
+
+    for board, status in zip(boards[::97], statuses[::97]):
+        assert tictactoe.game_status(board) == status
+
+    board = numpy.array([Mark.O, Mark.X, Mark.O, Mark.O, Mark.X, Mark.X, Mark.X, Mark.O, Mark.O])
+    boards = numpy.array([board, [Mark.X] * 3 + [Mark.EMPTY] * 6, [Mark.EMPTY] * 9])
+    assert tictactoe.game_statuses(boards).tolist() == [Status.DRAW, Status.X_WINS, Status.IN_PROGRESS]
+
+
+def test_fast_step():
+    env = tictactoe.TicTacToeEnv()
+    checked_env = tictactoe.TicTacToeEnv()
+    assert env.legal_actions().tolist() == list(range(9))
+
+    for action in [4, 0, 2, 6, 3, 5, 1, 7, 8]:
+        reward, done, status = env.fast_step(action)
+        obs, checked_reward, checked_done, info = checked_env.step(action)
+
+        assert numpy.array_equal(env.state, obs)
+        assert (reward, done, status) == (checked_reward, checked_done, info["status"])
+        assert env.code == tictactoe.encode_boards(env.state)
+        assert env.legal_actions().tolist() == numpy.flatnonzero(env.state == Mark.EMPTY).tolist()
+
+        if done:
+            break
+
+    assert env.status == Status.DRAW
+    final_board = env.observation
+    obs = env.reset()
+    assert env.code == 0 and env.legal_actions().tolist() == list(range(9))
+
+    # The board of the last game is kept, the observation of the new game changes with its moves
+    assert (final_board != Mark.EMPTY).all() and (obs == Mark.EMPTY).all()
+    env.fast_step(4)
+    assert obs[4] == Mark.X
+
+    # Marking a cell that is not empty is rejected
+    checked_env.reset()
+    checked_env.step(4)
+    with pytest.raises(AssertionError):
+        checked_env.step(4)
+
+
+def test_symmetric_state_index():
+    from rl.book.chapter_1.tictactoe.state_index import SYMMETRIES, SymmetricTicTacToeStateIndex, TicTacToeStateIndex
+
+    states = SymmetricTicTacToeStateIndex()
+    assert len(states) == 2 * 765
+    assert states is not TicTacToeStateIndex()
+
+    board = numpy.array([Mark.X, Mark.O] + [Mark.EMPTY] * 7, dtype=numpy.uint8)
+    state = numpy.append(board, Mark.X)
+    index = states.find(state)
+    for symmetry in SYMMETRIES:
+        assert states.find(numpy.append(board[symmetry], Mark.X)) == index
+
+    # Moving into an action lands in the same position as moving into its canonical action on the canonical board
+    canonical_board = numpy.array(states.state(index)[:9])
+    for action in numpy.flatnonzero(board == Mark.EMPTY):
+        canonical_action = states.canonical_actions(state, action)
+        assert states.actions_from_canonical(state, canonical_action) == action
+
+        next_board, next_canonical_board = board.copy(), canonical_board.copy()
+        next_board[action] = next_canonical_board[canonical_action] = Mark.O
+        assert states.find(numpy.append(next_board, Mark.X)) == states.find(numpy.append(next_canonical_board, Mark.X))
+
+
+def test_solver():
+    from rl.agents import AgentBuilder
+    from rl.book.chapter_1.tictactoe.solver import solve, solved_tables
+
+    solved = solve()
+
+    # Perfect play is a draw, and X wins on the next move by completing the top row
+    assert solved[0].tolist() == [0.0, 0.0]
+    board = numpy.array([Mark.X, Mark.X, Mark.EMPTY, Mark.O, Mark.O, Mark.EMPTY, Mark.EMPTY, Mark.EMPTY, Mark.EMPTY])
+    assert solved[tictactoe.encode_boards(board)].tolist() == [1.0 / 5, -1.0 / 5]
+
+    # An agent that acts greedily on the exact values never loses
+    state_values, transitions = solved_tables()
+    builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZeroAveraging")
+    builder.set(exploratory_rate=0.0, discount_rate=0.5, state_values=state_values, transitions=transitions,
+                states=state_values.states)
+    agent = builder.make()
+
+    numpy.random.seed(0)
+    env = tictactoe.TicTacToeEnv()
+    for game in range(40):
+        agent_mark = Mark.X if game % 2 == 0 else Mark.O
+        env.reset()
+
+        while not env.done:
+            if env.player == agent_mark:
+                action = agent.act(numpy.append(env.state, agent_mark), env.legal_actions())
+            else:
+                action = numpy.random.choice(env.legal_actions())
+            env.fast_step(action)
+
+        assert env.status != (Status.O_WINS if agent_mark == Mark.X else Status.X_WINS)
@@ -0,0 +1,59 @@
+import numpy
+
+from rl.envs.tictactoe import Mark, Status, TicTacToeEnv
+from rl.envs.vec_tictactoe import VecTicTacToeEnv
+
+
+def test_step():
+    numpy.random.seed(0)
+    num_envs = 16
+    vec_env = VecTicTacToeEnv(num_envs)
+    envs = [TicTacToeEnv() for _ in range(num_envs)]
+
+    obs = vec_env.reset()
+    assert numpy.array_equal(obs, numpy.zeros((num_envs, 9)))
+    assert vec_env.legal_actions().all()
+
+    num_done = 0
+    for _ in range(50):
+        legal_actions = vec_env.legal_actions()
+        actions = numpy.array([numpy.random.choice(numpy.flatnonzero(legal)) for legal in legal_actions])
+        obs, rewards, dones, info = vec_env.step(actions)
+
+        for i, (env, action) in enumerate(zip(envs, actions)):
+            env_obs, reward, done, env_info = env.step(action)
+            assert numpy.array_equal(info["final_boards"][i], env_obs)
+            assert (rewards[i], dones[i], info["status"][i]) == (reward, done, env_info["status"])
+
+            if done:
+                env.reset()
+                num_done += 1
+
+            assert numpy.array_equal(obs[i], env.state)
+            assert info["players"][i] == env.player
+
+        assert numpy.array_equal(info["legal_actions"], obs == Mark.EMPTY)
+
+        # The buffers are reused by every step
+        assert obs is vec_env.boards and info["final_boards"] is vec_env.final_boards
+        assert info["players"] is vec_env.players
+
+    # Every game has finished at least once and been reset automatically
+    assert num_done >= num_envs
+
+
+def test_rewards():
+    vec_env = VecTicTacToeEnv(2)
+    vec_env.reset()
+
+    # X wins the first game on the top row, O wins the second game on the middle row
+    for actions in [[0, 0], [3, 3], [1, 1], [4, 4], [2, 8]]:
+        obs, rewards, dones, info = vec_env.step(actions)
+
+    assert dones.tolist() == [True, False]
+    assert info["status"].tolist() == [Status.X_WINS, Status.IN_PROGRESS]
+    assert rewards.tolist() == [1.0 / 5, 0.0]
+
+    obs, rewards, dones, info = vec_env.step([0, 5])
+    assert info["status"].tolist() == [Status.IN_PROGRESS, Status.O_WINS]
+    assert rewards.tolist() == [0.0, 1.0 / 5]
@@ -2,7 +2,7 @@
 import enum
 import logging
 import pprint
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 import gym
 import numpy
@@ -23,33 +23,123 @@ class Status(enum.IntEnum):
     DRAW = 3
 
 
+# A board is encoded as the base-3 number whose i-th digit is the mark in the i-th cell
+BOARD_POWERS: numpy.ndarray = 3 ** numpy.arange(9, dtype=numpy.int64)
+NUM_BOARD_CODES: int = 3 ** 9
+
+
+def encode_boards(boards: numpy.ndarray) -> numpy.ndarray:
+    """
+    :param boards: A board, or an array of boards, in row major order
+    :return: The base-3 code of every board
+    """
+    return numpy.asarray(boards, dtype=numpy.int64) @ BOARD_POWERS
+
+
+def decode_boards(codes: numpy.ndarray) -> numpy.ndarray:
+    """
+    :param codes: The base-3 code of a board, or an array of codes
+    :return: The boards the codes encode, in row major order
+    """
+    return (numpy.asarray(codes, dtype=numpy.int64)[..., numpy.newaxis] // BOARD_POWERS % 3).astype(numpy.uint8)
+
+
+def board_code(board: numpy.ndarray) -> int:
+    """
+    The base-3 code of a single board, unrolled in python since it is needed after every step and numpy has too much
+    overhead for nine cells
+    :param board: A board in row major order
+    :return: The base-3 code of the board
+    """
+    b = board.tolist() if isinstance(board, numpy.ndarray) else list(board)
+    return b[0] + 3 * b[1] + 9 * b[2] + 27 * b[3] + 81 * b[4] + 243 * b[5] + 729 * b[6] + 2187 * b[7] + 6561 * b[8]
+
+
+# The cells of every line in the order game_status used to check them, columns then rows then diagonals
+LINES: numpy.ndarray = numpy.array([[0, 3, 6], [1, 4, 7], [2, 5, 8],
+                                    [0, 1, 2], [3, 4, 5], [6, 7, 8],
+                                    [0, 4, 8], [2, 4, 6]])
+
+
+def compute_statuses(boards: numpy.ndarray) -> numpy.ndarray:
+    """
+    Determine the status of many games at once by checking every line of every board
+    :param boards: An array of boards in row major order
+    :return: The status of every game
+    """
+    lines = boards[:, LINES]
+    complete = (lines[:, :, 0] != Mark.EMPTY) & (lines[:, :, 0] == lines[:, :, 1]) & (lines[:, :, 1] == lines[:, :, 2])
+
+    # The first complete line decides the winner, its mark is the status of that player winning
+    first_line = complete.argmax(axis=1)
+    winner = lines[numpy.arange(len(boards)), first_line, 0]
+
+    statuses = numpy.where((boards == Mark.EMPTY).any(axis=1), Status.IN_PROGRESS, Status.DRAW).astype(numpy.uint8)
+    won = complete.any(axis=1)
+    statuses[won] = numpy.where(winner[won] == Mark.X, Status.X_WINS, Status.O_WINS)
+    return statuses
+
+
+# The status of every board indexed by its base-3 code
+STATUS_TABLE: numpy.ndarray = compute_statuses(decode_boards(numpy.arange(NUM_BOARD_CODES)))
+STATUSES: List[Status] = [Status(status) for status in STATUS_TABLE.tolist()]
+
+
 def game_status(obs: numpy.ndarray) -> Status:
     """
     Determine the status of the game
     :param obs: The state of the board along with the player who just took a turn
     :returns: Status
     """
+    return STATUSES[board_code(obs)]
+
 
-    player_win_status = {Mark.X: Status.X_WINS, Mark.O: Status.O_WINS}
+def game_statuses(boards: numpy.ndarray) -> numpy.ndarray:
+    """
+    Determine the status of many games at once
+    :param boards: An array of boards in row major order
+    :returns: The status of every game
+    """
+    return STATUS_TABLE[encode_boards(boards)]
 
-    for i in range(3):
-        if obs[i] and len(set(obs[i:9:3])) == 1:
-            return player_win_status[obs[i]]
 
-    for i in range(0, 9, 3):
-        if obs[i] and len(set(obs[i:i + 3])) == 1:
-            return player_win_status[obs[i]]
+# The legal actions of every set of empty cells, indexed by the bitmask with bit i set when cell i is empty
+LEGAL_ACTIONS: List[numpy.ndarray] = [numpy.flatnonzero([(empty >> i) & 1 for i in range(9)])
+                                      for empty in range(2 ** 9)]
+for legal_actions in LEGAL_ACTIONS:
+    legal_actions.flags.writeable = False
 
-    if obs[0] and len(set(obs[0:9:4])) == 1:
-        return player_win_status[obs[0]]
+ALL_EMPTY: int = 2 ** 9 - 1
+CELL_CODES: List[int] = BOARD_POWERS.tolist()
 
-    if obs[2] and len(set(obs[2:8:2])) == 1:
-        return player_win_status[obs[2]]
 
-    if Mark.EMPTY in obs:
-        return Status.IN_PROGRESS
+def reachable_boards() -> numpy.ndarray:
+    """
+    Enumerate every board that can come up in a game, X moving first and nobody moving after the game is over
+    :return: The sorted base-3 codes of the reachable boards
+    """
+    reachable = {0}
+    frontier = [numpy.zeros(9, dtype=numpy.uint8)]
+    player = Mark.X
 
-    return Status.DRAW
+    while frontier:
+        next_frontier = []
+        for board in frontier:
+            if game_status(board) != Status.IN_PROGRESS:
+                continue
+
+            for action in numpy.flatnonzero(board == Mark.EMPTY):
+                next_board = board.copy()
+                next_board[action] = player
+                code = int(encode_boards(next_board))
+                if code not in reachable:
+                    reachable.add(code)
+                    next_frontier.append(next_board)
+
+        frontier = next_frontier
+        player = Mark.X if player == Mark.O else Mark.O
+
+    return numpy.array(sorted(reachable), dtype=numpy.int64)
 
 
 class TicTacToeEnv(gym.Env):
@@ -76,6 +166,10 @@ class TicTacToeEnv(gym.Env):
         self.player: Mark = self.start_mark
         self.done: bool = False
 
+        # The base-3 code of the board and the bitmask of empty cells, both updated by every move
+        self.code: int = 0
+        self.empty: int = ALL_EMPTY
+
         # set numpy random seed
         self.seed()
 
@@ -87,15 +181,25 @@ class TicTacToeEnv(gym.Env):
 
     def reset(self) -> numpy.ndarray:
         """
-        Reset the environment to it's initial state.
+        Reset the environment to it's initial state. Every game gets a new board, so boards returned by the previous
+        game are not cleared.
         :return: The initial state of the environment.
         """
         self.state: numpy.ndarray = numpy.zeros(self.board_size, dtype=numpy.uint8)
         self.player: Mark = self.start_mark
         self.done: bool = False
         self.game_ticks: int = 0
+        self.status: Status = Status.IN_PROGRESS
+        self.code = 0
+        self.empty = ALL_EMPTY
         return self.observation
 
+    def legal_actions(self) -> numpy.ndarray:
+        """
+        :return: The empty cells of the board, a shared read-only array
+        """
+        return LEGAL_ACTIONS[self.empty]
+
     def step(self, action: int) -> Tuple[numpy.ndarray, float, bool, Dict[str, Status]]:
         """
         Step environment by action.
@@ -103,13 +207,29 @@ class TicTacToeEnv(gym.Env):
         :returns: Observation, Reward, Done, Info
         """
         assert self.action_space.contains(action), f"Action not available in action space: {action}"
+        assert (self.empty >> action) & 1, f"Cell is not empty: {action}"
+
+        reward, _, _ = self.fast_step(action)
+        self.info["status"]: Status = self.status
+
+        return self.observation, reward, self.done, self.info
+
+    def fast_step(self, action: int) -> Tuple[float, bool, Status]:
+        """
+        Step environment by action without checking it. Marks the board in place and looks the status up by the code of
+        the board, so a move allocates nothing. The observation is the board, which changes in place.
+        :param action: An empty location on the board to mark [0-8]
+        :returns: Reward, Done, Status
+        """
         self.game_ticks += 1
 
-        self.state[action]: Mark = self.player
-        self.player = self.next_player()
+        player = self.player
+        self.state[action] = player
+        self.code += player * CELL_CODES[action]
+        self.empty &= ~(1 << action)
+        self.player = Mark.X if player == Mark.O else Mark.O
 
-        self.status: Status = game_status(self.state)
-        self.info["status"]: Status = self.status
+        self.status = STATUSES[self.code]
 
         reward: float = 0.0
         if self.status != Status.IN_PROGRESS:
@@ -120,7 +240,7 @@ class TicTacToeEnv(gym.Env):
             elif self.status == Status.O_WINS:
                 reward: float = 1.0 / (self.game_ticks - 1)
 
-        return self.observation, reward, self.done, self.info
+        return reward, self.done, self.status
 
     @property
     def observation(self):
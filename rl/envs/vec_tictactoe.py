@@ -0,0 +1,87 @@
+#! /usr/bin/env python3
+from typing import Dict, Tuple
+
+import numpy
+
+from rl.envs.tictactoe import BOARD_POWERS, Mark, STATUS_TABLE, Status
+
+
+class VecTicTacToeEnv:
+    """
+    Many games of tic-tac-toe played at once. The boards live in one (N, 9) array and one call to step makes a move in
+    every game. Finished games are reset automatically, so the games drift out of step with each other and every game
+    has its own player to move. The boards are returned as the observations, and they, the final boards and the players
+    to move in info are buffers that change in place with every step. Copy them to keep them across steps.
+    """
+
+    def __init__(self, num_envs: int):
+        """
+        :param num_envs: The number of concurrent games
+        """
+        self.num_envs = num_envs
+        self.board_size: int = 9
+        self.start_mark = Mark.X
+        self.env_indices = numpy.arange(num_envs)
+
+        self.boards: numpy.ndarray = numpy.zeros((num_envs, self.board_size), dtype=numpy.uint8)
+        self.codes: numpy.ndarray = numpy.zeros(num_envs, dtype=numpy.int64)
+        self.players: numpy.ndarray = numpy.full(num_envs, self.start_mark, dtype=numpy.uint8)
+        self.game_ticks: numpy.ndarray = numpy.zeros(num_envs, dtype=numpy.int64)
+        self.final_boards: numpy.ndarray = numpy.zeros((num_envs, self.board_size), dtype=numpy.uint8)
+
+    def reset(self) -> numpy.ndarray:
+        """
+        Reset every game to it's initial state.
+        :return: The boards of every game
+        """
+        self.boards.fill(Mark.EMPTY)
+        self.codes.fill(0)
+        self.players.fill(self.start_mark)
+        self.game_ticks.fill(0)
+        return self.boards
+
+    def legal_actions(self) -> numpy.ndarray:
+        """
+        :return: A (N, 9) mask of the empty cells of every board
+        """
+        return self.boards == Mark.EMPTY
+
+    def step(self, actions: numpy.ndarray) \
+            -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, Dict[str, numpy.ndarray]]:
+        """
+        Make one move in every game. The reward is the reward of the player who moved, like in TicTacToeEnv.
+        :param actions: The location on the board to mark [0-8] in every game
+        :returns: Observations, Rewards, Dones, Info. The observations of finished games are already reset, info holds
+                  the status of every game, the boards finished games ended with, the player to move next and the mask
+                  of legal actions of every observation.
+        """
+        actions = numpy.asarray(actions, dtype=numpy.int64)
+        assert (self.boards[self.env_indices, actions] == Mark.EMPTY).all(), "Every action must mark an empty cell"
+
+        players = self.players
+        self.game_ticks += 1
+        self.boards[self.env_indices, actions] = players
+        self.codes += players * BOARD_POWERS[actions]
+
+        # X and O swap in place
+        numpy.subtract(Mark.X + Mark.O, players, out=players)
+
+        statuses = STATUS_TABLE[self.codes]
+        dones = statuses != Status.IN_PROGRESS
+
+        rewards = numpy.zeros(self.num_envs)
+        x_wins = statuses == Status.X_WINS
+        o_wins = statuses == Status.O_WINS
+        rewards[x_wins] = 1.0 / self.game_ticks[x_wins]
+        rewards[o_wins] = 1.0 / (self.game_ticks[o_wins] - 1)
+
+        numpy.copyto(self.final_boards, self.boards)
+        if dones.any():
+            self.boards[dones] = Mark.EMPTY
+            self.codes[dones] = 0
+            self.players[dones] = self.start_mark
+            self.game_ticks[dones] = 0
+
+        info = {"status": statuses, "final_boards": self.final_boards, "players": self.players,
+                "legal_actions": self.legal_actions()}
+        return self.boards, rewards, dones, info
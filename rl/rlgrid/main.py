@@ -3,20 +3,27 @@
 from __future__ import division, print_function
 
 import argparse
-import math
 import multiprocessing
 import os
 import signal
 import sys
 import time
 
-import gym
 import numpy
 from tqdm import tqdm
 
-from rl.agents import AgentBuilder
-from rl.utils.io_utils import save_learning_agent, load_learning_agent
+from rl.agents import ActionValueAgent, AgentBuilder
+from rl.agents.agent_builder import agent_registry
+from rl.envs import make_env
+from rl.utils.checkpoint_utils import Checkpointer, checkpoint_filename, init_worker, stop_on_signals, \
+    stop_requested, worker_seed
+from rl.utils.io_utils import save_learning_agent, load_policy
 from rl.utils.logging_utils import Logger
+from rl.utils.merge_utils import learn_and_merge, split_tasks
+
+
+# The learning agents of the agent, action value agents learn action values as well
+LEARNING_AGENTS = ["TemporalDifferenceZero", "QLearning", "Sarsa", "ExpectedSarsa"]
 
 
 def available_actions():
@@ -34,18 +41,42 @@ def get_state(obs, env):
     return state
 
 
+def default_policy_filename(env_name: str) -> str:
+    """
+    :param env_name: The name of the environment
+    :return: The policy of the environment in the policies directory, policies saved before the columnar format
+             existed are used if there is no newer one
+    """
+    policy_filename = os.path.join("policies", f"{env_name}.npz")
+    legacy_filename = os.path.join("policies", f"{env_name}.pickle")
+
+    if not os.path.exists(policy_filename) and os.path.exists(legacy_filename):
+        return legacy_filename
+    return policy_filename
+
+
 def learn_from_game(args):
     builder = args[0]
     num_games = args[1]
     env_name = args[2]
     agent_id = args[3]
+    seed = args[5]
+    checkpoint = args[6]
 
-    env = gym.make(env_name)
+    numpy.random.seed(worker_seed(seed, agent_id))
+    env = make_env(env_name)
 
     agent = builder.make()
+    checkpointer = None
+    first_game = 0
+    if checkpoint is not None:
+        checkpointer = Checkpointer(agents={"agent": agent}, **checkpoint["options"])
+        first_game = checkpointer.restore() if checkpoint["resume"] else 0
+
     obs: numpy.ndarray = env.reset()
     state = get_state(obs, env)
-    for _ in tqdm(range(num_games), desc=f"agent: {agent_id}", total=num_games):
+    games = first_game
+    for game in tqdm(range(first_game, num_games), desc=f"agent: {agent_id}", initial=first_game, total=num_games):
         while True:
             action: int = agent.act(state, available_actions=available_actions())
 
@@ -62,15 +93,30 @@ def learn_from_game(args):
                 state = get_state(obs, env)
                 break
 
+        games = game + 1
+        if checkpointer is not None and not checkpointer.episode_done(games):
+            break
+
+    if checkpointer is not None:
+        checkpointer.flush(games)
+        checkpointer.close()
+
     return agent
 
 
-def learn(builder: AgentBuilder, env_name: str, num_episodes: int, num_agents: int, policy_filename: str):
+def learn(builder: AgentBuilder, env_name: str, num_episodes: int, num_agents: int, policy_filename: str,
+          compress: bool = False, checkpoint_dir: str = None, checkpoint_every: int = 0,
+          checkpoint_seconds: float = 0.0, resume: bool = False):
     """
     Pit agents against themselves tournament style. The winners survive.
     :param num_episodes:  The number of games to play each other
     :param num_agents:  The number of games to play each other
     :param policy_filename: The filename to save the learned policy to
+    :param compress: Compress the saved policy
+    :param checkpoint_dir: The directory every agent writes its checkpoints to, no checkpoints are written if not given
+    :param checkpoint_every: Write a checkpoint after this many episodes
+    :param checkpoint_seconds: Write a checkpoint once this many seconds have passed since the last one
+    :param resume: Continue every agent from its last checkpoint
     """
     processes = multiprocessing.cpu_count()
 
@@ -82,25 +128,53 @@ def learn(builder: AgentBuilder, env_name: str, num_episodes: int, num_agents: i
     if num_agents < processes:
         processes = num_agents
 
+    # Every worker seeds its own random number generator, forked workers would otherwise play the same episodes
+    seed = numpy.random.SeedSequence().entropy
+
+    checkpoints = [None] * num_agents
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        checkpoints = [{"options": {"filename": checkpoint_filename(checkpoint_dir, env_name, agent_id + 1),
+                                    "every_episodes": checkpoint_every,
+                                    "every_seconds": checkpoint_seconds,
+                                    "compress": compress},
+                        "resume": resume} for agent_id in range(num_agents)]
+
+        # Interrupting or terminating this process lets every worker write a last checkpoint and stop
+        stop_on_signals()
+
     main_agent = builder.make()
-    chunksize = math.floor(num_agents / processes)
 
-    with multiprocessing.Pool(processes=processes) as pool:
-        agents = ((builder, num_episodes, env_name, agent_id + 1, num_agents) for agent_id in range(num_agents))
+    initializer, initargs = (init_worker, (stop_requested,)) if checkpoint_dir else (None, ())
+    with multiprocessing.Pool(processes=processes, initializer=initializer, initargs=initargs) as pool:
+        agents = [(builder, num_episodes, env_name, agent_id + 1, num_agents, seed, checkpoints[agent_id])
+                  for agent_id in range(num_agents)]
 
         os.system('clear')
         print("Playing games...")
-        agents = pool.map(learn_from_game, iterable=agents, chunksize=chunksize)
 
-        print("Merging knowledge...")
-        for agent in tqdm(agents, desc="Merging agents", total=num_agents):
-            main_agent.merge(agent)
+        # Every worker merges the agents it learns, the workers' agents are merged here
+        chunks = [(learn_from_game, chunk) for chunk in split_tasks(agents, processes)]
+        agents = pool.map(learn_and_merge, iterable=chunks)
+
+        if stop_requested.is_set():
+            print(f"Interrupted, the checkpoints in {checkpoint_dir} continue learning with --resume")
+            return
 
-    policy_filename = os.path.join("policies", f"{env_name}.pickle")
+    print("Merging knowledge...")
+    for agent in tqdm(agents, desc="Merging agents"):
+        main_agent.merge(agent)
+
+    policy_filename = os.path.join("policies", f"{env_name}.npz")
     if os.path.exists("./policies"):
-        save_learning_agent(agent, policy_filename)
+        save_learning_agent(main_agent, policy_filename, compress=compress)
     else:
-        save_learning_agent(agent, f"{env_name}.pickle")
+        save_learning_agent(main_agent, f"{env_name}.npz", compress=compress)
+
+    # The checkpoints are part of the saved policy now
+    for checkpoint in checkpoints:
+        if checkpoint is not None and os.path.exists(checkpoint["options"]["filename"]):
+            os.remove(checkpoint["options"]["filename"])
 
 
 def play(agent, env, episodes=100):
@@ -159,6 +233,9 @@ def main():
                                type=float,
                                default=0.5)
         subparser.add_argument("-p", "--with-policy", help="A data file containing a policy, generated from learning.")
+        subparser.add_argument("--learning", help="The learning agent of the agent.",
+                               choices=LEARNING_AGENTS,
+                               default="TemporalDifferenceZero")
         subparser.add_argument(
             "-env",
             "--env-name",
@@ -170,23 +247,23 @@ def main():
         logger: Logger = Logger(parser=subparser)
 
         suboptions = subparser.parse_args(sys.argv[2:])
-        env = gym.make(suboptions.env_name)
+        env = make_env(suboptions.env_name)
 
-        builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
-        policy_filename = os.path.join("policies", f"{suboptions.env_name}.pickle")
+        builder = AgentBuilder(policy="EGreedy", learning=suboptions.learning)
+        policy_filename = default_policy_filename(suboptions.env_name)
+        action_values = issubclass(agent_registry()[suboptions.learning], ActionValueAgent)
         if suboptions.with_policy:
-            state_values, transitions = load_learning_agent(suboptions.with_policy)
+            policy = load_policy(suboptions.with_policy, action_values=action_values)
         elif os.path.exists(policy_filename):
             print(f"Using policy: {policy_filename}")
-            state_values, transitions = load_learning_agent(policy_filename)
+            policy = load_policy(policy_filename, action_values=action_values)
         else:
-            state_values, transitions = None, None
+            policy = load_policy(None, action_values=action_values)
 
         builder.set(exploratory_rate=suboptions.exploratory_rate,
                     learning_rate=suboptions.learning_rate,
                     discount_rate=suboptions.discount_rate,
-                    state_values=state_values,
-                    transitions=transitions)
+                    **policy)
 
         agent = builder.make()
         play(agent, env)
@@ -209,6 +286,23 @@ def main():
                                type=float,
                                default=0.5)
         subparser.add_argument("-p", "--with-policy", help="A data file containing a policy, generated from learning.")
+        subparser.add_argument("--learning", help="The learning agent of the agent.",
+                               choices=LEARNING_AGENTS,
+                               default="TemporalDifferenceZero")
+        subparser.add_argument("--value-dtype", help="The floating point type of the learned state values.",
+                               choices=["float32", "float64"],
+                               default="float64")
+        subparser.add_argument("--expected", help="Score actions by the expected value of their next states.",
+                               action="store_true")
+        subparser.add_argument("--compress", help="Compress the saved policy.", action="store_true")
+        subparser.add_argument("--checkpoint-every", help="Write a checkpoint of every agent after this many episodes.",
+                               type=int, default=0)
+        subparser.add_argument("--checkpoint-seconds",
+                               help="Write a checkpoint of every agent once this many seconds have passed since the "
+                                    "last one.", type=float, default=0.0)
+        subparser.add_argument("--checkpoint-dir", help="The directory to write checkpoints to.",
+                               default="checkpoints")
+        subparser.add_argument("--resume", help="Continue every agent from its last checkpoint.", action="store_true")
         subparser.add_argument(
             "-env",
             "--env-name",
@@ -219,28 +313,36 @@ def main():
         logger: Logger = Logger(parser=subparser)
 
         suboptions = subparser.parse_args(sys.argv[2:])
-        env = gym.make(suboptions.env_name)
-        builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
-        policy_filename = os.path.join("policies", f"{suboptions.env_name}.pickle")
+        checkpointing = suboptions.checkpoint_every or suboptions.checkpoint_seconds or suboptions.resume
+        env = make_env(suboptions.env_name)
+        builder = AgentBuilder(policy="EGreedy", learning=suboptions.learning)
+        policy_filename = default_policy_filename(suboptions.env_name)
+        action_values = issubclass(agent_registry()[suboptions.learning], ActionValueAgent)
         if suboptions.with_policy:
-            state_values, transitions = load_learning_agent(suboptions.with_policy)
+            policy = load_policy(suboptions.with_policy, action_values=action_values)
         elif os.path.exists(policy_filename):
             print(f"Using policy: {policy_filename}")
-            state_values, transitions = load_learning_agent(policy_filename)
+            policy = load_policy(policy_filename, action_values=action_values)
         else:
-            state_values, transitions = None, None
+            policy = load_policy(None, action_values=action_values)
 
         builder.set(exploratory_rate=suboptions.exploratory_rate,
                     learning_rate=suboptions.learning_rate,
                     discount_rate=suboptions.discount_rate,
-                    state_values=state_values,
-                    transitions=transitions)
+                    value_dtype=suboptions.value_dtype,
+                    expected=suboptions.expected,
+                    **policy)
 
         learn(builder=builder,
               env_name=suboptions.env_name,
               num_episodes=suboptions.num_episodes,
               num_agents=suboptions.num_agents,
-              policy_filename=policy_filename)
+              policy_filename=policy_filename,
+              compress=suboptions.compress,
+              checkpoint_dir=suboptions.checkpoint_dir if checkpointing else None,
+              checkpoint_every=suboptions.checkpoint_every,
+              checkpoint_seconds=suboptions.checkpoint_seconds,
+              resume=suboptions.resume)
 
 
 if __name__ == "__main__":
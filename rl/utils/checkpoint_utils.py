@@ -0,0 +1,226 @@
+#! /usr/bin/env python3
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Dict, Tuple
+
+import numpy
+
+from rl.utils.io_utils import decode_action_values, decode_learning_agent, encode_snapshot, load_arrays, save_arrays, \
+    snapshot_learning_agent
+
+# Set when learning was interrupted, learning loops that checkpoint stop at the end of their current episode. The
+# event lives in shared memory, the workers of a learning run are handed the event of the process that started them.
+stop_requested = multiprocessing.Event()
+
+# The numbers besides their tables that agents change while they learn, the only attributes a checkpoint restores
+CHECKPOINT_ATTRIBUTES: Tuple[str, ...] = ("trace", "exploratory_rate", "previous_value")
+
+
+def stop_at_episode_end(signum, frame):
+    """
+    Interrupt and termination handler of learning runs that checkpoint. Rather than exiting in the middle of an
+    update, every learning loop flushes a last checkpoint at the end of its current episode and stops.
+    """
+    stop_requested.set()
+
+
+def stop_on_signals():
+    """
+    Stop the learning runs of this process and of the workers it starts at the end of their current episode once it
+    is interrupted or terminated
+    """
+    signal.signal(signal.SIGINT, stop_at_episode_end)
+    signal.signal(signal.SIGTERM, stop_at_episode_end)
+
+
+def init_worker(event):
+    """
+    Initializer of the worker processes of learning runs that checkpoint. The workers stop when the process that
+    started them sets its event, whether a signal was sent to the whole process group or only to that process, so
+    they ignore interrupts themselves.
+    :param event: The stop_requested event of the process that started the workers
+    """
+    global stop_requested
+    stop_requested = event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def checkpoint_filename(directory: str, name: str, agent_id: int) -> str:
+    """
+    :param directory: The directory checkpoints are written to
+    :param name: The name of the learning run
+    :param agent_id: The id of the worker whose agents are checkpointed
+    :return: The file the checkpoints of the worker are written to
+    """
+    return os.path.join(directory, f"{name}-{agent_id}.npz")
+
+
+def worker_seed(seed: int, agent_id: int) -> numpy.ndarray:
+    """
+    :param seed: The seed of the learning run
+    :param agent_id: The id of a worker
+    :return: A seed of the global random number generator that is independent of the seeds of the other workers
+    """
+    return numpy.random.SeedSequence(seed, spawn_key=(agent_id,)).generate_state(4)
+
+
+class Checkpointer:
+    """
+    Periodically saves the tables of learning agents, the numbers they keep besides their tables, such as step size
+    traces and decaying rates, the number of episodes they have learned from and the state of the global random number
+    generator, so that learning can resume where it left off. Checkpoints are taken every number of episodes or seconds
+    at the end of an episode. Taking one only copies the arrays of the tables, a background thread encodes and writes
+    the copy while the agents keep learning. If checkpoints are taken faster than they are written, only the latest one
+    is written.
+    """
+
+    def __init__(self, filename: str, agents: Dict[str, object], every_episodes: int = 0, every_seconds: float = 0.0,
+                 compress: bool = False):
+        """
+        :param filename: The file the checkpoints are written to, every checkpoint replaces the last one
+        :param agents: The learning agents to checkpoint by name
+        :param every_episodes: Take a checkpoint after this many episodes, never if 0
+        :param every_seconds: Take a checkpoint once this many seconds have passed since the last one, never if 0
+        :param compress: Compress the checkpoints
+        """
+        self.filename = filename
+        self.agents = agents
+        self.every_episodes = every_episodes
+        self.every_seconds = every_seconds
+        self.compress = compress
+
+        self.last_episode: int = 0
+        self.last_time: float = time.monotonic()
+
+        # The snapshot waiting to be written and whether the writer is busy with the one before it
+        self.pending: Dict[str, numpy.ndarray] = None
+        self.writing: bool = False
+        self.closed: bool = False
+        self.error: BaseException = None
+        self.condition = threading.Condition()
+        self.writer = threading.Thread(target=self.write, daemon=True)
+        self.writer.start()
+
+    def restore(self) -> int:
+        """
+        Load the tables of the agents and the state of the random number generator from the last checkpoint
+        :return: The number of episodes the agents had learned from, 0 if there is no checkpoint
+        """
+        if not os.path.exists(self.filename):
+            return 0
+
+        arrays = load_arrays(self.filename)
+        for name, agent in self.agents.items():
+            agent.state_values, agent.transitions = decode_learning_agent(arrays, prefix=f"{name}/")
+            if hasattr(agent, "action_values"):
+                agent.action_values = decode_action_values(arrays, agent.state_values.states, prefix=f"{name}/")
+
+            for attribute in CHECKPOINT_ATTRIBUTES:
+                key = f"{name}/attributes/{attribute}"
+                if key in arrays and hasattr(agent, attribute):
+                    setattr(agent, attribute, arrays[key].item())
+
+        numpy.random.set_state(("MT19937", arrays["rng/keys"], int(arrays["rng/pos"]), int(arrays["rng/has_gauss"]),
+                                float(arrays["rng/cached_gaussian"])))
+
+        self.last_episode = int(arrays["episode"])
+        return self.last_episode
+
+    def snapshot(self, episode: int) -> Dict[str, numpy.ndarray]:
+        """
+        :param episode: The number of episodes the agents have learned from
+        :return: A copy of everything a checkpoint holds
+        """
+        _, keys, pos, has_gauss, cached_gaussian = numpy.random.get_state()
+        snapshot = {"episode": numpy.array(episode), "rng/keys": keys, "rng/pos": numpy.array(pos),
+                    "rng/has_gauss": numpy.array(has_gauss), "rng/cached_gaussian": numpy.array(cached_gaussian)}
+
+        for name, agent in self.agents.items():
+            snapshot.update(snapshot_learning_agent(agent, prefix=f"{name}/"))
+            snapshot.update({f"{name}/attributes/{attribute}": numpy.array(getattr(agent, attribute))
+                             for attribute in CHECKPOINT_ATTRIBUTES if hasattr(agent, attribute)})
+
+        return snapshot
+
+    def episode_done(self, episode: int) -> bool:
+        """
+        Take a checkpoint if one is due, call at the end of every episode
+        :param episode: The number of episodes the agents have learned from
+        :return: Whether to keep learning, False once learning was interrupted. The learning loop then flushes a last
+                 checkpoint.
+        """
+        if stop_requested.is_set():
+            return False
+
+        due_episodes = self.every_episodes and episode - self.last_episode >= self.every_episodes
+        due_seconds = self.every_seconds and time.monotonic() - self.last_time >= self.every_seconds
+        if due_episodes or due_seconds:
+            self.save(episode)
+
+        return True
+
+    def save(self, episode: int):
+        """
+        Take a checkpoint, it is written in the background
+        :param episode: The number of episodes the agents have learned from
+        """
+        snapshot = self.snapshot(episode)
+
+        with self.condition:
+            if self.error is not None:
+                raise self.error
+
+            self.pending = snapshot
+            self.condition.notify_all()
+
+        self.last_episode = episode
+        self.last_time = time.monotonic()
+
+    def flush(self, episode: int):
+        """
+        Take a checkpoint and wait until it has been written
+        :param episode: The number of episodes the agents have learned from
+        """
+        self.save(episode)
+
+        with self.condition:
+            while self.pending is not None or self.writing:
+                self.condition.wait()
+
+            if self.error is not None:
+                raise self.error
+
+    def close(self):
+        """
+        Write the checkpoint that is still pending and stop the writer
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.writer.join()
+
+    def write(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+
+                if self.pending is None:
+                    return
+
+                snapshot, self.pending = self.pending, None
+                self.writing = True
+
+            try:
+                save_arrays(encode_snapshot(snapshot), self.filename, compress=self.compress)
+            except BaseException as error:
+                with self.condition:
+                    self.error = error
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
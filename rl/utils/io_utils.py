@@ -1,31 +1,284 @@
 #! /usr/bin/env python3
+import importlib
+import itertools
+import os
 import pickle
+import tempfile
+import zipfile
+from typing import Dict, List, Tuple, Union
+
+import numpy
+
+from rl.agents.reprs import ActionTable, StateIndex, SuccessorTable, TransitionTable, ValueTable
+
+# The version of the columnar policy format, files written by a newer version are refused
+POLICY_FORMAT_VERSION: int = 1
+
+# The state indices a policy may name by module and class, policies naming any other class are refused. The tic-tac-toe
+# indices are only imported when a policy names them.
+STATE_INDEX_CLASSES: Dict[str, Tuple[str, str]] = {
+    "rl.agents.reprs.state_index.StateIndex": ("rl.agents.reprs.state_index", "StateIndex"),
+    "rl.book.chapter_1.tictactoe.state_index.TicTacToeStateIndex":
+        ("rl.book.chapter_1.tictactoe.state_index", "TicTacToeStateIndex"),
+    "rl.book.chapter_1.tictactoe.state_index.SymmetricTicTacToeStateIndex":
+        ("rl.book.chapter_1.tictactoe.state_index", "SymmetricTicTacToeStateIndex"),
+}
+
+
+def encode_keys(keys: List[Tuple[Union[float, int]]], prefix: str = "") -> Dict[str, numpy.ndarray]:
+    """
+    Flatten the keys of a state index into one array
+    :param keys: The key of every state, ordered by id
+    :param prefix: Prepended to the names of the arrays
+    :return: The elements of all keys in the smallest type that holds them and the length of every key
+    """
+    lengths = numpy.fromiter(map(len, keys), dtype=numpy.int64, count=len(keys))
+    flat = numpy.array(list(itertools.chain.from_iterable(keys)))
+
+    if flat.dtype.kind in "iu" and len(flat):
+        flat = flat.astype(numpy.result_type(numpy.min_scalar_type(flat.min()), numpy.min_scalar_type(flat.max())))
+
+    return {f"{prefix}keys": flat, f"{prefix}key_lengths": lengths}
+
+
+def decode_keys(flat: numpy.ndarray, lengths: numpy.ndarray) -> List[Tuple[Union[float, int]]]:
+    """
+    :param flat: The elements of all keys
+    :param lengths: The length of every key
+    :return: The keys as tuples of python scalars
+    """
+    if not len(lengths):
+        return []
+
+    if lengths.min() == lengths.max() > 0:
+        # Zipping the columns builds the tuples without a python loop
+        return list(zip(*flat.reshape(len(lengths), -1).T.tolist()))
+
+    return [tuple(key.tolist()) for key in numpy.split(flat, numpy.cumsum(lengths)[:-1])]
+
+
+def snapshot_learning_agent(agent, prefix: str = "") -> Dict[str, Union[numpy.ndarray, list]]:
+    """
+    Copy the tables of a learning agent, quickly enough to let it keep learning while the copy is encoded and saved
+    :param agent: A learning agent
+    :param prefix: Prepended to the names of the arrays, which lets one file hold several agents
+    :return: The arrays of the tables by name, the keys of a plain state index are kept as a list until encoded
+    """
+    state_values: ValueTable = agent.state_values
+    transitions: TransitionTable = agent.transitions
+    if isinstance(transitions, SuccessorTable):
+        transitions = transitions.to_transition_table()
+
+    states = state_values.states
+    assert transitions.states is states, "The state values and transitions must share one state index"
+
+    num_states = len(states)
+    state_values.reserve(num_states)
+    transitions.compact()
+
+    snapshot = {
+        "version": numpy.array(POLICY_FORMAT_VERSION),
+        "states_class": numpy.array(f"{type(states).__module__}.{type(states).__qualname__}"),
+        "num_states": numpy.array(num_states),
+        "values": state_values.values[:num_states].copy(),
+        "counts": state_values.counts[:num_states].copy(),
+        "row_states": transitions.row_states[:transitions.num_rows].copy(),
+        "row_actions": transitions.row_actions[:transitions.num_rows].copy(),
+        "indptr": transitions.indptr.copy(),
+        "indices": transitions.indices.copy(),
+        "transition_counts": transitions.counts.copy(),
+    }
+
+    # Action value agents learn one more table on the same index
+    action_values: ActionTable = getattr(agent, "action_values", None)
+    if action_values is not None:
+        assert action_values.states is states, "The action values must share the index of the state values"
+        action_values.reserve(num_states, 1)
+
+        # The array grows geometrically, the columns past the last action that was ever learned are not saved
+        values = action_values.values[:num_states]
+        written = numpy.flatnonzero(~action_values.unwritten(values).all(axis=0))
+        snapshot["action_values"] = values[:, :written[-1] + 1 if len(written) else 0].copy()
+
+    # Other index classes build their ids themselves, like the perfect tic-tac-toe indices. Keys are only ever
+    # appended, so the first num_states of them are a snapshot.
+    if type(states) is StateIndex:
+        snapshot["keys"] = states.keys[:num_states]
+
+    return {f"{prefix}{name}": array for name, array in snapshot.items()}
+
+
+def encode_snapshot(snapshot: Dict[str, Union[numpy.ndarray, list]]) -> Dict[str, numpy.ndarray]:
+    """
+    :param snapshot: The arrays of one or more snapshots of learning agents
+    :return: The snapshots with the keys of their state indices flattened into arrays
+    """
+    arrays = {}
+    for name, array in snapshot.items():
+        if isinstance(array, list):
+            arrays.update(encode_keys(array, prefix=name[:-len("keys")]))
+        else:
+            arrays[name] = array
+
+    return arrays
+
+
+def encode_learning_agent(agent, prefix: str = "") -> Dict[str, numpy.ndarray]:
+    """
+    Encode the tables of a learning agent as flat arrays, the columns of the policy format
+    :param agent: A learning agent
+    :param prefix: Prepended to the names of the arrays, which lets one file hold several agents
+    :return: The arrays by name
+    """
+    return encode_snapshot(snapshot_learning_agent(agent, prefix=prefix))
+
+
+def decode_learning_agent(arrays, prefix: str = "") -> Tuple[ValueTable, TransitionTable]:
+    """
+    Decode the tables of a learning agent from the columns of the policy format
+    :param arrays: A mapping of names to the arrays encode_learning_agent returned, such as a loaded npz file
+    :param prefix: The prefix the names of the arrays were encoded with
+    :return: The state values and transitions
+    """
+    version = int(arrays[f"{prefix}version"])
+    if version > POLICY_FORMAT_VERSION:
+        raise ValueError(f"The policy format version {version} is newer than the supported version "
+                         f"{POLICY_FORMAT_VERSION}")
+
+    states_class_name = str(arrays[f"{prefix}states_class"])
+    if states_class_name not in STATE_INDEX_CLASSES:
+        raise ValueError(f"The policy names the unknown state index {states_class_name!r}")
+
+    module_name, class_name = STATE_INDEX_CLASSES[states_class_name]
+    states_class = getattr(importlib.import_module(module_name), class_name)
+    if states_class is StateIndex:
+        states = StateIndex.from_keys(decode_keys(arrays[f"{prefix}keys"], arrays[f"{prefix}key_lengths"]))
+    else:
+        states = states_class()
+
+    num_states = int(arrays[f"{prefix}num_states"])
+    if len(states) != num_states:
+        raise ValueError(f"The policy holds {num_states} states but its index has {len(states)}")
+
+    state_values = ValueTable.from_arrays(arrays[f"{prefix}values"], arrays[f"{prefix}counts"], states=states)
+    transitions = TransitionTable.from_arrays(arrays[f"{prefix}row_states"], arrays[f"{prefix}row_actions"],
+                                              arrays[f"{prefix}indptr"], arrays[f"{prefix}indices"],
+                                              arrays[f"{prefix}transition_counts"], states=states)
+    return state_values, transitions
+
+
+def decode_action_values(arrays, states: StateIndex, prefix: str = "") -> ActionTable:
+    """
+    Decode the action values of an action value agent from the columns of the policy format
+    :param arrays: A mapping of names to the arrays encode_learning_agent returned, such as a loaded npz file
+    :param states: The index of the decoded state values
+    :param prefix: The prefix the names of the arrays were encoded with
+    :return: The action values, None if the policy was not learned by an action value agent
+    """
+    if f"{prefix}action_values" not in arrays:
+        return None
+
+    return ActionTable.from_array(arrays[f"{prefix}action_values"], states=states, fill=numpy.nan)
+
+
+def load_arrays(filename: str) -> Dict[str, numpy.ndarray]:
+    """
+    :param filename: The name of an npz file
+    :return: Every array of the file by name
+    """
+    with numpy.load(filename) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+
+def save_arrays(arrays: Dict[str, numpy.ndarray], filename: str, compress: bool = False):
+    """
+    Save arrays as an npz file. The file is written next to its destination and then moved over it, so an
+    interrupted save never leaves a partial file.
+    :param arrays: The arrays by name
+    :param filename: The name of the file to write to
+    :param compress: Compress the arrays, which makes the file smaller and saving and loading slower
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    descriptor, temporary_filename = tempfile.mkstemp(dir=directory, prefix=".policy-", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            if compress:
+                numpy.savez_compressed(f, **arrays)
+            else:
+                numpy.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Temporary files are private, the file gets the permissions of any other new file
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_filename, 0o666 & ~umask)
+        os.replace(temporary_filename, filename)
+    except BaseException:
+        os.unlink(temporary_filename)
+        raise
 
 
 def load_learning_agent(filename: str):
     """
-    Load data from csv file and convert it to state values
-    :param filename: The name of a csv file containing the data
-    :return: The state value mapping
+    Load the state values and transitions of a learning agent. Policies pickled before the columnar format existed
+    are still loaded, if a policy was pickled to the same file more than once the last one is returned.
+    :param filename: The name of a policy file
+    :return: The state values and transitions
     """
+    if zipfile.is_zipfile(filename):
+        with numpy.load(filename) as arrays:
+            return decode_learning_agent(arrays)
 
     with open(filename, "rb") as f:
         data = pickle.load(f)
 
+        # Pickled policies were appended to their file, the last one is the latest
+        while True:
+            try:
+                data = pickle.load(f)
+            except EOFError:
+                break
+
     return data["state_values"], data["transitions"]
 
 
-def save_learning_agent(agent, filename: str):
+def load_action_values(filename: str, states: StateIndex) -> ActionTable:
     """
-    Save the state values into a csv file
-    :param state_values: The state value mapping
-    :param filename: The name of the file to write to
+    Load the action values of a policy an action value agent learned
+    :param filename: The name of a policy file
+    :param states: The index of the state values loaded from the same file
+    :return: The action values, None if the policy holds none
     """
+    if not zipfile.is_zipfile(filename):
+        return None
+
+    with numpy.load(filename) as arrays:
+        return decode_action_values(arrays, states)
 
-    data = {
-        "state_values": agent.state_values,
-        "transitions": agent.transitions
-    }
 
-    with open(filename, "ab") as f:
-        pickle.dump(data, f)
+def load_policy(filename: str, action_values: bool = False) -> Dict[str, object]:
+    """
+    Load a policy as the constructor arguments of a learning agent
+    :param filename: The name of a policy file, the agent starts from empty tables if not given
+    :param action_values: Load the action values as well, for action value agents
+    :return: The state values, transitions and, if asked for, action values by argument name
+    """
+    state_values, transitions = load_learning_agent(filename) if filename else (None, None)
+    policy = {"state_values": state_values, "transitions": transitions}
+
+    if action_values:
+        policy["action_values"] = load_action_values(filename, state_values.states) if filename else None
+
+    return policy
+
+
+def save_learning_agent(agent, filename: str, compress: bool = False):
+    """
+    Save the state values, transitions and action values of a learning agent as a versioned npz file of flat arrays,
+    written atomically
+    :param agent: A learning agent
+    :param filename: The name of the file to write to
+    :param compress: Compress the arrays, which makes the file smaller and saving and loading slower
+    """
+    save_arrays(encode_learning_agent(agent), filename, compress=compress)
@@ -0,0 +1,32 @@
+#! /usr/bin/env python3
+from typing import Callable, List, Sequence, Tuple
+
+from rl.agents import LearningAgent
+
+
+def split_tasks(tasks: Sequence, num_workers: int) -> List[List]:
+    """
+    Split the tasks of a pool into one contiguous chunk per worker
+    :param tasks: The arguments of every agent to learn
+    :param num_workers: The number of worker processes
+    :return: The non-empty chunks, in the order of the tasks
+    """
+    num_workers = max(1, min(num_workers, len(tasks)))
+    return [list(tasks[worker * len(tasks) // num_workers:(worker + 1) * len(tasks) // num_workers])
+            for worker in range(num_workers)]
+
+
+def learn_and_merge(args: Tuple[Callable[..., LearningAgent], List]) -> LearningAgent:
+    """
+    Learn the agents of a chunk one after another in a worker and merge each into the first as soon as it is learned.
+    The worker returns one agent however many it learns, so the tables cross back to the parent once per worker and
+    the parent merges one agent per worker instead of one per agent.
+    :param args: The function that learns one agent and the arguments of every agent of the chunk
+    :return: One agent with the knowledge of every agent of the chunk
+    """
+    learn, tasks = args
+    agent = learn(tasks[0])
+    for task in tasks[1:]:
+        agent.merge(learn(task))
+
+    return agent
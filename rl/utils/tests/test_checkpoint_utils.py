@@ -0,0 +1,102 @@
+import numpy
+
+from rl.agents import AgentBuilder
+from rl.utils import checkpoint_utils
+from rl.utils.checkpoint_utils import Checkpointer
+from rl.utils.io_utils import load_arrays, save_arrays
+
+
+def make_agent():
+    builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
+    builder.set(exploratory_rate=0.5, learning_rate=0.5, discount_rate=0.5)
+    return builder.make()
+
+
+def play(agent, first_episode: int, num_episodes: int, checkpointer: Checkpointer = None):
+    for episode in range(first_episode, num_episodes):
+        state = numpy.zeros(2, dtype=numpy.int64)
+        for step in range(5):
+            action = agent.act(state, available_actions=numpy.arange(3))
+            agent.learn(state=state, action=action, reward=numpy.random.normal())
+            state = numpy.array([step + 1, action])
+
+        agent.learn(state=state, action=0, reward=1.0)
+        agent.reset()
+
+        if checkpointer is not None:
+            checkpointer.episode_done(episode + 1)
+
+
+def test_resume(tmp_path):
+    filename = str(tmp_path / "checkpoint.npz")
+
+    # Taking a checkpoint compacts the transitions, which reorders the next states that are sampled
+    numpy.random.seed(0)
+    uninterrupted = make_agent()
+    checkpointer = Checkpointer(str(tmp_path / "uninterrupted.npz"), {"agent": uninterrupted}, every_episodes=8)
+    play(uninterrupted, 0, 20, checkpointer)
+    checkpointer.close()
+
+    # Checkpoints are written every 8 episodes while the agent keeps learning until episode 10
+    numpy.random.seed(0)
+    interrupted = make_agent()
+    checkpointer = Checkpointer(filename, {"agent": interrupted}, every_episodes=8)
+    play(interrupted, 0, 10, checkpointer)
+    checkpointer.close()
+
+    resumed = make_agent()
+    checkpointer = Checkpointer(filename, {"agent": resumed})
+    first_episode = checkpointer.restore()
+    assert first_episode == 8
+
+    checkpointer.every_episodes = 8
+    play(resumed, first_episode, 20, checkpointer)
+    checkpointer.flush(20)
+    checkpointer.close()
+
+    for agent in (resumed, make_agent()):
+        if agent is not resumed:
+            Checkpointer(filename, {"agent": agent}).restore()
+
+        assert agent.state_values.states.keys == uninterrupted.state_values.states.keys
+        numpy.testing.assert_array_equal(agent.state_values.values[:len(agent.state_values)],
+                                         uninterrupted.state_values.values[:len(uninterrupted.state_values)])
+
+
+def test_restore_attributes(tmp_path):
+    filename = str(tmp_path / "checkpoint.npz")
+    agent = make_agent()
+    play(agent, 0, 2)
+
+    checkpointer = Checkpointer(filename, {"agent": agent})
+    checkpointer.flush(2)
+    checkpointer.close()
+
+    # Only the numbers agents change while they learn are restored, the settings of the resumed run are kept
+    arrays = load_arrays(filename)
+    arrays["agent/attributes/learning_rate"] = numpy.array(0.9)
+    arrays["agent/attributes/act"] = numpy.array(0)
+    save_arrays(arrays, filename)
+
+    resumed = make_agent()
+    Checkpointer(filename, {"agent": resumed}).restore()
+    assert resumed.trace == agent.trace and resumed.learning_rate == 0.5
+    assert "act" not in vars(resumed)
+
+
+def test_stop_requested(tmp_path):
+    filename = str(tmp_path / "checkpoint.npz")
+    checkpointer = Checkpointer(filename, {"agent": make_agent()}, every_episodes=1)
+
+    # The learning loop writes the last checkpoint itself once it is asked to stop
+    checkpoint_utils.stop_requested.set()
+    try:
+        assert not checkpointer.episode_done(1)
+        assert checkpointer.pending is None and checkpointer.last_episode == 0
+    finally:
+        checkpoint_utils.stop_requested.clear()
+
+    assert checkpointer.episode_done(1)
+    checkpointer.flush(1)
+    checkpointer.close()
+    assert int(load_arrays(filename)["episode"]) == 1
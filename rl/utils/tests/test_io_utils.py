@@ -0,0 +1,99 @@
+import os
+import pickle
+from collections import Counter
+
+import numpy
+import pytest
+
+from rl.agents import AgentBuilder
+from rl.agents.reprs import TransitionTable, Value, ValueTable
+from rl.book.chapter_1.tictactoe.state_index import TicTacToeStateIndex
+from rl.utils.io_utils import load_action_values, load_arrays, load_learning_agent, load_policy, save_arrays, \
+    save_learning_agent
+
+
+def make_agent(**kwargs):
+    builder = AgentBuilder(policy="EGreedy", learning="TemporalDifferenceZero")
+    builder.set(exploratory_rate=0.1, learning_rate=0.5, discount_rate=0.5, **kwargs)
+    return builder.make()
+
+
+def test_save_and_load(tmp_path):
+    state_values = ValueTable.from_dict({(0, 1): Value(value=0.5, count=2), (1, 1, 2): Value(value=-1.0, count=1)},
+                                        dtype=numpy.float32)
+    transitions = TransitionTable.from_dict({(0, 1, 3): Counter({(1, 1, 2): 2, (2.5,): 1})},
+                                            states=state_values.states)
+    agent = make_agent(state_values=state_values, transitions=transitions)
+
+    filename = str(tmp_path / "policy.npz")
+    for compress in (False, True):
+        # Saving again replaces the policy
+        save_learning_agent(agent, filename, compress=compress)
+        save_learning_agent(agent, filename, compress=compress)
+        assert os.listdir(tmp_path) == ["policy.npz"]
+
+        loaded_values, loaded_transitions = load_learning_agent(filename)
+        assert loaded_values.values.dtype == numpy.float32
+        assert {state: (value.value, value.count) for state, value in loaded_values.items()} == \
+               {(0, 1): (0.5, 2), (1, 1, 2): (-1.0, 1), (2.5,): (0.0, 0)}
+
+        row = loaded_transitions.find(loaded_values.find((0, 1)), 3)
+        next_state_ids, counts = loaded_transitions.distribution(row)
+        assert {loaded_values.states.state(i): c for i, c in zip(next_state_ids, counts)} == {(1, 1, 2): 2, (2.5,): 1}
+
+
+def test_save_and_load_tictactoe(tmp_path):
+    states = TicTacToeStateIndex()
+    agent = make_agent(states=states)
+    agent.state_values[(0, 0, 0, 0, 1, 0, 0, 0, 0, 1)] = Value(value=0.25, count=3)
+
+    filename = str(tmp_path / "policy.npz")
+    save_learning_agent(agent, filename)
+    state_values, transitions = load_learning_agent(filename)
+
+    assert state_values.states is states
+    assert state_values.value((0, 0, 0, 0, 1, 0, 0, 0, 0, 1)) == 0.25
+    assert len(transitions) == 0
+
+
+def test_load_unknown_state_index(tmp_path):
+    filename = str(tmp_path / "policy.npz")
+    save_learning_agent(make_agent(), filename)
+
+    # A policy can only name the state indices of this package, any other class is never imported
+    arrays = load_arrays(filename)
+    arrays["states_class"] = numpy.array("subprocess.Popen")
+    save_arrays(arrays, filename)
+    with pytest.raises(ValueError):
+        load_learning_agent(filename)
+
+
+def test_save_and_load_action_values(tmp_path):
+    builder = AgentBuilder(policy="EGreedy", learning="QLearning")
+    builder.set(exploratory_rate=0.0, learning_rate=0.5, discount_rate=0.5)
+    agent = builder.make()
+    for state, action, reward in ((0,), 1, 0.0), ((1,), 2, 1.0):
+        agent.learn(state, action, reward)
+    agent.reset()
+
+    filename = str(tmp_path / "policy.npz")
+    save_learning_agent(agent, filename)
+    state_values, _ = load_learning_agent(filename)
+    action_values = load_action_values(filename, state_values.states)
+    numpy.testing.assert_array_equal(action_values.values[:2, :3], agent.action_values.values[:2, :3])
+
+    # Agents that do not learn action values load the same policy without them
+    assert "action_values" not in load_policy(filename)
+    builder.set(exploratory_rate=0.0, learning_rate=0.5, discount_rate=0.5, **load_policy(filename, action_values=True))
+    assert builder.make().act((0,), numpy.arange(3)) == 1
+
+
+def test_load_legacy_pickle(tmp_path):
+    filename = str(tmp_path / "policy.pickle")
+    with open(filename, "ab") as f:
+        for value in (1.0, 2.0):
+            table = ValueTable.from_dict({(0,): Value(value=value, count=1)})
+            pickle.dump({"state_values": table, "transitions": TransitionTable(states=table.states)}, f)
+
+    state_values, _ = load_learning_agent(filename)
+    assert state_values.value((0,)) == 2.0
@@ -0,0 +1,47 @@
+import multiprocessing
+
+import numpy
+
+from rl.agents import AgentBuilder
+from rl.utils.merge_utils import learn_and_merge, split_tasks
+
+
+def learn_chain(seed: int):
+    numpy.random.seed(seed)
+    builder = AgentBuilder(policy="Random", learning="TemporalDifferenceZero")
+    builder.set(learning_rate=0.5, discount_rate=0.5)
+    agent = builder.make()
+
+    for _ in range(20):
+        for state in range(numpy.random.randint(1, 6)):
+            agent.learn((state,), 0, numpy.random.normal())
+        agent.reset()
+
+    return agent
+
+
+def test_split_tasks():
+    assert split_tasks(list(range(7)), 3) == [[0, 1], [2, 3], [4, 5, 6]]
+    assert split_tasks(list(range(2)), 4) == [[0], [1]]
+    assert split_tasks(list(range(5)), 1) == [list(range(5))]
+
+
+def test_learn_and_merge():
+    # A worker merges the agents of its chunk as the parent would have merged them one by one
+    merged = learn_and_merge((learn_chain, [0, 1, 2]))
+    expected = learn_chain(0)
+    expected.merge(learn_chain(1))
+    expected.merge(learn_chain(2))
+
+    assert numpy.array_equal(merged.state_values.values, expected.state_values.values)
+    assert numpy.array_equal(merged.state_values.counts, expected.state_values.counts)
+    for table in merged.transitions, expected.transitions:
+        table.compact()
+    for name in "indptr", "indices", "counts":
+        assert numpy.array_equal(getattr(merged.transitions, name), getattr(expected.transitions, name))
+
+    # The parent receives one agent per worker
+    chunks = [(learn_chain, chunk) for chunk in split_tasks(list(range(5)), 2)]
+    with multiprocessing.Pool(processes=2) as pool:
+        agents = pool.map(learn_and_merge, iterable=chunks)
+    assert len(agents) == 2
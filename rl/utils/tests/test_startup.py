@@ -0,0 +1,17 @@
+#! /usr/bin/env python3
+import subprocess
+import sys
+
+import pytest
+
+# Packages the console scripts only import once they need them
+LAZY_MODULES = ["gym_bandits", "gym_minigrid", "matplotlib", "yaml"]
+
+
+@pytest.mark.parametrize("module", ["rl.book.chapter_1.tictactoe.main", "rl.book.chapter_2.main", "rl.rlgrid.main"])
+def test_startup_is_lazy(module):
+    # A fresh interpreter, the test session has imported everything already
+    code = f"import sys, {module}; print(' '.join(sorted(set({LAZY_MODULES}) & set(sys.modules))))"
+    imported = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+    assert imported.split() == []